@@ -0,0 +1,26 @@
+"""add goal calendar generation marker
+
+Revision ID: 011_goal_calendar_generated_on
+Revises: 010_google_play_purchases
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '011_goal_calendar_generated_on'
+down_revision: Union[str, None] = '010_google_play_purchases'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fecha "hoy" de la última regeneración del calendario.
+    # NULL fuerza una reconstrucción completa en la próxima escritura.
+    op.add_column('goals', sa.Column('calendar_generated_on', sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('goals', 'calendar_generated_on')
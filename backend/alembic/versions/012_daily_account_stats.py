@@ -0,0 +1,69 @@
+"""add daily account stats rollup
+
+Revision ID: 012_daily_account_stats
+Revises: 011_goal_calendar_generated_on
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '012_daily_account_stats'
+down_revision: Union[str, None] = '011_goal_calendar_generated_on'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_account_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('ops', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('wins', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('losses', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('draws', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('realized_pnl', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('gross_profit', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('gross_loss', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('sessions_with_ops', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('account_id', 'date', name='unique_daily_stats_account_date')
+    )
+    op.create_index(op.f('ix_daily_account_stats_id'), 'daily_account_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_daily_account_stats_account_id'), 'daily_account_stats', ['account_id'], unique=False)
+
+    # Backfill desde las operaciones existentes (mismo cálculo que rebuild_daily_stats)
+    op.execute("""
+        INSERT INTO daily_account_stats (
+            account_id, date, ops, wins, losses, draws,
+            realized_pnl, gross_profit, gross_loss, sessions_with_ops, updated_at
+        )
+        SELECT
+            td.account_id,
+            td.date,
+            COUNT(o.id),
+            SUM(CASE WHEN o.result = 'WIN' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN o.result = 'LOSS' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN o.result = 'DRAW' THEN 1 ELSE 0 END),
+            COALESCE(SUM(o.profit), 0),
+            SUM(CASE WHEN o.result = 'WIN' THEN o.profit ELSE 0 END),
+            SUM(CASE WHEN o.result = 'LOSS' THEN -o.profit ELSE 0 END),
+            COUNT(DISTINCT o.session_id),
+            CURRENT_TIMESTAMP
+        FROM operations o
+        JOIN trading_sessions ts ON ts.id = o.session_id
+        JOIN trading_days td ON td.id = ts.trading_day_id
+        GROUP BY td.account_id, td.date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_daily_account_stats_account_id'), table_name='daily_account_stats')
+    op.drop_index(op.f('ix_daily_account_stats_id'), table_name='daily_account_stats')
+    op.drop_table('daily_account_stats')
@@ -0,0 +1,46 @@
+"""add composite indexes for operations -> sessions -> days
+
+Revision ID: 013_hot_path_indexes
+Revises: 012_daily_account_stats
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '013_hot_path_indexes'
+down_revision: Union[str, None] = '012_daily_account_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # trading_days(account_id, date) ya está cubierto por unique_account_date.
+    op.create_index(
+        'ix_trading_sessions_day_number', 'trading_sessions',
+        ['trading_day_id', 'session_number']
+    )
+    op.create_index(
+        'ix_operations_session_result_profit', 'operations',
+        ['session_id', 'result', 'profit']
+    )
+
+    # Un plan por día por objetivo: eliminar duplicados (se conserva el más
+    # antiguo) antes de crear la restricción.
+    op.execute("""
+        DELETE FROM goal_daily_plans
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM goal_daily_plans GROUP BY goal_id, date
+        )
+    """)
+    op.create_unique_constraint(
+        'unique_goal_daily_plan_date', 'goal_daily_plans', ['goal_id', 'date']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('unique_goal_daily_plan_date', 'goal_daily_plans', type_='unique')
+    op.drop_index('ix_operations_session_result_profit', table_name='operations')
+    op.drop_index('ix_trading_sessions_day_number', table_name='trading_sessions')
@@ -0,0 +1,32 @@
+"""add rate limit buckets for the SQL rate-limiter backend
+
+Revision ID: 014_rate_limit_buckets
+Revises: 013_hot_path_indexes
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '014_rate_limit_buckets'
+down_revision: Union[str, None] = '013_hot_path_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rate_limit_buckets',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('tat', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_rate_limit_buckets_tat'), 'rate_limit_buckets', ['tat'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_rate_limit_buckets_tat'), table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
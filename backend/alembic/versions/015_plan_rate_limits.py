@@ -0,0 +1,36 @@
+"""add per-plan write and report rate limits to plan features
+
+Revision ID: 015_plan_rate_limits
+Revises: 014_rate_limit_buckets
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '015_plan_rate_limits'
+down_revision: Union[str, None] = '014_rate_limit_buckets'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+RATE_FEATURES = {
+    'FREE': '{"rate_writes_per_minute": 20, "rate_writes_burst": 5, "rate_reports_per_hour": 5, "rate_reports_burst": 2}',
+    'BASIC': '{"rate_writes_per_minute": 40, "rate_writes_burst": 10, "rate_reports_per_hour": 20, "rate_reports_burst": 5}',
+    'PRO': '{"rate_writes_per_minute": 120, "rate_writes_burst": 30, "rate_reports_per_hour": 60, "rate_reports_burst": 10}',
+}
+
+
+def upgrade() -> None:
+    for name, features in RATE_FEATURES.items():
+        op.execute(
+            f"UPDATE plans SET features = features || '{features}'::jsonb WHERE name = '{name}'"
+        )
+
+
+def downgrade() -> None:
+    op.execute(
+        "UPDATE plans SET features = features - "
+        "'{rate_writes_per_minute,rate_writes_burst,rate_reports_per_hour,rate_reports_burst}'::text[]"
+    )
@@ -0,0 +1,48 @@
+"""add google play notifications queue
+
+Revision ID: 018_google_play_notifications
+Revises: 017_email_outbox
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '018_google_play_notifications'
+down_revision: Union[str, None] = '017_email_outbox'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'google_play_notifications',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('message_id', sa.String(length=128), nullable=False),
+        sa.Column('subscription', sa.String(length=255), nullable=True),
+        sa.Column('purchase_token', sa.String(length=512), nullable=True),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('last_error', sa.String(length=500), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('message_id')
+    )
+    op.create_index(op.f('ix_google_play_notifications_id'), 'google_play_notifications', ['id'], unique=False)
+    op.create_index('ix_google_play_notifications_status_next_attempt', 'google_play_notifications',
+                    ['status', 'next_attempt_at'], unique=False)
+    op.create_index('ix_google_play_notifications_token_status', 'google_play_notifications',
+                    ['purchase_token', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_google_play_notifications_token_status', table_name='google_play_notifications')
+    op.drop_index('ix_google_play_notifications_status_next_attempt', table_name='google_play_notifications')
+    op.drop_index(op.f('ix_google_play_notifications_id'), table_name='google_play_notifications')
+    op.drop_table('google_play_notifications')
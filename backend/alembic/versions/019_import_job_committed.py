@@ -0,0 +1,28 @@
+"""track committed profit, first date and heartbeat on import jobs
+
+Revision ID: 019_import_job_committed
+Revises: 018_google_play_notifications
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '019_import_job_committed'
+down_revision: Union[str, None] = '018_google_play_notifications'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('profit_committed', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('import_jobs', sa.Column('first_date', sa.Date(), nullable=True))
+    op.add_column('import_jobs', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'updated_at')
+    op.drop_column('import_jobs', 'first_date')
+    op.drop_column('import_jobs', 'profit_committed')
@@ -1,41 +1,110 @@
+from typing import NamedTuple, Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from ..database import get_db
 from ..models.user import User
-from ..utils.security import decode_access_token
+from ..models.account import Account
+from ..models.goal import Goal, GoalStatus
+from ..models.plan import Plan
+from ..services.plan_service import get_user_plan
+from ..utils.security import decode_access_token, ACCESS_TOKEN_TYPE
 from ..config import settings
 
 security = HTTPBearer()
 
+_UNSET = object()
 
-def get_current_user(
-    credentials=Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+
+class RequestContext:
     """
-    Extrae el JWT del header Authorization, lo decodifica y retorna el usuario.
-    Si ADMIN_BYPASS_PAYMENT=true y el email coincide con ADMIN_EMAIL,
-    marca al usuario como admin (en runtime) para habilitar rutas admin.
+    Identidad de la petición resuelta una sola vez.
+
+    FastAPI cachea `get_request_context` dentro de cada petición, así que
+    `get_current_user`, `PlanPermission`/`PlanLimit` y las rutas comparten la
+    misma instancia. La cuenta llega con el usuario (joinedload); el plan y el
+    objetivo activo se consultan la primera vez que alguien los pide.
+    """
+
+    def __init__(self, db: Session, user: User):
+        self.db = db
+        self.user = user
+        self._plan: Optional[Plan] = None
+        self._active_goal = _UNSET
+
+    @property
+    def account(self) -> Optional[Account]:
+        return self.user.account
+
+    @property
+    def plan(self) -> Plan:
+        if self._plan is None:
+            self._plan = get_user_plan(self.db, self.user.id, user=self.user)
+        return self._plan
+
+    @property
+    def active_goal(self) -> Optional[Goal]:
+        if self._active_goal is _UNSET:
+            account = self.account
+            self._active_goal = None if account is None else self.db.query(Goal).filter(
+                Goal.account_id == account.id,
+                Goal.status == GoalStatus.ACTIVE
+            ).first()
+        return self._active_goal
+
+
+class TokenUser(NamedTuple):
+    """Usuario tal como viaja en los claims del access token."""
+    id: int
+    email: str
+
+
+def _is_env_admin(email: Optional[str]) -> bool:
+    return bool(
+        settings.ADMIN_BYPASS_PAYMENT and settings.ADMIN_EMAIL
+        and email and email.lower() == settings.ADMIN_EMAIL.lower()
+    )
+
+
+def get_token_payload(credentials=Depends(security)) -> dict:
     """
-    token = credentials.credentials
-    payload = decode_access_token(token)
+    Decodifica el JWT del header Authorization. Solo acepta access tokens
+    (los tokens antiguos sin `type` se tratan como access).
+    """
+    payload = decode_access_token(credentials.credentials)
 
-    if payload is None:
+    if payload is None or payload.get("type", ACCESS_TOKEN_TYPE) != ACCESS_TOKEN_TYPE:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
 
-    email = payload.get("sub")
-    if email is None:
+    if payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
 
-    user = db.query(User).filter(User.email == email).first()
+    return payload
+
+
+def get_request_context(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db)
+) -> RequestContext:
+    """
+    Carga el usuario del token (con su cuenta) una sola vez por petición.
+    Si ADMIN_BYPASS_PAYMENT=true y el email coincide con ADMIN_EMAIL,
+    marca al usuario como admin (en runtime) para habilitar rutas admin.
+    """
+    query = db.query(User).options(joinedload(User.account))
+    if payload.get("uid") is not None:
+        user = query.filter(User.id == payload["uid"]).first()
+    else:
+        user = query.filter(User.email == payload["sub"]).first()
+
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -43,8 +112,30 @@ def get_current_user(
         )
 
     # ── Admin por variable de entorno (sin tocar DB) ─────────────
-    if settings.ADMIN_BYPASS_PAYMENT and settings.ADMIN_EMAIL:
-        if user.email and user.email.lower() == settings.ADMIN_EMAIL.lower():
-            user.is_admin = True
+    if _is_env_admin(user.email):
+        user.is_admin = True
+
+    return RequestContext(db, user)
+
+
+def get_current_user(context: RequestContext = Depends(get_request_context)) -> User:
+    """Usuario autenticado de la petición (ver `get_request_context`)."""
+    return context.user
+
+
+def get_token_user(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_db)
+) -> TokenUser:
+    """
+    Usuario para rutas de solo lectura: toma el id del token firmado sin
+    consultar la DB. Solo los tokens antiguos (sin `uid`) leen el usuario.
+    Rol, bloqueo y plan no viajan en el token: las rutas que los necesitan
+    cargan el usuario (`get_current_user` / `PlanPermission`).
+    """
+    uid = payload.get("uid")
+    if uid is not None:
+        return TokenUser(id=uid, email=payload["sub"])
 
-    return user
+    context = get_request_context(payload, db)
+    return TokenUser(id=context.user.id, email=context.user.email)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 from ...database import get_db
-from ...api.deps import get_current_user
+from ...api.deps import get_current_user, TokenUser, get_token_user
 from ...models.user import User
 from ...schemas.account import AccountCreate, AccountUpdate, AccountResponse
 from ...services.account_service import create_account, get_account, update_account
@@ -21,7 +21,7 @@ def create_user_account(
 @router.get("", response_model=AccountResponse)
 def get_user_account(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     accept_language: str = Header(default="en")
 ):
     lang = "es" if "es" in accept_language.lower() else "en"
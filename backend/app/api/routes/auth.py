@@ -3,14 +3,14 @@ from sqlalchemy.orm import Session
 
 from ...database import get_db
 from ...schemas.auth import (
-    UserRegister, UserLogin, Token, 
+    UserRegister, UserLogin, Token, RefreshTokenRequest,
     GoogleOAuthLogin, FacebookOAuthLogin, OAuthResponse
 )
-from ...services.auth_service import register_user, login_user
+from ...services.auth_service import register_user, login_user, refresh_tokens
 from ...services.email_service import verify_email_token
 from ...services.oauth_google import google_oauth_login
 from ...services.oauth_facebook import facebook_oauth_login
-from ...middleware.rate_limit import check_rate_limit
+from ...middleware.rate_limit import RateLimit
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -20,7 +20,7 @@ def register(
     user_data: UserRegister,
     db: Session = Depends(get_db),
     accept_language: str = Header(default="en"),
-    _rate: None = Depends(check_rate_limit),
+    _rate: None = Depends(RateLimit("register")),
 ):
     """Registra un nuevo usuario. Envía email de verificación automáticamente."""
     lang = "es" if "es" in accept_language.lower() else "en"
@@ -32,13 +32,23 @@ def login(
     user_data: UserLogin,
     db: Session = Depends(get_db),
     accept_language: str = Header(default="en"),
-    _rate: None = Depends(check_rate_limit),
+    _rate: None = Depends(RateLimit("login")),
 ):
     """Inicia sesión con email y password."""
     lang = "es" if "es" in accept_language.lower() else "en"
     return login_user(db, user_data.email, user_data.password, lang)
 
 
+@router.post("/refresh", response_model=Token)
+def refresh(
+    refresh_data: RefreshTokenRequest,
+    db: Session = Depends(get_db),
+    _rate: None = Depends(RateLimit("refresh")),
+):
+    """Canjea el refresh token por un access token nuevo (con claims al día)."""
+    return refresh_tokens(db, refresh_data.refresh_token)
+
+
 @router.get("/verify-email")
 def verify_email(
     token: str = Query(...),
@@ -69,7 +79,7 @@ def verify_email(
 def google_login(
     oauth_data: GoogleOAuthLogin,
     db: Session = Depends(get_db),
-    _rate: None = Depends(check_rate_limit),
+    _rate: None = Depends(RateLimit("oauth")),
 ):
     """
     Login con Google OAuth.
@@ -84,7 +94,7 @@ def google_login(
 def facebook_login(
     oauth_data: FacebookOAuthLogin,
     db: Session = Depends(get_db),
-    _rate: None = Depends(check_rate_limit),
+    _rate: None = Depends(RateLimit("oauth")),
 ):
     """
     Login con Facebook OAuth.
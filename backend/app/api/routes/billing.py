@@ -9,14 +9,14 @@ from ...services.google_play_webhook_service import process_google_play_notifica
 
 from ...database import get_db
 from ...models.user import User
-from ..deps import get_current_user
+from ..deps import get_current_user, TokenUser, get_token_user
 from ...schemas.google_play import (
     VerifyPurchaseRequest,
     VerifyPurchaseResponse,
     SubscriptionStatusResponse
 )
 from ...services.google_play_service import (
-    verify_purchase,
+    verify_purchase_async,
     check_subscription_status,
     cancel_google_play_subscription
 )
@@ -25,7 +25,7 @@ router = APIRouter(prefix="/billing", tags=["billing"])
 
 
 @router.post("/verify", response_model=VerifyPurchaseResponse)
-def verify_purchase_endpoint(
+async def verify_purchase_endpoint(
     request: VerifyPurchaseRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -39,7 +39,7 @@ def verify_purchase_endpoint(
     - package_name: (opcional) Nombre del paquete Android
     """
     try:
-        result = verify_purchase(
+        result = await verify_purchase_async(
             db=db,
             user_id=current_user.id,
             purchase_token=request.purchase_token,
@@ -64,7 +64,7 @@ def verify_purchase_endpoint(
 @router.get("/status", response_model=SubscriptionStatusResponse)
 def get_subscription_status_endpoint(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """
     Obtiene el estado actual de la suscripción de Google Play del usuario.
@@ -114,6 +114,9 @@ def google_play_webhook(
     
     Configurar en Google Play Console:
     Monetize → Monetization setup → Real-time developer notifications
+
+    Solo guarda el mensaje y responde enseguida (Pub/Sub reintenta si tarda);
+    un worker lo procesa después. Las reentregas del mismo messageId se ignoran.
     """
     result = process_google_play_notification(db, notification.dict())
     return result
\ No newline at end of file
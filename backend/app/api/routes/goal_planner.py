@@ -2,14 +2,15 @@ from fastapi import APIRouter, Depends, Header
 from sqlalchemy.orm import Session
 from typing import Optional
 from ...database import get_db
-from ...api.deps import get_current_user
+from ...api.deps import get_current_user, TokenUser, get_token_user
 from ...models.user import User
 from ...schemas.goal_planner import (
     GoalCreate, GoalResponse, 
-    PlanCalculateRequest, PlanCalculateResponse
+    PlanCalculateRequest, PlanCalculateResponse,
+    PlanSimulateRequest, PlanSimulateResponse
 )
 from ...services.goal_planner_service import (
-    create_or_update_goal, get_goal, delete_goal, calculate_plan
+    create_or_update_goal, get_goal, delete_goal, calculate_plan, simulate_plan
 )
 
 router = APIRouter(prefix="/goal-planner", tags=["goal-planner"])
@@ -28,7 +29,7 @@ def create_update_goal(
 @router.get("/goal", response_model=Optional[GoalResponse])
 def get_user_goal(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     accept_language: str = Header(default="en")
 ):
     """Obtener objetivo actual del usuario"""
@@ -55,4 +56,15 @@ def calculate_trading_plan(
 ):
     """Calcular plan de trading diario y proyecciones"""
     lang = "es" if "es" in accept_language.lower() else "en"
-    return calculate_plan(db, current_user.id, plan_request, lang)
\ No newline at end of file
+    return calculate_plan(db, current_user.id, plan_request, lang)
+
+@router.post("/simulate", response_model=PlanSimulateResponse)
+def simulate_trading_plan(
+    simulate_request: PlanSimulateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    accept_language: str = Header(default="en")
+):
+    """Simular el plan (Monte Carlo) respetando las reglas de bloqueo"""
+    lang = "es" if "es" in accept_language.lower() else "en"
+    return simulate_plan(db, current_user.id, simulate_request, lang)
@@ -1,94 +1,267 @@
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import Response, StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
 import io
+import os
 from ...database import get_db
-from ...api.deps import get_current_user
-from ...models.user import User
-from ...services import report_generator_service
+from ...api.deps import RequestContext, TokenUser, get_request_context, get_token_user
+from ...services import report_cache, report_generator_service, report_jobs
+from ...utils.http_cache import http_date, is_not_modified, make_etag
+from ...schemas.reports import ReportJobResponse
+from ...middleware.plan_permissions import (
+    rate_limit_reports,
+    require_pdf_export,
+    require_excel_export,
+)
 
 router = APIRouter(prefix="/reports/goals", tags=["Goal Reports"])
 
+_EXPORT_PERMISSIONS = {"pdf": require_pdf_export, "excel": require_excel_export}
+
+
+def _require_export(format: str, context: RequestContext) -> None:
+    """PDF y Excel quedan reservados a los planes que los incluyen (403 si no)."""
+    _EXPORT_PERMISSIONS[format](context)
+
+
+def _job_response(job: report_jobs.ReportJob) -> ReportJobResponse:
+    base = f"/reports/goals/{job.goal_id}/jobs/{job.job_id}"
+    return ReportJobResponse(
+        job_id=job.job_id,
+        goal_id=job.goal_id,
+        format=job.format,
+        status=job.status,
+        error=job.error,
+        status_url=base,
+        download_url=f"{base}/download" if job.status == report_jobs.JOB_READY else None,
+    )
+
+
+def _cache_headers(etag: str, last_modified: datetime) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def _file_response(job: report_jobs.ReportJob, headers: Optional[dict] = None) -> FileResponse:
+    extension = os.path.splitext(job.path)[1]
+    report_cache.lookup(job.path)
+    return FileResponse(
+        job.path,
+        media_type=report_jobs.media_type(job.format),
+        filename=f"goal_{job.goal_id}_report{extension}",
+        headers=headers,
+    )
+
+
+@router.post("/{goal_id}/jobs", response_model=ReportJobResponse, status_code=202)
+def create_report_job(
+    goal_id: int,
+    response: Response,
+    format: str = Query(..., pattern="^(pdf|excel)$"),
+    db: Session = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user),
+    accept_language: str = Query("en", alias="Accept-Language"),
+    context: RequestContext = Depends(get_request_context),
+    rate_headers: dict = Depends(rate_limit_reports),
+):
+    """
+    Encolar la generación del reporte PDF o Excel del objetivo.
+
+    Responde al momento con el job (`pending`, o `ready` si ya existe un
+    reporte con los mismos datos); consultar `status_url` hasta que esté
+    listo y descargar desde `download_url`.
+    """
+    _require_export(format, context)
+    goal = report_generator_service.get_report_goal(db, current_user.id, goal_id)
+    job = report_jobs.enqueue_report(db, goal, format, accept_language)
+    if job.status == report_jobs.JOB_READY:
+        response.status_code = 200
+    return _job_response(job)
+
+
+@router.get("/{goal_id}/jobs/{job_id}", response_model=ReportJobResponse)
+def get_report_job(
+    goal_id: int,
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user),
+):
+    """Estado de un job de reporte: pending | ready | failed | not_found."""
+    report_generator_service.get_report_goal(db, current_user.id, goal_id)
+    return _job_response(report_jobs.get_job(goal_id, job_id))
+
+
+@router.get("/{goal_id}/jobs/{job_id}/download")
+def download_report_job(
+    goal_id: int,
+    job_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user),
+    context: RequestContext = Depends(get_request_context),
+):
+    """
+    Descargar el archivo de un job terminado (409 si aún no está listo).
+    El contenido de un job no cambia nunca (su id es la versión de los
+    datos), así que se puede cachear indefinidamente.
+    """
+    report_generator_service.get_report_goal(db, current_user.id, goal_id)
+    job = report_jobs.get_job(goal_id, job_id)
+    _require_export(job.format, context)
+    if job.status != report_jobs.JOB_READY:
+        raise HTTPException(status_code=409, detail=f"Report is not ready (status: {job.status})")
+
+    cache_headers = {
+        "ETag": make_etag(goal_id, job_id),
+        "Cache-Control": "private, max-age=31536000, immutable",
+    }
+    if is_not_modified(if_none_match, None, cache_headers["ETag"]):
+        return Response(status_code=304, headers=cache_headers)
+    return _file_response(job, headers=cache_headers)
+
+
+def _download_or_enqueue(
+    db: Session,
+    user_id: int,
+    goal_id: int,
+    fmt: str,
+    lang: str,
+    rate_headers: dict,
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+):
+    goal = report_generator_service.get_report_goal(db, user_id, goal_id)
+    version, last_modified = report_generator_service.report_data_version(db, goal)
+    job_id = report_jobs.job_id_for(fmt, lang, version)
+
+    cache_headers = _cache_headers(make_etag(goal_id, job_id), last_modified)
+    if is_not_modified(if_none_match, if_modified_since, cache_headers["ETag"], last_modified):
+        return Response(status_code=304, headers={**cache_headers, **rate_headers})
+
+    job = report_jobs.enqueue_report(db, goal, fmt, lang, version=version)
+    if job.status == report_jobs.JOB_READY:
+        return _file_response(job, headers={**cache_headers, **rate_headers})
+    return JSONResponse(
+        status_code=202,
+        content=_job_response(job).model_dump(),
+        headers=rate_headers,
+    )
+
+
 @router.get("/{goal_id}/pdf")
 def download_pdf_report(
     goal_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    accept_language: str = Query("en", alias="Accept-Language")
+    current_user: TokenUser = Depends(get_token_user),
+    accept_language: str = Query("en", alias="Accept-Language"),
+    if_none_match: Optional[str] = Header(default=None),
+    if_modified_since: Optional[str] = Header(default=None),
+    _plan = Depends(require_pdf_export),
+    rate_headers: dict = Depends(rate_limit_reports),
 ):
     """
     Descargar reporte en PDF del objetivo
-    
+
     Incluye:
-    - Resumen del objetivo y progreso
+    - Resumen del objetivo
     - Tabla de planes diarios
+    - Operaciones
     - Historial de retiros
-    - Gráficos de evolución
-    
-    **Nota:** Requiere instalar 'reportlab'
+
+    Si el reporte de los datos actuales ya existe se descarga; si no, se
+    encola y se responde 202 con el job (ver `POST /{goal_id}/jobs`).
+    Con `If-None-Match`/`If-Modified-Since` vigentes responde 304.
     """
-    pdf_bytes = report_generator_service.generate_pdf_report(
-        db, current_user.id, goal_id, accept_language
-    )
-    
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename=goal_{goal_id}_report.pdf"
-        }
+    return _download_or_enqueue(
+        db, current_user.id, goal_id, "pdf", accept_language, rate_headers,
+        if_none_match, if_modified_since,
     )
 
 @router.get("/{goal_id}/excel")
 def download_excel_report(
     goal_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    accept_language: str = Query("en", alias="Accept-Language")
+    current_user: TokenUser = Depends(get_token_user),
+    accept_language: str = Query("en", alias="Accept-Language"),
+    if_none_match: Optional[str] = Header(default=None),
+    if_modified_since: Optional[str] = Header(default=None),
+    _plan = Depends(require_excel_export),
+    rate_headers: dict = Depends(rate_limit_reports),
 ):
     """
     Descargar reporte en Excel del objetivo
-    
+
     Incluye múltiples hojas:
     - Resumen del objetivo
     - Planes diarios
+    - Operaciones
     - Retiros
-    - Métricas calculadas
-    
-    **Nota:** Requiere instalar 'openpyxl'
+
+    Si el reporte de los datos actuales ya existe se descarga; si no, se
+    encola y se responde 202 con el job (ver `POST /{goal_id}/jobs`).
+    Con `If-None-Match`/`If-Modified-Since` vigentes responde 304.
     """
-    excel_bytes = report_generator_service.generate_excel_report(
-        db, current_user.id, goal_id, accept_language
-    )
-    
-    return Response(
-        content=excel_bytes,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename=goal_{goal_id}_report.xlsx"
-        }
+    return _download_or_enqueue(
+        db, current_user.id, goal_id, "excel", accept_language, rate_headers,
+        if_none_match, if_modified_since,
     )
 
 @router.get("/{goal_id}/csv")
 def download_csv_report(
     goal_id: int,
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    accept_language: str = Query("en", alias="Accept-Language")
+    current_user: TokenUser = Depends(get_token_user),
+    accept_language: str = Query("en", alias="Accept-Language"),
+    if_none_match: Optional[str] = Header(default=None),
+    if_modified_since: Optional[str] = Header(default=None),
+    rate_headers: dict = Depends(rate_limit_reports),
 ):
     """
     Descargar reporte en CSV del objetivo
-    
-    Formato simple de planes diarios para análisis en Excel/Google Sheets
+
+    Planes diarios, operaciones y retiros para análisis en Excel/Google Sheets.
+    Se envía en streaming (comprimido con gzip si el cliente lo acepta) y se
+    guarda en la caché de reportes: mientras los datos no cambien, las
+    descargas siguientes salen del disco. Responde 304 si el cliente ya
+    tiene la versión actual.
     """
-    csv_content = report_generator_service.generate_csv_report(
-        db, current_user.id, goal_id, accept_language
-    )
-    
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=goal_{goal_id}_report.csv"
-        }
-    )
\ No newline at end of file
+    goal = report_generator_service.get_report_goal(db, current_user.id, goal_id)
+    version, last_modified = report_generator_service.report_data_version(db, goal)
+
+    # ETag fuerte distinto por content-coding: gzip e identity no son el mismo cuerpo
+    gzip_accepted = "gzip" in request.headers.get("Accept-Encoding", "").lower()
+    encoding = "gzip" if gzip_accepted else "identity"
+    cache_headers = {
+        **_cache_headers(make_etag(goal_id, "csv", version, encoding), last_modified),
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(if_none_match, if_modified_since, cache_headers["ETag"], last_modified):
+        return Response(status_code=304, headers={**cache_headers, **rate_headers})
+
+    headers = {
+        "Content-Disposition": f"attachment; filename=goal_{goal_id}_report.csv",
+        **cache_headers,
+        **rate_headers,
+    }
+    if gzip_accepted:
+        headers["Content-Encoding"] = "gzip"
+
+    # La caché guarda siempre la versión gzip (el CSV no depende del idioma)
+    path = report_cache.artifact_path(goal_id, f"csv-{version}.csv.gz")
+    if report_cache.lookup(path):
+        db.close()
+        chunks = report_cache.read_file(path, decompress=not gzip_accepted)
+    else:
+        chunks = report_cache.store_gzip_stream(
+            report_generator_service.iter_csv_report(db, goal, close_session=True),
+            path,
+            compressed=gzip_accepted,
+        )
+
+    return StreamingResponse(chunks, media_type="text/csv", headers=headers)
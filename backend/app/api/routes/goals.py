@@ -1,14 +1,17 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
-from ...database import get_db
-from ...api.deps import get_current_user
+from datetime import date
+from ...database import get_db, get_async_db
+from ...api.deps import get_current_user, TokenUser, get_token_user
 from ...models.user import User
 from ...schemas.goal_extended import (
     GoalCreateExtended, GoalUpdate, GoalResponseExtended, GoalProgressResponse
 )
 from ...schemas.daily_plan import CalendarRangeRequest, CalendarResponse, DailyPlanCloseRequest, DailyPlanResponse
 from ...services import goal_service, daily_plan_service
+from ...middleware.plan_permissions import rate_limit_writes
 
 router = APIRouter(prefix="/goals", tags=["Goals"])
 
@@ -33,7 +36,7 @@ def create_goal(
 @router.get("/", response_model=list[GoalResponseExtended])
 def get_all_goals(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     accept_language: str = Query("en", alias="Accept-Language")
 ):
     """
@@ -45,7 +48,7 @@ def get_all_goals(
 def get_goal_detail(
     goal_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     accept_language: str = Query("en", alias="Accept-Language")
 ):
     """
@@ -91,8 +94,9 @@ def delete_goal(
 def get_goal_progress(
     goal_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    accept_language: str = Query("en", alias="Accept-Language")
+    current_user: TokenUser = Depends(get_token_user),
+    accept_language: str = Query("en", alias="Accept-Language"),
+    windows: bool = Query(False, description="Incluir winrate móvil de 7/30/90 días")
 ):
     """
     Obtener progreso detallado del objetivo
@@ -101,11 +105,12 @@ def get_goal_progress(
     - Capital actual vs objetivo
     - Progreso porcentual
     - Días transcurridos
-    - Winrate real (desde inicio del objetivo)
+    - Winrate y PnL real (desde inicio del objetivo)
     - ETA (días estimados para alcanzar objetivo)
     - Factor de crecimiento diario
+    - Opcional (`windows=true`): winrate y PnL de los últimos 7/30/90 días
     """
-    return goal_service.get_goal_progress(db, current_user.id, goal_id, accept_language)
+    return goal_service.get_goal_progress(db, current_user.id, goal_id, accept_language, windows)
 
 @router.post("/{goal_id}/calendar", response_model=CalendarResponse)
 def get_goal_calendar(
@@ -113,7 +118,8 @@ def get_goal_calendar(
     range_request: Optional[CalendarRangeRequest] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    accept_language: str = Query("en", alias="Accept-Language")
+    accept_language: str = Query("en", alias="Accept-Language"),
+    _rate: dict = Depends(rate_limit_writes),  # ← puede refrescar un calendario desactualizado
 ):
     """
     Obtener almanaque (calendario) del objetivo
@@ -133,6 +139,38 @@ def get_goal_calendar(
         db, current_user.id, goal_id, range_request, accept_language
     )
 
+@router.get("/{goal_id}/calendar", response_model=CalendarResponse)
+async def get_goal_calendar_cached(
+    goal_id: int,
+    response: Response,
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    days: Optional[int] = Query(None, ge=1, le=365),
+    if_none_match: Optional[str] = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenUser = Depends(get_token_user),
+    accept_language: str = Query("en", alias="Accept-Language")
+):
+    """
+    Variante GET (solo lectura) del almanaque con soporte de caché HTTP.
+
+    Devuelve `ETag`; si el cliente envía `If-None-Match` con el mismo valor
+    y el calendario no cambió, responde **304** sin cuerpo.
+
+    **Filtros opcionales (query):** from_date + to_date, o days.
+    """
+    range_request = CalendarRangeRequest(from_date=from_date, to_date=to_date, days=days)
+    etag, calendar = await daily_plan_service.get_calendar_if_modified_async(
+        db, current_user.id, goal_id, range_request, if_none_match, accept_language
+    )
+
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if calendar is None:
+        return Response(status_code=304, headers=cache_headers)
+
+    response.headers.update(cache_headers)
+    return calendar
+
 @router.post("/{goal_id}/close-day", response_model=DailyPlanResponse)
 def close_goal_day(
     goal_id: int,
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+from typing import List
+
+from ...database import get_db
+from ...api.deps import RequestContext, get_request_context, TokenUser, get_token_user
+from ...schemas.imports import ImportJobResponse
+from ...services import import_service
+from ...middleware.plan_permissions import rate_limit_writes
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+
+@router.post("", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def upload_import(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    context: RequestContext = Depends(get_request_context),
+    _rate: dict = Depends(rate_limit_writes),  # ← Token bucket por usuario
+):
+    """
+    Importa el historial de operaciones exportado por el broker.
+
+    Acepta CSV con cabecera o JSON (array de objetos o un objeto por línea)
+    con las columnas `date` (o `opened_at`), `result`, `amount` y, opcionales,
+    `time`, `session`, `risk_percent`, `profit` y `comment`.
+    El archivo se procesa en segundo plano: consultar `GET /imports/{id}`
+    para ver el progreso y los errores por fila.
+    """
+    if context.account is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
+
+    return import_service.create_import_job(
+        db, context.user.id, context.account, file.file, file.filename, file.content_type
+    )
+
+
+@router.get("", response_model=List[ImportJobResponse])
+def list_imports(
+    db: Session = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user),
+):
+    """Últimas importaciones del usuario."""
+    return import_service.list_import_jobs(db, current_user.id)
+
+
+@router.get("/{job_id}", response_model=ImportJobResponse)
+def get_import(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user),
+):
+    """Estado y progreso de una importación."""
+    return import_service.get_import_job(db, current_user.id, job_id)
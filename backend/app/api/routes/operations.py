@@ -1,15 +1,19 @@
 from fastapi import APIRouter, Depends, Header, Query, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 
-from ...database import get_db
-from ...api.deps import get_current_user
-from ...models.user import User
+from ...database import get_db, get_async_db
+from ...api.deps import RequestContext, get_request_context, TokenUser, get_token_user
 from ...models.operation import Operation
 from ...models.trading_session import TradingSession
-from ...schemas.operation import OperationCreate, OperationResponse
-from ...services.operation_service import create_operation, get_operations_by_session
-from ...middleware.plan_permissions import get_operation_limit
+from ...schemas.operation import (
+    OperationBatchCreate, OperationBatchResponse, OperationCreate, OperationResponse
+)
+from ...services.operation_service import (
+    create_operation, create_operations_batch, get_operations_by_session_async
+)
+from ...middleware.plan_permissions import get_operation_limit, rate_limit_writes
 
 router = APIRouter(prefix="/operations", tags=["operations"])
 
@@ -18,9 +22,10 @@ router = APIRouter(prefix="/operations", tags=["operations"])
 def add_operation(
     operation_data: OperationCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    context: RequestContext = Depends(get_request_context),
     accept_language: str = Header(default="en"),
     plan_and_limit: tuple = Depends(get_operation_limit),  # ← Plan limit
+    _rate: dict = Depends(rate_limit_writes),  # ← Token bucket por usuario
 ):
     """
     Crea una nueva operación.
@@ -50,14 +55,50 @@ def add_operation(
                 }
             )
     
-    return create_operation(db, current_user.id, operation_data, lang)
+    return create_operation(
+        db, context.user.id, operation_data, lang, session=session, context=context
+    )
+
+
+@router.post("/batch", response_model=OperationBatchResponse)
+def add_operations_batch(
+    batch: OperationBatchCreate,
+    db: Session = Depends(get_db),
+    context: RequestContext = Depends(get_request_context),
+    accept_language: str = Header(default="en"),
+    plan_and_limit: tuple = Depends(get_operation_limit),  # ← Plan limit
+    _rate: dict = Depends(rate_limit_writes),  # ← Token bucket por usuario
+):
+    """
+    Registra varias operaciones (de una o más sesiones) en una sola petición.
+
+    Se validan en orden, como si se enviaran una a una: límite del plan
+    (max_ops_per_session), día bloqueado (también por las pérdidas o el
+    drawdown que acumula el propio lote) y sesión bloqueada por pérdidas.
+    Las válidas se guardan juntas; las rechazadas vuelven en `errors` con
+    su índice en el lote. El capital y el calendario del objetivo se
+    actualizan una sola vez.
+    """
+    _, max_ops = plan_and_limit
+    lang = "es" if "es" in accept_language.lower() else "en"
+
+    try:
+        created, errors = create_operations_batch(db, context, batch.operations, max_ops, lang)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+    return OperationBatchResponse(
+        created=created,
+        errors=errors,
+        capital=float(context.account.capital or 0),
+    )
 
 
 @router.get("", response_model=List[OperationResponse])
-def get_session_operations(
+async def get_session_operations(
     session_id: int = Query(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Obtiene las operaciones de una sesión."""
-    return get_operations_by_session(db, session_id, current_user.id)
\ No newline at end of file
+    return await get_operations_by_session_async(db, session_id, current_user.id)
\ No newline at end of file
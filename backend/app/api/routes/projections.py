@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from ...database import get_db
-from ...api.deps import get_current_user
-from ...models.user import User
+from ...api.deps import TokenUser, get_token_user
 from ...schemas.reports import ProjectionResponse
 from ...services.projections_service import get_projections
 
@@ -12,6 +11,6 @@ router = APIRouter(prefix="/projections", tags=["projections"])
 def get_capital_projections(
     days: int = Query(15, ge=1, le=60),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_token_user)
 ):
     return get_projections(db, current_user.id, days)
\ No newline at end of file
@@ -1,35 +1,38 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
 from io import BytesIO
 
-from ...database import get_db
-from ...api.deps import get_current_user
+from ...database import get_db, get_async_db
+from ...api.deps import get_current_user, TokenUser, get_token_user
 from ...models.user import User
 from ...schemas.reports import ReportResponse
-from ...services.reports_service import get_reports
+from ...services.plan_service import get_user_plan_async
+from ...services.reports_service import get_reports_async
 from ...middleware.plan_permissions import (
     require_pdf_export,
     require_excel_export,
-    get_history_limit
+    rate_limit_reports,
 )
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 
 @router.get("", response_model=ReportResponse)
-def get_trading_reports(
+async def get_trading_reports(
     days: int = Query(7, ge=1, le=365),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-    plan_and_limit: tuple = Depends(get_history_limit),  # ← Plan limit
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenUser = Depends(get_token_user),
 ):
     """
     Obtiene reportes de trading.
     Protegido por límite de plan: history_days.
+    Usuario (token) y plan (caché o sesión async) no usan el pool sync.
     """
-    plan, max_history_days = plan_and_limit
+    plan = await get_user_plan_async(db, current_user.id)
+    max_history_days = plan.get_feature("history_days", 0)
     
     # Limitar días según el plan
     if days > max_history_days:
@@ -44,7 +47,7 @@ def get_trading_reports(
             }
         )
     
-    return get_reports(db, current_user.id, days)
+    return await get_reports_async(db, current_user.id, days)
 
 
 @router.get("/export/pdf")
@@ -53,6 +56,7 @@ def export_report_pdf(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     _plan = Depends(require_pdf_export),  # ← Requiere plan con PDF export
+    _rate: dict = Depends(rate_limit_reports),
 ):
     """
     Exporta reporte en PDF.
@@ -73,6 +77,7 @@ def export_report_excel(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     _plan = Depends(require_excel_export),  # ← Requiere plan con Excel export
+    _rate: dict = Depends(rate_limit_reports),
 ):
     """
     Exporta reporte en Excel.
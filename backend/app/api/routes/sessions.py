@@ -1,17 +1,16 @@
 from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import date
 
-from ...database import get_db
-from ...api.deps import get_current_user
-from ...models.user import User
-from ...models.account import Account
+from ...database import get_db, get_async_db
+from ...api.deps import RequestContext, get_request_context, TokenUser, get_token_user
 from ...models.trading_day import TradingDay
 from ...models.trading_session import TradingSession
 from ...schemas.session import SessionCreate, SessionResponse
-from ...services.session_service import create_session, get_sessions_today
-from ...middleware.plan_permissions import get_session_limit
+from ...services.session_service import create_session, get_sessions_today_async
+from ...middleware.plan_permissions import get_session_limit, rate_limit_writes
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
@@ -20,9 +19,10 @@ router = APIRouter(prefix="/sessions", tags=["sessions"])
 def create_trading_session(
     session_data: SessionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    context: RequestContext = Depends(get_request_context),
     accept_language: str = Header(default="en"),
     plan_and_limit: tuple = Depends(get_session_limit),  # ← Plan limit
+    _rate: dict = Depends(rate_limit_writes),  # ← Token bucket por usuario
 ):
     """
     Crea una nueva sesión de trading.
@@ -32,7 +32,7 @@ def create_trading_session(
     lang = "es" if "es" in accept_language.lower() else "en"
     
     # Verificar límite del plan
-    account = db.query(Account).filter(Account.user_id == current_user.id).first()
+    account = context.account
     if account:
         today = date.today()
         trading_day = db.query(TradingDay).filter(
@@ -56,13 +56,13 @@ def create_trading_session(
                     }
                 )
     
-    return create_session(db, current_user.id, session_data, lang)
+    return create_session(db, context.user.id, session_data, lang, account=account)
 
 
 @router.get("", response_model=List[SessionResponse])
-def get_today_sessions(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_today_sessions(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     """Obtiene las sesiones de hoy del usuario."""
-    return get_sessions_today(db, current_user.id)
\ No newline at end of file
+    return await get_sessions_today_async(db, current_user.id)
\ No newline at end of file
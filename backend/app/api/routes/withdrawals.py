@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 from ...database import get_db
-from ...api.deps import get_current_user
+from ...api.deps import get_current_user, TokenUser, get_token_user
 from ...models.user import User
 from ...schemas.withdrawal import (
     WithdrawalCreate, WithdrawalResponse, WithdrawalListResponse
@@ -37,7 +37,7 @@ def get_withdrawals(
     goal_id: Optional[int] = Query(None, description="Filtrar por objetivo específico"),
     limit: int = Query(100, ge=1, le=500, description="Número máximo de retiros a retornar"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     accept_language: str = Query("en", alias="Accept-Language")
 ):
     """
@@ -55,7 +55,7 @@ def get_withdrawals(
 def get_withdrawal_detail(
     withdrawal_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: TokenUser = Depends(get_token_user),
     accept_language: str = Query("en", alias="Accept-Language")
 ):
     """
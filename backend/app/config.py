@@ -10,6 +10,24 @@ class Settings(BaseSettings):
     # Cadena de conexión a la DB (PostgreSQL, etc.)
     DATABASE_URL: str
 
+    # URL para el motor async (vacío = DATABASE_URL con driver asyncpg/aiosqlite)
+    ASYNC_DATABASE_URL: str = ""
+
+    # Pool de conexiones (por proceso: multiplicar por el número de workers)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEC: int = 30
+
+    # Reciclar conexiones más viejas que esto (segundos) y comprobarlas antes de usarlas
+    DB_POOL_RECYCLE_SEC: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Detrás de PgBouncer (modo transacción): sin prepared statements en asyncpg
+    DB_PGBOUNCER_MODE: bool = False
+
+    # Sin pool propio (NullPool): cada sesión abre/cierra conexión, PgBouncer hace de pool
+    DB_USE_NULL_POOL: bool = False
+
     # ============================================================
     # JWT / AUTENTICACIÓN
     # ============================================================
@@ -20,8 +38,21 @@ class Settings(BaseSettings):
     # Algoritmo de firma de JWT
     ALGORITHM: str = "HS256"
 
-    # Expiración del token en minutos (10080 = 7 días)
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080
+    # Expiración del access token en minutos (corto: se renueva con el refresh
+    # token, y las rutas con get_token_user no vuelven a leer el usuario)
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # Expiración del refresh token en minutos (10080 = 7 días)
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 10080
+
+    # Coste de bcrypt (2^N rondas). Si cambia, cada hash se rehace en el próximo login
+    BCRYPT_ROUNDS: int = 12
+
+    # Procesos dedicados a bcrypt y hashes que pueden esperar turno (el resto recibe 503).
+    # 0 procesos = hashear en el hilo que llama (scripts de mantenimiento)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    PASSWORD_HASH_TIMEOUT_SEC: int = 10
 
     # ============================================================
     # RATE LIMITING (PROTECCIÓN CONTRA FUERZA BRUTA)
@@ -33,6 +64,82 @@ class Settings(BaseSettings):
     # Ventana de tiempo (segundos) para el rate limit (300 = 5 min)
     RATE_LIMIT_LOGIN_WINDOW_SEC: int = 300
 
+    # Registros por IP (3600 = 1 hora)
+    RATE_LIMIT_REGISTER_MAX: int = 5
+    RATE_LIMIT_REGISTER_WINDOW_SEC: int = 3600
+
+    # Logins con Google/Facebook por IP
+    RATE_LIMIT_OAUTH_MAX: int = 20
+    RATE_LIMIT_OAUTH_WINDOW_SEC: int = 300
+
+    # Canjes de refresh token por IP
+    RATE_LIMIT_REFRESH_MAX: int = 30
+    RATE_LIMIT_REFRESH_WINDOW_SEC: int = 300
+
+    # Token bucket por usuario en escrituras (operaciones, sesiones, calendario)
+    # y en descargas de reportes. Valores por defecto si el plan no define
+    # rate_writes_per_minute/rate_writes_burst o rate_reports_per_hour/rate_reports_burst
+    RATE_LIMIT_WRITES_PER_MINUTE: int = 30
+    RATE_LIMIT_WRITES_BURST: int = 10
+    RATE_LIMIT_REPORTS_PER_HOUR: int = 20
+    RATE_LIMIT_REPORTS_BURST: int = 5
+
+    # Dónde se guarda el estado: memory (por proceso), sql o redis (compartidos)
+    RATE_LIMIT_BACKEND: str = "memory"
+
+    # Solo con RATE_LIMIT_BACKEND=redis (ej: redis://localhost:6379/0)
+    RATE_LIMIT_REDIS_URL: str = ""
+
+    # ============================================================
+    # CACHÉ DE PLANES (EN MEMORIA, POR PROCESO)
+    # ============================================================
+
+    # Segundos que se reutiliza el catálogo de planes (tabla plans)
+    PLAN_CACHE_TTL_SEC: int = 300
+
+    # Segundos que se reutiliza el plan efectivo de cada usuario
+    USER_PLAN_CACHE_TTL_SEC: int = 30
+
+    # ============================================================
+    # REPORTES PDF/EXCEL (JOBS EN SEGUNDO PLANO)
+    # ============================================================
+
+    # Carpeta donde se guardan los reportes generados (compartida por los workers)
+    REPORTS_DIR: str = "./report_artifacts"
+
+    # Hilos que renderizan reportes y máximo de builds en cola por proceso
+    REPORT_JOB_WORKERS: int = 2
+    REPORT_JOB_MAX_PENDING: int = 50
+
+    # Segundos tras los que un build sin terminar se da por abandonado
+    REPORT_JOB_STALE_SEC: int = 600
+
+    # Tamaño máximo de REPORTS_DIR; se expulsan primero los reportes menos usados
+    REPORT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
+    # Filas por sección en el PDF: reportlab guarda todas las páginas hasta
+    # `save()`, así que su memoria crece con las filas (Excel y CSV no tienen tope)
+    REPORT_PDF_MAX_ROWS: int = 5000
+
+    # ============================================================
+    # IMPORTACIÓN DE HISTORIAL DEL BROKER (JOBS EN SEGUNDO PLANO)
+    # ============================================================
+
+    # Carpeta donde se guardan los archivos subidos hasta procesarlos
+    IMPORTS_DIR: str = "./imports"
+
+    # Tamaño máximo del archivo, filas por lote (INSERT + commit) e hilos
+    IMPORT_MAX_BYTES: int = 50 * 1024 * 1024
+    IMPORT_CHUNK_ROWS: int = 1000
+    IMPORT_JOB_WORKERS: int = 1
+
+    # Errores por fila que se guardan en el job (el resto solo se cuentan)
+    IMPORT_MAX_ERRORS_KEPT: int = 100
+
+    # Segundos sin latido (un lote confirmado) tras los que un job pendiente o en
+    # curso se da por abandonado; debe superar lo que tarda un lote
+    IMPORT_JOB_STALE_SEC: int = 900
+
     # ============================================================
     # CORS (DOMINIOS PERMITIDOS PARA ACCEDER AL BACKEND)
     # ============================================================
@@ -55,6 +162,23 @@ class Settings(BaseSettings):
     SMTP_USER: str = ""
     SMTP_PASS: str = ""
 
+    # STARTTLS antes del login (desactivar solo para un SMTP local de pruebas)
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT_SEC: int = 30
+
+    # La conexión SMTP del worker se reutiliza; se cierra tras este tiempo sin enviar
+    SMTP_IDLE_TIMEOUT_SEC: int = 60
+
+    # Worker del outbox: emails por lote, espera entre sondeos y reintentos
+    EMAIL_OUTBOX_WORKER: bool = True
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SEC: int = 5
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+
+    # Backoff exponencial entre reintentos: base * 2^(intento-1), con tope
+    EMAIL_OUTBOX_BACKOFF_BASE_SEC: int = 30
+    EMAIL_OUTBOX_BACKOFF_MAX_SEC: int = 3600
+
     # ============================================================
     # FRONTEND
     # ============================================================
@@ -71,6 +195,24 @@ class Settings(BaseSettings):
     FACEBOOK_APP_ID: str = ""
     FACEBOOK_APP_SECRET: str = ""
 
+    # Claves públicas de Google para verificar el ID token localmente (JWKS)
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+
+    # JWKS: TTL si la respuesta no trae Cache-Control, mínimo entre descargas
+    # (un `kid` desconocido no puede forzar una descarga por petición) y máximo de claves
+    OAUTH_JWKS_DEFAULT_TTL_SEC: int = 3600
+    OAUTH_JWKS_MIN_REFRESH_SEC: int = 30
+    OAUTH_JWKS_MAX_KEYS: int = 16
+
+    # Graph API de Facebook y caché de tokens ya verificados (por proceso)
+    FACEBOOK_GRAPH_URL: str = "https://graph.facebook.com"
+    FACEBOOK_TOKEN_CACHE_TTL_SEC: int = 300
+    FACEBOOK_TOKEN_CACHE_MAX: int = 1024
+
+    # Cliente HTTP compartido hacia los proveedores (conexiones keep-alive por host)
+    OAUTH_HTTP_TIMEOUT_SEC: int = 5
+    OAUTH_HTTP_POOL_SIZE: int = 10
+
     # ============================================================
     # GOOGLE PLAY BILLING (SI APLICA)
     # ============================================================
@@ -78,6 +220,20 @@ class Settings(BaseSettings):
     GOOGLE_PLAY_SERVICE_ACCOUNT_JSON: str = ""
     GOOGLE_PLAY_PACKAGE_NAME: str = ""
 
+    # Base de la Android Publisher API (cambiar solo para un stub local) y timeout por llamada
+    GOOGLE_PLAY_API_URL: str = "https://androidpublisher.googleapis.com/"
+    GOOGLE_PLAY_TIMEOUT_SEC: int = 10
+
+    # Worker de notificaciones RTDN: notificaciones por lote, espera entre sondeos y reintentos
+    GOOGLE_PLAY_RTDN_WORKER: bool = True
+    GOOGLE_PLAY_RTDN_BATCH_SIZE: int = 50
+    GOOGLE_PLAY_RTDN_POLL_SEC: int = 5
+    GOOGLE_PLAY_RTDN_MAX_ATTEMPTS: int = 10
+
+    # Backoff exponencial entre reintentos: base * 2^(intento-1), con tope
+    GOOGLE_PLAY_RTDN_BACKOFF_BASE_SEC: int = 30
+    GOOGLE_PLAY_RTDN_BACKOFF_MAX_SEC: int = 3600
+
     # ============================================================
     # ADMIN / BYPASS DE PAGO (PARA PRUEBAS INTERNAS)
     # ============================================================
@@ -1,9 +1,142 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from uuid import uuid4
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+
+# ── Métricas del pool ─────────────────────────────────────────
+# Tiempo que cada checkout espera en la cola por una conexión libre (sin
+# contar la apertura de conexiones nuevas) y cuántos agotan
+# DB_POOL_TIMEOUT_SEC. Junto con size/checked-out/overflow del pool
+# permite dimensionarlo a partir de datos (ver /health/db).
+
+class PoolWaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _MeteredPoolMixin:
+    """Contadores propios de cada pool (sync y async por separado)."""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self):
+        # engine.dispose() crea un pool nuevo: se conservan los contadores
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        record.info["_metered_connect_sec"] = time.perf_counter() - started
+        return record
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        # Abrir una conexión nueva (overflow) no es espera en la cola
+        connect = record.info.pop("_metered_connect_sec", 0.0)
+        self.wait_stats.record(max(time.perf_counter() - started - connect, 0.0))
+        return record
+
+
+class MeteredQueuePool(_MeteredPoolMixin, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, is_async: bool) -> dict:
+    """
+    Parámetros del pool según `Settings`. Con DB_USE_NULL_POOL (p. ej. detrás
+    de PgBouncer en modo transacción) cada sesión abre y cierra su conexión y
+    PgBouncer hace de pool; DB_PGBOUNCER_MODE además desactiva los prepared
+    statements de asyncpg, que no sobreviven al cambio de conexión del servidor.
+    """
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    if settings.DB_PGBOUNCER_MODE and is_async and url.startswith("postgresql"):
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+
+    if url.startswith("sqlite"):
+        return options
+
+    if settings.DB_USE_NULL_POOL:
+        options["poolclass"] = NullPool
+        return options
+
+    options.update(
+        poolclass=MeteredAsyncQueuePool if is_async else MeteredQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SEC,
+        pool_recycle=settings.DB_POOL_RECYCLE_SEC,
+    )
+    return options
+
+
+def pool_status(pool) -> dict:
+    """Estado instantáneo del pool (vacío con NullPool) + esperas acumuladas."""
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+
+    status = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+    if isinstance(pool, _MeteredPoolMixin):
+        status["max_overflow"] = pool.max_overflow
+        status.update(pool.wait_stats.snapshot())
+    return status
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL, is_async=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -12,4 +145,31 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ── Motor async (rutas de lectura calientes) ──────────────────
+# Misma base de datos con driver async: asyncpg para PostgreSQL,
+# aiosqlite para SQLite (tests / desarrollo local).
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Traduce DATABASE_URL al driver async equivalente."""
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+_async_url = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(_async_url, **_engine_options(_async_url, is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,8 +1,16 @@
 import logging
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 from .config import settings
+from .database import engine, async_engine, get_db, pool_status
 from .middleware.error_handler import GlobalErrorMiddleware
+from .services import email_outbox_service, google_play_service, google_play_webhook_service
+from .utils.http_client import close_http_session
 from .api.routes import billing
 
 # ── Routers existentes ────────────────────────
@@ -17,7 +25,8 @@ from .api.routes import (
     withdrawals,
     goal_reports,
     goal_planner,
-    admin
+    admin,
+    imports
 )
 # Routers del módulo Goals
 from .api.routes import goals, withdrawals, goal_reports
@@ -29,11 +38,26 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 
+# ── Workers en segundo plano ──────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    email_outbox_service.start_worker()
+    google_play_webhook_service.start_worker()
+    try:
+        yield
+    finally:
+        email_outbox_service.stop_worker()
+        google_play_webhook_service.stop_worker()
+        close_http_session()
+        await google_play_service.close_async_client()
+
+
 # ── App ───────────────────────────────────────
 app = FastAPI(
     title="Binary Options Capital Manager",
     version="1.1.0",
     description="API — Capital Manager SaaS",
+    lifespan=lifespan,
 )
 
 # ── CORS RESTRICTIVO ──────────────────────────
@@ -63,6 +87,7 @@ app.include_router(goal_reports.router)
 app.include_router(goal_planner.router)
 app.include_router(admin.router)
 app.include_router(billing.router)
+app.include_router(imports.router)
 
 # ── Health / Root ─────────────────────────────
 @app.get("/")
@@ -73,4 +98,36 @@ def read_root():
 @app.get("/health")
 def health():
     """Endpoint de salud para load-balancers."""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/health/db")
+def health_db():
+    """
+    Salud de la base de datos + estado de los pools (sync y async):
+    conexiones en uso, overflow y espera por checkout.
+    """
+    started = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        db_status = "ok"
+    except Exception as exc:
+        logging.getLogger("app.health").error("DB health check failed: %s", exc)
+        db_status = "error"
+
+    body = {
+        "status": db_status,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        "pools": {
+            "sync": pool_status(engine.pool),
+            "async": pool_status(async_engine.pool),
+        },
+    }
+    return JSONResponse(status_code=200 if db_status == "ok" else 503, content=body)
+
+
+@app.get("/health/email")
+def health_email(db: Session = Depends(get_db)):
+    """Profundidad de la cola de emails (outbox): pendientes, vencidos, fallidos."""
+    return email_outbox_service.queue_depth(db)
@@ -2,6 +2,10 @@
 Middleware global de manejo de errores.
 Captura HTTPException y Exception para retornar JSON uniforme.
 Evita que los 500 filtren stack-traces en producción.
+
+Es un middleware ASGI puro (no `BaseHTTPMiddleware`): no envuelve cada
+respuesta en una tarea + cola intermedia, así que no añade latencia por
+petición ni rompe el streaming de `StreamingResponse`.
 """
 
 import logging
@@ -10,48 +14,82 @@ from datetime import datetime
 
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger("app.error_handler")
 
 
-class GlobalErrorMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        try:
-            response = await call_next(request)
-            return response
-
-        except HTTPException as http_exc:
-            # HTTPException ya tiene status + detail
-            # La envolvemos en formato JSON uniforme
-            detail = http_exc.detail
-            if isinstance(detail, dict):
-                body = detail
-            else:
-                body = {"error": "http_error", "message": str(detail)}
+def http_exception_response(request: Request, http_exc: HTTPException) -> JSONResponse:
+    # HTTPException ya tiene status + detail
+    # La envolvemos en formato JSON uniforme
+    detail = http_exc.detail
+    if isinstance(detail, dict):
+        body = dict(detail)
+    else:
+        body = {"error": "http_error", "message": str(detail)}
+
+    body.setdefault("timestamp", datetime.utcnow().isoformat())
+    body.setdefault("path", str(request.url.path))
+
+    logger.warning(
+        "HTTP %d — %s — %s",
+        http_exc.status_code,
+        request.url.path,
+        detail,
+    )
+    return JSONResponse(
+        status_code=http_exc.status_code,
+        content=body,
+        headers=getattr(http_exc, "headers", None),
+    )
+
+
+def unhandled_exception_response(request: Request) -> JSONResponse:
+    # Error no controlado → 500
+    trace = traceback.format_exc()
+    logger.error("UNHANDLED 500 — %s — %s", request.url.path, trace)
 
-            body.setdefault("timestamp", datetime.utcnow().isoformat())
-            body.setdefault("path", str(request.url.path))
+    return JSONResponse(
+        status_code=500,
+        content={
+            "error": "internal_server_error",
+            "message": "An unexpected error occurred. Please try again later.",
+            "timestamp": datetime.utcnow().isoformat(),
+            "path": str(request.url.path),
+        },
+    )
 
-            logger.warning(
-                "HTTP %d — %s — %s",
-                http_exc.status_code,
-                request.url.path,
-                detail,
-            )
-            return JSONResponse(status_code=http_exc.status_code, content=body)
 
+class GlobalErrorMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
-            # Error no controlado → 500
-            trace = traceback.format_exc()
-            logger.error("UNHANDLED 500 — %s — %s", request.url.path, trace)
-
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "error": "internal_server_error",
-                    "message": "An unexpected error occurred. Please try again later.",
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "path": str(request.url.path),
-                },
-            )
\ No newline at end of file
+            if response_started:
+                # Ya se enviaron cabeceras (p. ej. un stream que falla a mitad):
+                # no se puede cambiar el status, solo registrar y cortar.
+                logger.error("UNHANDLED after response started — %s — %s",
+                             scope.get("path"), traceback.format_exc())
+                raise
+
+            request = Request(scope)
+            if isinstance(exc, HTTPException):
+                response = http_exception_response(request, exc)
+            else:
+                response = unhandled_exception_response(request)
+            await response(scope, receive, send)
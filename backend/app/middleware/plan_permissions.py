@@ -2,14 +2,14 @@
 Middleware para validar permisos basados en el plan del usuario.
 """
 
-from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import math
 
-from ..database import get_db
-from ..models.user import User
+from fastapi import Depends, HTTPException, Response, status
+
+from ..config import settings
 from ..models.plan import Plan
-from ..api.deps import get_current_user
-from ..services.plan_service import get_user_plan
+from ..api.deps import RequestContext, get_request_context
+from ..middleware import rate_limit
 
 
 class PlanPermission:
@@ -26,11 +26,10 @@ class PlanPermission:
     
     def __call__(
         self,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        context: RequestContext = Depends(get_request_context)
     ) -> Plan:
         """Verifica si el usuario tiene el permiso requerido."""
-        plan = get_user_plan(db, current_user.id)
+        plan = context.plan
         
         feature_value = plan.get_feature(self.required_feature)
         
@@ -60,16 +59,61 @@ class PlanLimit:
     
     def __call__(
         self,
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        context: RequestContext = Depends(get_request_context)
     ) -> tuple[Plan, int]:
         """Retorna el plan y el límite numérico."""
-        plan = get_user_plan(db, current_user.id)
+        plan = context.plan
         limit = plan.get_feature(self.limit_feature, 0)
         
         return plan, limit
 
 
+class PlanRateLimit:
+    """
+    Token bucket por usuario con tasa y ráfaga tomadas de plan.features.
+
+    La ráfaga es la capacidad del bucket y la tasa lo rellena cada
+    `per_seconds`; se guarda en el backend del rate-limiter como GCRA
+    (límite = ráfaga, ventana = tiempo de rellenar el bucket entero).
+    Añade las cabeceras RateLimit-Limit/-Remaining/-Reset a la respuesta y
+    las devuelve para las rutas que construyen su propio `Response`.
+    """
+    
+    def __init__(self, bucket: str, rate_feature: str, burst_feature: str, per_seconds: int,
+                 default_rate: int, default_burst: int):
+        self.bucket = bucket
+        self.rate_feature = rate_feature
+        self.burst_feature = burst_feature
+        self.per_seconds = per_seconds
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+    
+    def __call__(
+        self,
+        response: Response,
+        context: RequestContext = Depends(get_request_context)
+    ) -> dict:
+        plan = context.plan
+        rate = plan.get_feature(self.rate_feature, self.default_rate)
+        burst = plan.get_feature(self.burst_feature, self.default_burst)
+        if not rate or not burst:
+            return {}  # 0 = sin límite
+        
+        result = rate_limit.backend.hit(
+            f"{self.bucket}:user:{context.user.id}", burst, burst * self.per_seconds / rate
+        )
+        headers = {
+            "RateLimit-Limit": str(burst),
+            "RateLimit-Remaining": str(result.remaining),
+            "RateLimit-Reset": str(math.ceil(result.reset_after)),
+        }
+        if not result.allowed:
+            rate_limit.raise_rate_limited(result.retry_after, headers)
+        
+        response.headers.update(headers)
+        return headers
+
+
 # ── Dependencias preconstruidas para usar en routes ──────────────
 
 # Permisos booleanos
@@ -82,4 +126,14 @@ require_withdrawal_recalc = PlanPermission("can_recalculate_withdrawals", True)
 get_session_limit = PlanLimit("max_daily_sessions")
 get_operation_limit = PlanLimit("max_ops_per_session")
 get_goal_limit = PlanLimit("max_active_goals")
-get_history_limit = PlanLimit("history_days")
\ No newline at end of file
+get_history_limit = PlanLimit("history_days")
+
+# Token buckets por usuario (retornan las cabeceras RateLimit-*)
+rate_limit_writes = PlanRateLimit(
+    "writes", "rate_writes_per_minute", "rate_writes_burst", 60,
+    settings.RATE_LIMIT_WRITES_PER_MINUTE, settings.RATE_LIMIT_WRITES_BURST,
+)
+rate_limit_reports = PlanRateLimit(
+    "reports", "rate_reports_per_hour", "rate_reports_burst", 3600,
+    settings.RATE_LIMIT_REPORTS_PER_HOUR, settings.RATE_LIMIT_REPORTS_BURST,
+)
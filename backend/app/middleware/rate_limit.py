@@ -1,59 +1,286 @@
 """
-Rate-limiter en memoria para /auth/login y /auth/register.
-Estructura: { IP → deque([timestamps]) }
+Rate-limiter con backends intercambiables (RATE_LIMIT_BACKEND).
 
-NOTA: En producción multi-worker usar Redis.
-Para desarrollo/single-worker esto funciona bien.
+- memory: GCRA en memoria del proceso, con purga de claves inactivas.
+  Sirve para desarrollo/single-worker: con N workers el límite efectivo es N veces.
+- sql:    GCRA en la tabla `rate_limit_buckets`, compartido entre workers.
+- redis:  ventana deslizante aproximada (dos contadores por clave) en Redis.
+
+Todos guardan O(1) por clave. Cada ruta usa una política con nombre
+(`POLICIES`) y se protege con `Depends(RateLimit("login"))`.
 """
 
-import time
+import math
 import threading
-from collections import defaultdict, deque
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
 from fastapi import Request, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 
 from ..config import settings
 
 
-class RateLimiter:
-    """Limiter genérico con ventana deslizante."""
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float  # segundos hasta poder repetir (0 si se permitió)
+    reset_after: float  # segundos hasta recuperar el cupo completo
 
-    def __init__(self, max_requests: int, window_seconds: int):
-        self.max_requests = max_requests
-        self.window = window_seconds
-        self._store: dict[str, deque] = defaultdict(deque)
+
+class RateLimitPolicy(NamedTuple):
+    max_requests: int
+    window_seconds: int
+
+
+def gcra(tat: Optional[float], now: float, limit: int, window: float) -> tuple[RateLimitResult, Optional[float]]:
+    """
+    Generic Cell Rate Algorithm: `limit` peticiones por `window` segundos
+    guardando un solo número por clave (theoretical arrival time).
+    Devuelve el resultado y el nuevo TAT (None si la petición se rechaza).
+    """
+    interval = window / limit
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    allow_at = new_tat - window
+
+    if now < allow_at:
+        return RateLimitResult(False, 0, allow_at - now, tat - now), None
+
+    remaining = int(round((window - (new_tat - now)) / interval, 6))
+    return RateLimitResult(True, remaining, 0.0, new_tat - now), new_tat
+
+
+# ── Backends ───────────────────────────────────────
+
+class MemoryBackend:
+    """
+    GCRA en memoria. Cada `sweep_every` peticiones purga las claves cuyo TAT
+    ya pasó (equivalen a claves nuevas). Además guarda como mucho `max_keys`
+    claves: pasado el tope se descartan las usadas hace más tiempo (LRU), así
+    rotar X-Forwarded-For no hace crecer la memoria ni el coste de cada `hit`.
+    """
+
+    def __init__(self, max_keys: int = 100_000, sweep_every: int = 1_000):
+        self.max_keys = max_keys
+        self.sweep_every = sweep_every
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._hits = 0
         self._lock = threading.Lock()
 
-    def is_allowed(self, key: str) -> bool:
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        with self._lock:
+            result, new_tat = gcra(self._tats.get(key), now, limit, window)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+                while len(self._tats) > self.max_keys:
+                    self._tats.popitem(last=False)
+
+            self._hits += 1
+            if self._hits % self.sweep_every == 0:
+                self._evict(now)
+        return result
+
+    def peek(self, key: str, limit: int, window: float) -> int:
         now = time.time()
-        cutoff = now - self.window
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+        return max(0, min(limit, int(round((window - (tat - now)) / (window / limit), 6))))
 
+    def _evict(self, now: float) -> None:
+        expired = [key for key, tat in self._tats.items() if tat <= now]
+        for key in expired:
+            del self._tats[key]
+
+    def reset(self) -> None:
         with self._lock:
-            timestamps = self._store[key]
+            self._tats.clear()
+            self._hits = 0
+
 
-            # Podar timestamps fuera de la ventana
-            while timestamps and timestamps[0] < cutoff:
-                timestamps.popleft()
+class SQLBackend:
+    """GCRA sobre `rate_limit_buckets` (una fila por clave, bloqueada con FOR UPDATE)."""
 
-            if len(timestamps) >= self.max_requests:
-                return False
+    def __init__(self, session_factory: Optional[Callable] = None, sweep_every: int = 1_000):
+        self._session_factory = session_factory
+        self.sweep_every = sweep_every
+        self._hits = 0
+
+    def _session(self):
+        if self._session_factory is None:
+            from ..database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        from ..models.rate_limit_bucket import RateLimitBucket
+
+        now = time.time() if now is None else now
+        db = self._session()
+        try:
+            for attempt in range(2):
+                bucket = db.query(RateLimitBucket).filter(
+                    RateLimitBucket.key == key
+                ).with_for_update().first()
+
+                result, new_tat = gcra(bucket.tat if bucket else None, now, limit, window)
+                if new_tat is not None:
+                    if bucket:
+                        bucket.tat = new_tat
+                    else:
+                        db.add(RateLimitBucket(key=key, tat=new_tat))
+                try:
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # Otro worker insertó la misma clave a la vez: releer y reintentar
+                    db.rollback()
+                    if attempt:
+                        raise
+
+            self._hits += 1
+            if self._hits % self.sweep_every == 0:
+                db.query(RateLimitBucket).filter(RateLimitBucket.tat <= now).delete(synchronize_session=False)
+                db.commit()
+            return result
+        finally:
+            db.close()
+
+    def peek(self, key: str, limit: int, window: float) -> int:
+        from ..models.rate_limit_bucket import RateLimitBucket
+
+        now = time.time()
+        db = self._session()
+        try:
+            bucket = db.query(RateLimitBucket).filter(RateLimitBucket.key == key).first()
+        finally:
+            db.close()
+        tat = max(bucket.tat if bucket else now, now)
+        return max(0, min(limit, int(round((window - (tat - now)) / (window / limit), 6))))
 
-            timestamps.append(now)
+    def reset(self) -> None:
+        from ..models.rate_limit_bucket import RateLimitBucket
 
-        return True
+        db = self._session()
+        try:
+            db.query(RateLimitBucket).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+class RedisBackend:
+    """
+    Ventana deslizante aproximada en Redis: un contador por ventana fija
+    (actual y anterior, con expiración) y el estimado
+    `anterior * (1 - fracción transcurrida) + actual`. Solo usa
+    INCR/DECR/PEXPIRE/GET en pipeline, así que sirve cualquier servidor o
+    cliente compatible con el protocolo Redis.
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _counters(self, key: str, window: float, now: float) -> tuple[str, str, float]:
+        window_ms = int(window * 1000)
+        now_ms = int(now * 1000)
+        current = now_ms // window_ms
+        elapsed = (now_ms % window_ms) / window_ms
+        return f"{self.prefix}{key}:{current}", f"{self.prefix}{key}:{current - 1}", elapsed
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        current_key, previous_key, elapsed = self._counters(key, window, now)
+
+        pipe = self.client.pipeline()
+        pipe.incr(current_key)
+        pipe.pexpire(current_key, int(window * 2000))
+        pipe.get(previous_key)
+        count, _, previous = pipe.execute()
+        previous = int(previous or 0)
+
+        estimate = previous * (1 - elapsed) + count
+        until_next_window = window * (1 - elapsed)
+        if estimate > limit:
+            # El intento rechazado no consume cupo
+            self.client.decr(current_key)
+            if count > limit or previous == 0:
+                retry_after = until_next_window
+            else:
+                retry_after = min(until_next_window, window * (1 - elapsed - (limit - count) / previous))
+            return RateLimitResult(False, 0, max(retry_after, 0.0), window)
+
+        return RateLimitResult(True, max(0, math.floor(limit - estimate)), 0.0, window)
+
+    def peek(self, key: str, limit: int, window: float) -> int:
+        current_key, previous_key, elapsed = self._counters(key, window, time.time())
+        current, previous = self.client.get(current_key), self.client.get(previous_key)
+        estimate = int(previous or 0) * (1 - elapsed) + int(current or 0)
+        return max(0, math.floor(limit - estimate))
+
+    def reset(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def create_backend(name: str):
+    """Backend configurado en RATE_LIMIT_BACKEND (memory | sql | redis)."""
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sql":
+        return SQLBackend()
+    if name == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requiere instalar 'redis'")
+        return RedisBackend(redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL))
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+# ── Limiter + políticas ────────────────────────────
+
+class RateLimiter:
+    """Límite de `max_requests` por `window_seconds` sobre un backend."""
+
+    def __init__(self, max_requests: int, window_seconds: int, backend=None):
+        self.max_requests = max_requests
+        self.window = window_seconds
+        self.backend = backend or MemoryBackend()
+
+    def hit(self, key: str) -> RateLimitResult:
+        return self.backend.hit(key, self.max_requests, self.window)
+
+    def is_allowed(self, key: str) -> bool:
+        return self.hit(key).allowed
 
     def remaining(self, key: str) -> int:
-        cutoff = time.time() - self.window
-        with self._lock:
-            timestamps = self._store.get(key, deque())
-            valid = sum(1 for t in timestamps if t >= cutoff)
-        return max(0, self.max_requests - valid)
+        return self.backend.peek(key, self.max_requests, self.window)
+
 
+POLICIES: dict[str, RateLimitPolicy] = {
+    "login": RateLimitPolicy(settings.RATE_LIMIT_LOGIN_MAX, settings.RATE_LIMIT_LOGIN_WINDOW_SEC),
+    "register": RateLimitPolicy(settings.RATE_LIMIT_REGISTER_MAX, settings.RATE_LIMIT_REGISTER_WINDOW_SEC),
+    "oauth": RateLimitPolicy(settings.RATE_LIMIT_OAUTH_MAX, settings.RATE_LIMIT_OAUTH_WINDOW_SEC),
+    "refresh": RateLimitPolicy(settings.RATE_LIMIT_REFRESH_MAX, settings.RATE_LIMIT_REFRESH_WINDOW_SEC),
+}
 
 # ── Instancia global ──────────────────────────────
-login_limiter = RateLimiter(
-    max_requests=settings.RATE_LIMIT_LOGIN_MAX,
-    window_seconds=settings.RATE_LIMIT_LOGIN_WINDOW_SEC,
-)
+backend = create_backend(settings.RATE_LIMIT_BACKEND)
+limiters = {
+    name: RateLimiter(policy.max_requests, policy.window_seconds, backend)
+    for name, policy in POLICIES.items()
+}
+login_limiter = limiters["login"]
+
+
+def reset_rate_limits() -> None:
+    """Vacía el estado de todos los límites (tests)."""
+    backend.reset()
 
 
 def get_client_ip(request: Request) -> str:
@@ -64,21 +291,35 @@ def get_client_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
-async def check_rate_limit(request: Request):
+def raise_rate_limited(retry_after: float, headers: Optional[dict] = None):
+    retry_after = max(1, math.ceil(retry_after))
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={
+            "error": "rate_limit_exceeded",
+            "message": "Too many requests. Please wait before trying again.",
+            "retry_after_seconds": retry_after,
+        },
+        headers={**(headers or {}), "Retry-After": str(retry_after)},
+    )
+
+
+class RateLimit:
     """
-    Dependencia inyectable en endpoints de auth.
-    Lanza 429 si se excede el límite.
+    Dependencia inyectable por ruta: `Depends(RateLimit("register"))`.
+    La clave es política + IP del cliente. Lanza 429 si se excede el límite.
     """
-    ip = get_client_ip(request)
-
-    if not login_limiter.is_allowed(ip):
-        retry_after = settings.RATE_LIMIT_LOGIN_WINDOW_SEC
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail={
-                "error": "rate_limit_exceeded",
-                "message": "Too many requests. Please wait before trying again.",
-                "retry_after_seconds": retry_after,
-            },
-            headers={"Retry-After": str(retry_after)},
-        )
\ No newline at end of file
+
+    def __init__(self, policy: str):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown rate limit policy: {policy}")
+        self.policy = policy
+
+    def __call__(self, request: Request):
+        result = limiters[self.policy].hit(f"{self.policy}:{get_client_ip(request)}")
+        if not result.allowed:
+            raise_rate_limited(result.retry_after)
+
+
+# Compatibilidad: la dependencia original de /auth/login
+check_rate_limit = RateLimit("login")
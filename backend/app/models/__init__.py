@@ -12,6 +12,11 @@ from .device_fingerprint import DeviceFingerprint
 from .abuse_event import AbuseEvent
 from .user_identity import UserIdentity 
 from .google_play_purchase import GooglePlayPurchase
+from .daily_account_stats import DailyAccountStats
+from .rate_limit_bucket import RateLimitBucket
+from .import_job import ImportJob
+from .email_outbox import EmailOutbox
+from .google_play_notification import GooglePlayNotification
 
 
 
@@ -19,4 +24,6 @@ __all__ = ["User", "Account", "TradingDay", "TradingSession",
            "Operation", "Goal", "GoalStatus", "GoalDailyPlan", 
            "DailyPlanStatus", "Withdrawal", 
            "Plan", "Subscription", "DeviceFingerprint", "AbuseEvent",
-           "UserIdentity", "GooglePlayPurchase"]
\ No newline at end of file
+           "UserIdentity", "GooglePlayPurchase", "DailyAccountStats",
+           "RateLimitBucket", "ImportJob", "EmailOutbox",
+           "GooglePlayNotification"]
\ No newline at end of file
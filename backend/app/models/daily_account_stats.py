@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey, DateTime, UniqueConstraint
+from datetime import datetime
+from ..database import Base
+
+class DailyAccountStats(Base):
+    """
+    Rollup diario de operaciones por cuenta.
+
+    Se actualiza en la misma transacción que crea cada operación
+    (`daily_stats_service.record_operation`) y se puede reconstruir desde
+    `operations` con `rebuild_daily_stats.py`.
+    """
+    __tablename__ = "daily_account_stats"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
+    date = Column(Date, nullable=False)
+    
+    ops = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    draws = Column(Integer, nullable=False, default=0)
+    
+    # realized_pnl = gross_profit - gross_loss (los DRAW no mueven el capital)
+    realized_pnl = Column(Float, nullable=False, default=0.0)
+    gross_profit = Column(Float, nullable=False, default=0.0)
+    gross_loss = Column(Float, nullable=False, default=0.0)
+    
+    sessions_with_ops = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('account_id', 'date', name='unique_daily_stats_account_date'),
+    )
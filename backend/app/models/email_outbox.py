@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from ..database import Base
+
+
+class EmailOutbox(Base):
+    """
+    Email pendiente de envío (patrón outbox).
+
+    Se inserta en la misma transacción que el cambio que lo origina (por
+    ejemplo el alta del usuario) y un worker en segundo plano lo envía
+    (`email_outbox_service`), con reintentos y backoff si el SMTP falla.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_body = Column(Text, nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")  # pending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String(500), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # El worker busca: status = 'pending' AND next_attempt_at <= now ORDER BY id
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
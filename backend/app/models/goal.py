@@ -34,6 +34,10 @@ class Goal(Base):
     status = Column(SQLEnum(GoalStatus), default=GoalStatus.ACTIVE)
     not_recommended = Column(Boolean, default=False)
     completed_at = Column(DateTime, nullable=True)
+
+    # Fecha "hoy" usada en la última regeneración del calendario.
+    # Permite recalcular incrementalmente solo la cola afectada.
+    calendar_generated_on = Column(Date, nullable=True)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, Date, ForeignKey, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, Float, String, Date, ForeignKey, DateTime, Text, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -48,5 +48,7 @@ class GoalDailyPlan(Base):
     
     __table_args__ = (
         # Constraint único: un plan por día por objetivo
+        # (su índice goal_id + date sirve también las lecturas por rango del calendario)
+        UniqueConstraint('goal_id', 'date', name='unique_goal_daily_plan_date'),
         {'sqlite_autoincrement': True},
     )
\ No newline at end of file
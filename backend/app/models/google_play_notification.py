@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from datetime import datetime
+from ..database import Base
+
+
+class GooglePlayNotification(Base):
+    """
+    Notificación RTDN de Google Play recibida por el webhook.
+
+    El webhook solo guarda el mensaje de Pub/Sub tal cual y responde 200; un
+    worker en segundo plano lo procesa (`google_play_webhook_service`). El
+    `message_id` de Pub/Sub es único: una reentrega del mismo mensaje no se
+    procesa dos veces.
+    """
+    __tablename__ = "google_play_notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(String(128), nullable=False, unique=True)
+    subscription = Column(String(255), nullable=True)  # suscripción de Pub/Sub que lo envió
+    purchase_token = Column(String(512), nullable=True)  # para aplicar en orden las de una misma compra
+    payload = Column(JSON, nullable=False)
+
+    status = Column(String(20), nullable=False, default="pending")  # pending | done | skipped | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String(500), nullable=True)
+    result = Column(JSON, nullable=True)
+
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # El worker busca: status = 'pending' AND next_attempt_at <= now ORDER BY id
+        Index("ix_google_play_notifications_status_next_attempt", "status", "next_attempt_at"),
+        # ¿Hay una anterior pendiente de la misma compra?
+        Index("ix_google_play_notifications_token_status", "purchase_token", "status"),
+    )
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, BigInteger, Float, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from ..database import Base
+
+
+class ImportJob(Base):
+    """
+    Importación de historial de operaciones desde un archivo del broker.
+
+    El archivo subido queda en IMPORTS_DIR y un worker lo procesa en
+    segundo plano (`import_service`); esta fila guarda el estado y el
+    progreso para que cualquier worker de la API pueda consultarlo.
+    """
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+
+    filename = Column(String(255), nullable=True)
+    file_format = Column(String(10), nullable=False)  # csv | json
+    status = Column(String(20), nullable=False, default="pending")  # pending | running | done | failed
+
+    bytes_total = Column(BigInteger, nullable=False, default=0)
+    bytes_read = Column(BigInteger, nullable=False, default=0)
+    rows_read = Column(Integer, nullable=False, default=0)
+    rows_imported = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+
+    # Lo ya confirmado: permite cerrar un job interrumpido (capital, rollup, calendario)
+    profit_committed = Column(Float, nullable=False, default=0.0)
+    first_date = Column(Date, nullable=True)
+
+    # Primeros errores por fila ({"row": n, "message": ...}) y error fatal del job
+    errors = Column(JSONB, nullable=False, default=list)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    # Latido del worker: se renueva con cada lote confirmado
+    updated_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
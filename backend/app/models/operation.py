@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, CheckConstraint, Enum
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, CheckConstraint, Index, Enum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -24,6 +24,8 @@ class Operation(Base):
     __table_args__ = (
         CheckConstraint('risk_percent IN (2, 3)', name='check_risk_percent'),
         CheckConstraint('amount > 0', name='check_amount_positive'),
+        # Cubre el join desde trading_sessions y las agregaciones por resultado
+        Index('ix_operations_session_result_profit', 'session_id', 'result', 'profit'),
     )
     
     session = relationship("TradingSession", back_populates="operations")
\ No newline at end of file
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Float, DateTime
+from datetime import datetime
+from ..database import Base
+
+class RateLimitBucket(Base):
+    """
+    Estado GCRA de una clave del rate-limiter (backend SQL).
+
+    Una fila por clave ("policy:ip" o "policy:user"): `tat` es el
+    theoretical arrival time en epoch segundos. Las filas con `tat` en el
+    pasado equivalen a una clave nueva y se purgan periódicamente.
+    """
+    __tablename__ = "rate_limit_buckets"
+    
+    key = Column(String(255), primary_key=True)
+    tat = Column(Float, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
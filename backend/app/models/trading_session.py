@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, CheckConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -15,6 +15,8 @@ class TradingSession(Base):
     
     __table_args__ = (
         CheckConstraint('session_number >= 1 AND session_number <= 3', name='check_session_number'),
+        # Cubre el join desde trading_days y el conteo de sesiones del día
+        Index('ix_trading_sessions_day_number', 'trading_day_id', 'session_number'),
     )
     
     trading_day = relationship("TradingDay", back_populates="sessions")
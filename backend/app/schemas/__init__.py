@@ -5,10 +5,11 @@ from .operation import OperationCreate, OperationResponse
 from .reports import DailyMetric, ReportResponse, ProjectionResponse
 from .goal_planner import (
     GoalCreate, GoalResponse,
-    PlanCalculateRequest, PlanCalculateResponse
+    PlanCalculateRequest, PlanCalculateResponse,
+    PlanSimulateRequest, PlanSimulateResponse, CapitalBand
 )
 from .goal_extended import (
-    GoalCreateExtended, GoalUpdate, GoalResponseExtended, GoalProgressResponse
+    GoalCreateExtended, GoalUpdate, GoalResponseExtended, GoalProgressResponse, WinrateWindow
 )
 from .daily_plan import (
     DailyPlanCreate, DailyPlanUpdate, DailyPlanResponse,
@@ -26,7 +27,8 @@ __all__ = [
     "DailyMetric", "ReportResponse", "ProjectionResponse",
     "GoalCreate", "GoalResponse",
     "PlanCalculateRequest", "PlanCalculateResponse",
-    "GoalCreateExtended", "GoalUpdate", "GoalResponseExtended", "GoalProgressResponse",
+    "PlanSimulateRequest", "PlanSimulateResponse", "CapitalBand",
+    "GoalCreateExtended", "GoalUpdate", "GoalResponseExtended", "GoalProgressResponse", "WinrateWindow",
     "DailyPlanCreate", "DailyPlanUpdate", "DailyPlanResponse",
     "CalendarRangeRequest", "CalendarResponse",
     "WithdrawalCreate", "WithdrawalResponse", "WithdrawalListResponse",
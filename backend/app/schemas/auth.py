@@ -14,9 +14,14 @@ class UserLogin(BaseModel):
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
 
 
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     email: str
 
@@ -36,6 +41,7 @@ class FacebookOAuthLogin(BaseModel):
 class OAuthResponse(BaseModel):
     """Respuesta extendida para OAuth."""
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str = "bearer"
     user: dict
     is_new_user: bool
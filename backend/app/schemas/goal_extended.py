@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime, date
-from typing import Optional
+from typing import Optional, List
 from ..models.goal import GoalStatus
 
 class GoalCreateExtended(BaseModel):
@@ -42,6 +42,13 @@ class GoalResponseExtended(BaseModel):
     class Config:
         from_attributes = True
 
+class WinrateWindow(BaseModel):
+    days: int
+    operations: int
+    wins: int
+    winrate: Optional[float]
+    realized_pnl: float
+
 class GoalProgressResponse(BaseModel):
     goal: GoalResponseExtended
     current_capital: float
@@ -49,5 +56,7 @@ class GoalProgressResponse(BaseModel):
     progress_percent: float
     days_elapsed: int
     real_winrate: Optional[float]
+    realized_pnl: float = 0.0
     estimated_days_to_goal: Optional[int]
-    daily_growth_factor: float
\ No newline at end of file
+    daily_growth_factor: float
+    winrate_windows: Optional[List[WinrateWindow]] = None
\ No newline at end of file
@@ -58,4 +58,43 @@ class PlanCalculateResponse(BaseModel):
     warnings: List[str]
     
     # Reglas/límites recordatorios
-    limits_reminder: Dict[str, str]
\ No newline at end of file
+    limits_reminder: Dict[str, str]
+
+class PlanSimulateRequest(PlanCalculateRequest):
+    draw_rate: float = Field(0.0, ge=0.0, le=0.30, description="Probabilidad de DRAW por operación")
+    days: int = Field(30, ge=1, le=730, description="Horizonte de la simulación en días")
+    paths: int = Field(2000, ge=100, le=10000, description="Trayectorias Monte Carlo solicitadas")
+    ruin_percent: float = Field(50.0, gt=0, lt=100, description="Se considera ruina caer por debajo de este % del capital inicial")
+    seed: Optional[int] = Field(None, ge=0, description="Semilla para resultados reproducibles")
+
+class CapitalBand(BaseModel):
+    day: int
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+class PlanSimulateResponse(BaseModel):
+    # Configuración de la simulación
+    sessions_per_day: int
+    ops_per_session: int
+    risk_percent: int
+    winrate: float
+    draw_rate: float
+    days: int
+    paths: int
+    seed: Optional[int]
+    
+    # Capital y configuración actual
+    current_capital: float
+    payout: float
+    target_capital: Optional[float]
+    
+    # Resultados
+    probability_hit_target: Optional[float]
+    risk_of_ruin: float
+    ruin_capital: float
+    mean_final_capital: float
+    blocked_days_ratio: float
+    capital_bands: List[CapitalBand]
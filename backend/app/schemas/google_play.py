@@ -41,6 +41,7 @@ class WebhookNotification(BaseModel):
 class WebhookResponse(BaseModel):
     """Response del procesamiento de webhook."""
     status: str
+    message_id: Optional[str] = None
     notification_type: Optional[int] = None
     purchase_id: Optional[int] = None
     action: Optional[str] = None
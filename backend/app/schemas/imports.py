@@ -0,0 +1,69 @@
+from pydantic import BaseModel, Field, computed_field, field_validator, model_validator
+import datetime as dt
+from datetime import datetime
+from typing import List, Optional
+
+
+class OperationImportRow(BaseModel):
+    """
+    Fila del archivo del broker. Acepta `date` (+ `time` opcional) o un
+    `opened_at` ISO; `session` es el número de sesión dentro del día.
+    """
+    date: dt.date
+    time: Optional[dt.time] = None
+    session: int = Field(1, ge=1, le=99)
+    result: str = Field(..., pattern="^(WIN|LOSS|DRAW)$")
+    risk_percent: int = Field(2, ge=2, le=3)
+    amount: float = Field(..., gt=0)
+
+    # Si no llega se calcula igual que en POST /operations (WIN=+0.92*amount, LOSS=-amount, DRAW=0)
+    profit: Optional[float] = None
+
+    comment: Optional[str] = Field(None, max_length=500)
+
+    @model_validator(mode="before")
+    @classmethod
+    def split_opened_at(cls, data):
+        if isinstance(data, dict) and data.get("opened_at") and not data.get("date"):
+            opened_at = datetime.fromisoformat(str(data["opened_at"]).replace("Z", "+00:00"))
+            data = {**data, "date": opened_at.date(), "time": opened_at.time().replace(tzinfo=None)}
+        return data
+
+    @field_validator("result", mode="before")
+    @classmethod
+    def normalize_result(cls, value):
+        return value.strip().upper() if isinstance(value, str) else value
+
+    @property
+    def opened_at(self) -> datetime:
+        return datetime.combine(self.date, self.time or dt.time.min)
+
+
+class ImportRowError(BaseModel):
+    row: int
+    message: str
+
+
+class ImportJobResponse(BaseModel):
+    id: int
+    status: str
+    filename: Optional[str]
+    file_format: str
+    bytes_total: int
+    bytes_read: int
+    rows_read: int
+    rows_imported: int
+    rows_failed: int
+    errors: List[ImportRowError]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        return round(self.bytes_read / self.bytes_total, 4) if self.bytes_total else 0.0
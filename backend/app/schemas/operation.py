@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class OperationCreate(BaseModel):
@@ -29,3 +29,20 @@ class OperationResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class OperationBatchCreate(BaseModel):
+    operations: List[OperationCreate] = Field(..., min_length=1, max_length=500)
+
+
+class OperationBatchError(BaseModel):
+    index: int
+    session_id: int
+    error: str
+    message: str
+
+
+class OperationBatchResponse(BaseModel):
+    created: List[OperationResponse]
+    errors: List[OperationBatchError]
+    capital: float
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import date
 
 class DailyMetric(BaseModel):
@@ -24,4 +24,12 @@ class ProjectionResponse(BaseModel):
     days: int
     estimated_capital: float
     estimated_profit: float
-    scenario: str
\ No newline at end of file
+    scenario: str
+class ReportJobResponse(BaseModel):
+    job_id: str
+    goal_id: int
+    format: str
+    status: str
+    error: Optional[str] = None
+    status_url: str
+    download_url: Optional[str] = None
@@ -21,10 +21,12 @@ def log_abuse_event(
     fingerprint_hash: Optional[str] = None,
     ip_address: Optional[str] = None,
     description: Optional[str] = None,
-    event_metadata: Optional[dict] = None  # ← CAMBIADO
+    event_metadata: Optional[dict] = None,  # ← CAMBIADO
+    commit: bool = True
 ) -> AbuseEvent:
     """
     Registra un evento de abuso en la base de datos.
+    Con commit=False solo hace flush (el llamador confirma su transacción).
     """
     event = AbuseEvent(
         user_id=user_id,
@@ -37,8 +39,11 @@ def log_abuse_event(
     )
     
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    if commit:
+        db.commit()
+        db.refresh(event)
+    else:
+        db.flush()
     
     return event
 
@@ -2,9 +2,12 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from ..models.user import User
 from ..schemas.auth import UserRegister, Token
-from ..utils.security import get_password_hash, verify_password, create_access_token
+from ..utils.security import create_token_pair, decode_access_token, REFRESH_TOKEN_TYPE
 from ..utils.messages import get_message
-from ..services.email_service import send_verification_email
+from ..services.email_service import queue_verification_email
+from ..services import email_outbox_service
+from ..services import password_hasher
+
 
 def register_user(db: Session, user_data: UserRegister, lang: str = "en") -> Token:
     try:
@@ -27,23 +30,54 @@ def register_user(db: Session, user_data: UserRegister, lang: str = "en") -> Tok
             detail=get_message("email_exists", lang)
         )
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = password_hasher.hash_password(user_data.password)
     new_user = User(email=user_data.email, hashed_password=hashed_password)
     db.add(new_user)
+    # Usuario y email de verificación en la misma transacción (outbox)
+    queue_verification_email(db, new_user)
     db.commit()
     db.refresh(new_user)
-    send_verification_email(db, new_user)
+    email_outbox_service.notify()
     
-    access_token = create_access_token(data={"sub": new_user.email})
-    return Token(access_token=access_token)
+    return Token(**create_token_pair(new_user))
 
 def login_user(db: Session, email: str, password: str, lang: str = "en") -> Token:
     user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not password_hasher.check_password(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=get_message("invalid_credentials", lang)
         )
+
+    if password_hasher.needs_rehash(user.hashed_password):
+        _rehash_password(db, user, password)
     
-    access_token = create_access_token(data={"sub": user.email})
-    return Token(access_token=access_token)
\ No newline at end of file
+    return Token(**create_token_pair(user))
+
+
+def _rehash_password(db: Session, user: User, password: str) -> None:
+    """Rehace el hash con el BCRYPT_ROUNDS actual (tenemos la contraseña en claro solo aquí)."""
+    try:
+        user.hashed_password = password_hasher.hash_password(password)
+    except HTTPException:
+        return  # pool saturado: se reintenta en el próximo login
+    db.commit()
+
+
+def refresh_tokens(db: Session, refresh_token: str) -> Token:
+    """Canjea un refresh token por un par nuevo, releyendo el usuario de la DB."""
+    payload = decode_access_token(refresh_token)
+    if payload is None or payload.get("type") != REFRESH_TOKEN_TYPE or payload.get("uid") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+
+    user = db.query(User).filter(User.id == payload["uid"]).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+
+    return Token(**create_token_pair(user))
\ No newline at end of file
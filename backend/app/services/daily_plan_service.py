@@ -2,15 +2,17 @@ from datetime import date, timedelta
 from typing import Optional
 
 from fastapi import HTTPException
+from sqlalchemy import case, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models.account import Account
 from ..models.goal import Goal, GoalStatus
 from ..models.goal_daily_plan import GoalDailyPlan, DailyPlanStatus
-from ..models.operation import Operation, OperationResult
-from ..models.trading_day import TradingDay
-from ..models.trading_session import TradingSession
 from ..schemas.daily_plan import DailyPlanResponse, DailyPlanUpdate, DailyPlanCloseRequest, CalendarRangeRequest, CalendarResponse
+from ..utils.http_cache import make_etag, etag_matches
+from . import projection_engine
+from .daily_stats_service import get_stats_by_date
 
 MAX_GENERATED_DAYS = 730
 
@@ -77,129 +79,132 @@ def update_daily_plan(
 
 
 def _build_operation_stats_by_date(db: Session, account_id: int, goal_start: date) -> dict:
-    """Group real operation results by date."""
-    operations = db.query(Operation, TradingDay.date).join(
-        TradingSession, Operation.session_id == TradingSession.id
-    ).join(
-        TradingDay, TradingSession.trading_day_id == TradingDay.id
-    ).filter(
-        TradingDay.account_id == account_id,
-        TradingDay.date >= goal_start,
-    ).all()
-
-    stats = {}
-    for op, op_date in operations:
-        if op_date not in stats:
-            stats[op_date] = {
-                "actual_ops": 0,
-                "wins": 0,
-                "losses": 0,
-                "draws": 0,
-                "realized_pnl": 0.0,
-            }
-
-        day = stats[op_date]
-        day["actual_ops"] += 1
-        day["realized_pnl"] += float(op.profit or 0.0)
-
-        if op.result == OperationResult.WIN:
-            day["wins"] += 1
-        elif op.result == OperationResult.LOSS:
-            day["losses"] += 1
-        else:
-            day["draws"] += 1
-
-    return stats
-
-
-def _build_sessions_count_by_date(db: Session, account_id: int, goal_start: date) -> dict:
-    """Count sessions with at least one operation by date."""
-    rows = db.query(TradingSession.id, TradingDay.date).join(
-        TradingDay, TradingSession.trading_day_id == TradingDay.id
-    ).join(
-        Operation, Operation.session_id == TradingSession.id
-    ).filter(
-        TradingDay.account_id == account_id,
-        TradingDay.date >= goal_start,
-    ).all()
+    """Real results by date, read from the daily_account_stats rollup."""
+    return {
+        stats_date: {
+            "actual_sessions": row.sessions_with_ops,
+            "actual_ops": row.ops,
+            "wins": row.wins,
+            "losses": row.losses,
+            "draws": row.draws,
+            "realized_pnl": float(row.realized_pnl or 0.0),
+        }
+        for stats_date, row in get_stats_by_date(db, account_id, goal_start).items()
+    }
+
+
+def _set_if_changed(plan: GoalDailyPlan, field: str, value) -> None:
+    """Assign only when the value differs, so unchanged rows stay clean."""
+    if getattr(plan, field) != value:
+        setattr(plan, field, value)
 
-    sessions_by_date = {}
-    for session_id, session_date in rows:
-        sessions_by_date.setdefault(session_date, set()).add(session_id)
 
-    return {k: len(v) for k, v in sessions_by_date.items()}
+def _reset_actuals(plan: GoalDailyPlan) -> None:
+    """Clear real results of a day without operations (projected or empty past day)."""
+    _set_if_changed(plan, "actual_sessions", 0)
+    _set_if_changed(plan, "actual_ops", 0)
+    _set_if_changed(plan, "wins", 0)
+    _set_if_changed(plan, "losses", 0)
+    _set_if_changed(plan, "draws", 0)
+    _set_if_changed(plan, "realized_pnl", 0.0)
+    _set_if_changed(plan, "status", DailyPlanStatus.PLANNED)
 
 
-def regenerate_goal_calendar(db: Session, goal_id: int) -> None:
-    """
-    Rebuild goal calendar using:
-    - real results for past/current days with operations
-    - expected projection for future days
-    """
+def _load_regenerable_goal(db: Session, goal_id: int):
+    """Return (goal, account) if the goal calendar can be regenerated."""
     goal = db.query(Goal).filter(Goal.id == goal_id).first()
     if not goal:
-        return
+        return None, None
 
     account = db.query(Account).filter(Account.id == goal.account_id).first()
     if not account:
-        return
+        return None, None
 
     if goal.status not in (GoalStatus.ACTIVE, GoalStatus.PAUSED):
-        return
+        return None, None
 
-    start_date = goal.start_date or date.today()
+    return goal, account
+
+
+def _project_calendar(
+    db: Session,
+    goal: Goal,
+    account: Account,
+    from_date: date,
+    opening_capital: float,
+) -> None:
+    """
+    Walk the calendar from `from_date` with `opening_capital` as that day's
+    starting capital:
+    - real results for past/current days with operations
+    - expected projection for future days
+
+    Rows before `from_date` are neither loaded nor modified.
+    """
     today = date.today()
 
-    op_stats_by_date = _build_operation_stats_by_date(db, account.id, start_date)
-    sessions_by_date = _build_sessions_count_by_date(db, account.id, start_date)
+    op_stats_by_date = _build_operation_stats_by_date(db, account.id, from_date)
 
     existing_plans = db.query(GoalDailyPlan).filter(
         GoalDailyPlan.goal_id == goal.id,
-        GoalDailyPlan.date >= start_date,
+        GoalDailyPlan.date >= from_date,
     ).all()
     plans_by_date = {p.date: p for p in existing_plans}
 
-    current_date = start_date
-    projected_capital = float(goal.start_capital_snapshot or account.capital or 0.0)
+    current_date = from_date
+    projected_capital = float(opening_capital)
     generated_dates = []
 
     payout = float(goal.payout_snapshot or account.payout or 0.0)
     risk_fraction = float(goal.risk_percent or 0) / 100.0
+    planned_sessions = int(goal.sessions_per_day or 0)
     ops_total = int((goal.sessions_per_day or 0) * (goal.ops_per_session or 0))
-    expected_return_per_op = float(goal.winrate_estimate or 0.0) * payout - (1 - float(goal.winrate_estimate or 0.0))
+    expected_return = projection_engine.expected_return_per_op(float(goal.winrate_estimate or 0.0), payout)
+    target_capital = float(goal.target_capital)
 
-    for _ in range(MAX_GENERATED_DAYS):
-        plan = plans_by_date.get(current_date)
+    def plan_for(plan_date: date) -> GoalDailyPlan:
+        plan = plans_by_date.get(plan_date)
         if not plan:
-            plan = GoalDailyPlan(goal_id=goal.id, date=current_date)
+            plan = GoalDailyPlan(goal_id=goal.id, date=plan_date)
             db.add(plan)
-            plans_by_date[current_date] = plan
-
-        capital_start = round(projected_capital, 2)
-        planned_stake = round(max(capital_start, 0.0) * risk_fraction, 2)
-        expected_win_profit = round(planned_stake * payout, 2)
-        expected_loss = round(planned_stake, 2)
-        expected_daily_pnl = round(planned_stake * ops_total * expected_return_per_op, 2)
-
-        plan.capital_start_of_day = capital_start
-        plan.planned_sessions = int(goal.sessions_per_day or 0)
-        plan.planned_ops_total = ops_total
-        plan.planned_stake = planned_stake
-        plan.expected_win_profit = expected_win_profit
-        plan.expected_loss = expected_loss
+            plans_by_date[plan_date] = plan
+        return plan
+
+    def apply_planned(plan: GoalDailyPlan, day: projection_engine.ProjectedDay) -> None:
+        _set_if_changed(plan, "capital_start_of_day", day.capital_start)
+        _set_if_changed(plan, "planned_sessions", planned_sessions)
+        _set_if_changed(plan, "planned_ops_total", ops_total)
+        _set_if_changed(plan, "planned_stake", day.planned_stake)
+        _set_if_changed(plan, "expected_win_profit", day.expected_win_profit)
+        _set_if_changed(plan, "expected_loss", day.expected_loss)
+
+    remaining_days = MAX_GENERATED_DAYS - (from_date - (goal.start_date or from_date)).days
+    # Último día con datos reales: a partir de él todo es proyección pura.
+    last_real_date = max([today, *op_stats_by_date.keys()])
+    reached_end = False
+
+    # 1) Días pasados/hoy: resultados reales o cierres manuales.
+    while remaining_days > 0 and current_date <= last_real_date:
+        plan = plan_for(current_date)
+        day = projection_engine.plan_day(
+            projected_capital, risk_fraction, ops_total, payout, expected_return
+        )
+        apply_planned(plan, day)
 
         day_stats = op_stats_by_date.get(current_date)
         if day_stats:
-            plan.actual_sessions = sessions_by_date.get(current_date, 0)
-            plan.actual_ops = day_stats["actual_ops"]
-            plan.wins = day_stats["wins"]
-            plan.losses = day_stats["losses"]
-            plan.draws = day_stats["draws"]
-            plan.realized_pnl = round(day_stats["realized_pnl"], 2)
-            plan.status = (
+            _set_if_changed(plan, "actual_sessions", day_stats["actual_sessions"])
+            _set_if_changed(plan, "actual_ops", day_stats["actual_ops"])
+            _set_if_changed(plan, "wins", day_stats["wins"])
+            _set_if_changed(plan, "losses", day_stats["losses"])
+            _set_if_changed(plan, "draws", day_stats["draws"])
+            _set_if_changed(plan, "realized_pnl", round(day_stats["realized_pnl"], 2))
+            _set_if_changed(
+                plan,
+                "status",
                 DailyPlanStatus.COMPLETED
                 if plan.actual_ops >= ops_total and ops_total > 0
-                else DailyPlanStatus.IN_PROGRESS
+                else DailyPlanStatus.IN_PROGRESS,
             )
             pnl_for_projection = plan.realized_pnl
         else:
@@ -209,34 +214,40 @@ def regenerate_goal_calendar(db: Session, goal_id: int) -> None:
             )
 
             if keep_manual_close:
-                plan.actual_sessions = plan.actual_sessions or 0
-                plan.actual_ops = plan.actual_ops or 0
-                plan.wins = plan.wins or 0
-                plan.losses = plan.losses or 0
-                plan.draws = plan.draws or 0
-                plan.realized_pnl = round(float(plan.realized_pnl or 0.0), 2)
+                _set_if_changed(plan, "actual_sessions", plan.actual_sessions or 0)
+                _set_if_changed(plan, "actual_ops", plan.actual_ops or 0)
+                _set_if_changed(plan, "wins", plan.wins or 0)
+                _set_if_changed(plan, "losses", plan.losses or 0)
+                _set_if_changed(plan, "draws", plan.draws or 0)
+                _set_if_changed(plan, "realized_pnl", round(float(plan.realized_pnl or 0.0), 2))
                 pnl_for_projection = plan.realized_pnl
             else:
-                plan.actual_sessions = 0
-                plan.actual_ops = 0
-                plan.wins = 0
-                plan.losses = 0
-                plan.draws = 0
-                plan.realized_pnl = 0.0
-                plan.status = DailyPlanStatus.PLANNED
-                pnl_for_projection = 0.0 if current_date < today else expected_daily_pnl
-
-        projected_capital = round(capital_start + pnl_for_projection, 2)
-        generated_dates.append(current_date)
+                _reset_actuals(plan)
+                pnl_for_projection = 0.0 if current_date < today else day.expected_daily_pnl
 
-        if current_date >= today and projected_capital >= float(goal.target_capital):
-            break
+        projected_capital = round(day.capital_start + pnl_for_projection, 2)
+        generated_dates.append(current_date)
+        remaining_days -= 1
 
-        if current_date >= today and projected_capital <= 0:
+        if current_date >= today and (projected_capital >= target_capital or projected_capital <= 0):
+            reached_end = True
             break
 
         current_date += timedelta(days=1)
 
+    # 2) Cola futura: proyección esperada calculada por el motor compartido.
+    if not reached_end:
+        tail = projection_engine.project_daily_plan_tail(
+            projected_capital, risk_fraction, ops_total, payout, expected_return,
+            target_capital, max_days=remaining_days,
+        )
+        for day in tail:
+            plan = plan_for(current_date)
+            apply_planned(plan, day)
+            _reset_actuals(plan)
+            generated_dates.append(current_date)
+            current_date += timedelta(days=1)
+
     if generated_dates:
         last_generated = generated_dates[-1]
         stale_plans = db.query(GoalDailyPlan).filter(
@@ -247,9 +258,63 @@ def regenerate_goal_calendar(db: Session, goal_id: int) -> None:
         for stale in stale_plans:
             db.delete(stale)
 
+    _set_if_changed(goal, "calendar_generated_on", today)
+
     db.commit()
 
 
+def regenerate_goal_calendar(db: Session, goal_id: int) -> None:
+    """
+    Rebuild the whole goal calendar from `goal.start_date`.
+
+    Use it when the goal configuration changes (target, risk, sessions...).
+    For new operations/closes use `refresh_goal_calendar`, which only
+    re-projects the tail from the changed date.
+    """
+    goal, account = _load_regenerable_goal(db, goal_id)
+    if not goal:
+        return
+
+    start_date = goal.start_date or date.today()
+    opening_capital = float(goal.start_capital_snapshot or account.capital or 0.0)
+
+    _project_calendar(db, goal, account, start_date, opening_capital)
+
+
+def refresh_goal_calendar(db: Session, goal_id: int, changed_date: Optional[date] = None) -> None:
+    """
+    Incrementally update the goal calendar after a change on `changed_date`
+    (defaults to today).
+
+    Days before the recalculation point keep their stored values, so the
+    stored `capital_start_of_day` of that day seeds the projection. The
+    point is moved back to the last generation date when "today" advanced
+    since then, because those days switched from projected to real.
+    Falls back to a full rebuild when there is no reliable seed.
+    """
+    goal, account = _load_regenerable_goal(db, goal_id)
+    if not goal:
+        return
+
+    if (
+        goal.start_date is None
+        or goal.start_capital_snapshot is None
+        or goal.calendar_generated_on is None
+    ):
+        regenerate_goal_calendar(db, goal.id)
+        return
+
+    from_date = min(changed_date or date.today(), goal.calendar_generated_on, date.today())
+    from_date = max(from_date, goal.start_date)
+
+    seed = get_daily_plan_by_date(db, goal.id, from_date)
+    if seed is None or seed.capital_start_of_day is None:
+        regenerate_goal_calendar(db, goal.id)
+        return
+
+    _project_calendar(db, goal, account, from_date, float(seed.capital_start_of_day))
+
+
 def regenerate_active_goal_calendar_for_account(db: Session, account_id: int) -> None:
     """Recalculate calendar for active goal in account, if any."""
     goal = db.query(Goal).filter(
@@ -258,17 +323,11 @@ def regenerate_active_goal_calendar_for_account(db: Session, account_id: int) ->
     ).first()
 
     if goal:
-        regenerate_goal_calendar(db, goal.id)
+        refresh_goal_calendar(db, goal.id)
 
 
-def get_calendar(
-    db: Session,
-    user_id: int,
-    goal_id: int,
-    range_request: Optional[CalendarRangeRequest] = None,
-    lang: str = "en",
-) -> CalendarResponse:
-    """Get goal calendar data."""
+def _get_user_goal(db: Session, user_id: int, goal_id: int) -> Goal:
+    """Fetch a goal owned by the user or raise 404."""
     account = db.query(Account).filter(Account.user_id == user_id).first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -281,53 +340,180 @@ def get_calendar(
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
 
-    regenerate_goal_calendar(db, goal.id)
+    return goal
+
 
+def _ensure_calendar_fresh(db: Session, goal: Goal) -> None:
+    """
+    Regenerate only when the stored calendar is stale: it was never
+    generated or it was generated on a previous day (projected days became
+    past days). State changes already refresh it on write.
+    """
+    if goal.status not in (GoalStatus.ACTIVE, GoalStatus.PAUSED):
+        return
+
+    if goal.calendar_generated_on != date.today():
+        refresh_goal_calendar(db, goal.id)
+
+
+def _resolve_calendar_range(
+    db: Session,
+    goal: Goal,
+    range_request: Optional[CalendarRangeRequest],
+) -> tuple[date, date]:
+    """Translate the optional range request into (from_date, to_date)."""
     if range_request and range_request.from_date and range_request.to_date:
-        from_date = range_request.from_date
-        to_date = range_request.to_date
-    elif range_request and range_request.days:
+        return range_request.from_date, range_request.to_date
+
+    if range_request and range_request.days:
         from_date = date.today()
-        to_date = from_date + timedelta(days=range_request.days - 1)
-    else:
-        from_date = goal.start_date
-        latest_plan = db.query(GoalDailyPlan).filter(
-            GoalDailyPlan.goal_id == goal.id
-        ).order_by(GoalDailyPlan.date.desc()).first()
-        to_date = latest_plan.date if latest_plan else date.today()
+        return from_date, from_date + timedelta(days=range_request.days - 1)
+
+    latest_date = db.query(func.max(GoalDailyPlan.date)).filter(
+        GoalDailyPlan.goal_id == goal.id
+    ).scalar()
+    return goal.start_date, latest_date or date.today()
+
+
+def _calendar_aggregates(db: Session, goal_id: int, from_date: date, to_date: date):
+    """Compute calendar totals and the last modification time in one SQL query."""
+    return db.query(
+        func.count(GoalDailyPlan.id).label("total_days"),
+        func.coalesce(
+            func.sum(case((GoalDailyPlan.status == DailyPlanStatus.COMPLETED, 1), else_=0)), 0
+        ).label("completed_days"),
+        func.coalesce(
+            func.sum(case((GoalDailyPlan.status == DailyPlanStatus.BLOCKED, 1), else_=0)), 0
+        ).label("blocked_days"),
+        func.coalesce(func.sum(GoalDailyPlan.realized_pnl), 0.0).label("total_pnl"),
+        func.coalesce(func.sum(GoalDailyPlan.wins), 0).label("total_wins"),
+        func.coalesce(func.sum(GoalDailyPlan.losses), 0).label("total_losses"),
+        func.coalesce(func.sum(GoalDailyPlan.draws), 0).label("total_draws"),
+        func.max(GoalDailyPlan.updated_at).label("last_updated"),
+    ).filter(
+        GoalDailyPlan.goal_id == goal_id,
+        GoalDailyPlan.date >= from_date,
+        GoalDailyPlan.date <= to_date,
+    ).one()
+
+
+def _calendar_etag(goal: Goal, from_date: date, to_date: date, totals) -> str:
+    return make_etag(
+        goal.id,
+        goal.calendar_generated_on,
+        from_date,
+        to_date,
+        totals.total_days,
+        totals.last_updated,
+        totals.total_pnl,
+        totals.total_wins,
+        totals.total_losses,
+        totals.total_draws,
+        totals.completed_days,
+        totals.blocked_days,
+    )
 
+
+def _build_calendar_response(
+    db: Session,
+    goal: Goal,
+    from_date: date,
+    to_date: date,
+    totals,
+) -> CalendarResponse:
     daily_plans = db.query(GoalDailyPlan).filter(
-        GoalDailyPlan.goal_id == goal_id,
+        GoalDailyPlan.goal_id == goal.id,
         GoalDailyPlan.date >= from_date,
         GoalDailyPlan.date <= to_date,
     ).order_by(GoalDailyPlan.date).all()
 
-    total_days = len(daily_plans)
-    completed_days = sum(1 for p in daily_plans if p.status == DailyPlanStatus.COMPLETED)
-    blocked_days = sum(1 for p in daily_plans if p.status == DailyPlanStatus.BLOCKED)
-    total_pnl = sum(p.realized_pnl for p in daily_plans)
-    total_wins = sum(p.wins for p in daily_plans)
-    total_losses = sum(p.losses for p in daily_plans)
-    total_draws = sum(p.draws for p in daily_plans)
-
+    total_wins = int(totals.total_wins)
+    total_losses = int(totals.total_losses)
+    total_draws = int(totals.total_draws)
     total_ops = total_wins + total_losses + total_draws
     real_winrate = total_wins / total_ops if total_ops > 0 else None
 
     plan_responses = [DailyPlanResponse.from_orm(p) for p in daily_plans]
 
     return CalendarResponse(
-        goal_id=goal_id,
+        goal_id=goal.id,
         daily_plans=plan_responses,
-        total_days=total_days,
-        completed_days=completed_days,
-        blocked_days=blocked_days,
-        total_pnl=round(total_pnl, 2),
+        total_days=int(totals.total_days),
+        completed_days=int(totals.completed_days),
+        blocked_days=int(totals.blocked_days),
+        total_pnl=round(float(totals.total_pnl), 2),
         total_wins=total_wins,
         total_losses=total_losses,
         total_draws=total_draws,
         real_winrate=round(real_winrate, 4) if real_winrate is not None else None,
     )
 
+
+def get_calendar(
+    db: Session,
+    user_id: int,
+    goal_id: int,
+    range_request: Optional[CalendarRangeRequest] = None,
+    lang: str = "en",
+) -> CalendarResponse:
+    """Get goal calendar data from the stored daily plans (read-only unless stale)."""
+    goal = _get_user_goal(db, user_id, goal_id)
+    _ensure_calendar_fresh(db, goal)
+
+    from_date, to_date = _resolve_calendar_range(db, goal, range_request)
+    totals = _calendar_aggregates(db, goal.id, from_date, to_date)
+
+    return _build_calendar_response(db, goal, from_date, to_date, totals)
+
+
+def get_calendar_if_modified(
+    db: Session,
+    user_id: int,
+    goal_id: int,
+    range_request: Optional[CalendarRangeRequest] = None,
+    if_none_match: Optional[str] = None,
+    lang: str = "en",
+) -> tuple[str, Optional[CalendarResponse]]:
+    """
+    Conditional calendar read.
+
+    Returns (etag, response). `response` is None when `if_none_match`
+    already matches the current calendar, so the route can answer 304
+    without loading the daily plan rows.
+    """
+    goal = _get_user_goal(db, user_id, goal_id)
+    _ensure_calendar_fresh(db, goal)
+
+    from_date, to_date = _resolve_calendar_range(db, goal, range_request)
+    totals = _calendar_aggregates(db, goal.id, from_date, to_date)
+    etag = _calendar_etag(goal, from_date, to_date, totals)
+
+    if etag_matches(if_none_match, etag):
+        return etag, None
+
+    return etag, _build_calendar_response(db, goal, from_date, to_date, totals)
+
+
+async def get_calendar_if_modified_async(
+    db: AsyncSession,
+    user_id: int,
+    goal_id: int,
+    range_request: Optional[CalendarRangeRequest] = None,
+    if_none_match: Optional[str] = None,
+    lang: str = "en",
+) -> tuple[str, Optional[CalendarResponse]]:
+    """
+    Async variant of `get_calendar_if_modified`. The calendar logic (including
+    the lazy regeneration) runs unchanged through `AsyncSession.run_sync`, so
+    its queries go through the async driver without blocking a worker thread.
+    """
+    return await db.run_sync(
+        lambda session: get_calendar_if_modified(
+            session, user_id, goal_id, range_request, if_none_match, lang
+        )
+    )
+
+
 def close_goal_day(
     db: Session,
     user_id: int,
@@ -339,20 +525,11 @@ def close_goal_day(
     - Si `blocked_reason` viene informado, el día se marca como BLOCKED.
     - En caso contrario, se marca como COMPLETED.
     """
-    account = db.query(Account).filter(Account.user_id == user_id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    goal = db.query(Goal).filter(
-        Goal.id == goal_id,
-        Goal.account_id == account.id,
-    ).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
-
-    regenerate_goal_calendar(db, goal.id)
+    goal = _get_user_goal(db, user_id, goal_id)
 
     target_date = close_data.date if close_data and close_data.date else date.today()
+    refresh_goal_calendar(db, goal.id, target_date)
+
     plan = db.query(GoalDailyPlan).filter(
         GoalDailyPlan.goal_id == goal.id,
         GoalDailyPlan.date == target_date,
@@ -375,7 +552,7 @@ def close_goal_day(
         plan.blocked_reason = None
 
     db.commit()
-    regenerate_goal_calendar(db, goal.id)
+    refresh_goal_calendar(db, goal.id, target_date)
 
     updated = db.query(GoalDailyPlan).filter(GoalDailyPlan.id == plan.id).first()
     return updated
@@ -0,0 +1,206 @@
+"""
+Rollup diario de operaciones (`daily_account_stats`).
+
+Las escrituras (`record_operation`) se hacen dentro de la transacción que
+crea la operación, sin commit propio. Las lecturas de reportes, progreso del
+objetivo y calendario consultan esta tabla en lugar de recorrer
+operations → trading_sessions → trading_days.
+"""
+
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.daily_account_stats import DailyAccountStats
+from ..models.operation import Operation, OperationResult
+from ..models.trading_day import TradingDay
+from ..models.trading_session import TradingSession
+
+
+class WindowTotals(NamedTuple):
+    operations: int
+    wins: int
+    realized_pnl: float
+
+    @property
+    def winrate(self) -> Optional[float]:
+        return self.wins / self.operations if self.operations else None
+
+
+def _get_or_create_stats(db: Session, account_id: int, stats_date: date) -> DailyAccountStats:
+    stats = db.query(DailyAccountStats).filter(
+        DailyAccountStats.account_id == account_id,
+        DailyAccountStats.date == stats_date,
+    ).first()
+    if stats:
+        return stats
+
+    # Otra petición puede crear la fila a la vez: el savepoint aísla el conflicto
+    # de la unique constraint sin abortar la transacción de la operación.
+    try:
+        with db.begin_nested():
+            stats = DailyAccountStats(account_id=account_id, date=stats_date)
+            db.add(stats)
+    except IntegrityError:
+        stats = db.query(DailyAccountStats).filter(
+            DailyAccountStats.account_id == account_id,
+            DailyAccountStats.date == stats_date,
+        ).one()
+    return stats
+
+
+def record_operation(
+    db: Session,
+    account_id: int,
+    stats_date: date,
+    result: OperationResult,
+    profit: float,
+    first_in_session: bool,
+) -> None:
+    """
+    Suma una operación al rollup del día. No hace commit: el llamador lo hace
+    junto con la operación. Los incrementos se resuelven en SQL para no perder
+    escrituras concurrentes sobre la misma fila.
+    """
+    record_operations(db, account_id, stats_date, [(result, profit)], int(first_in_session))
+
+
+def record_operations(
+    db: Session,
+    account_id: int,
+    stats_date: date,
+    results: Iterable[tuple[OperationResult, float]],
+    new_sessions: int = 0,
+) -> None:
+    """
+    Suma varias operaciones del mismo día al rollup con un solo UPDATE.
+    `new_sessions` es cuántas sesiones pasan a tener su primera operación.
+    Igual que `record_operation`, no hace commit.
+    """
+    ops = wins = losses = draws = 0
+    realized = gross_profit = gross_loss = 0.0
+    for result, profit in results:
+        result = OperationResult(result)
+        profit = float(profit or 0.0)
+        ops += 1
+        realized += profit
+        if result == OperationResult.WIN:
+            wins += 1
+            gross_profit += profit
+        elif result == OperationResult.LOSS:
+            losses += 1
+            gross_loss -= profit
+        else:
+            draws += 1
+    if not ops:
+        return
+
+    stats = _get_or_create_stats(db, account_id, stats_date)
+    db.query(DailyAccountStats).filter(DailyAccountStats.id == stats.id).update(
+        {
+            DailyAccountStats.ops: DailyAccountStats.ops + ops,
+            DailyAccountStats.wins: DailyAccountStats.wins + wins,
+            DailyAccountStats.losses: DailyAccountStats.losses + losses,
+            DailyAccountStats.draws: DailyAccountStats.draws + draws,
+            DailyAccountStats.realized_pnl: DailyAccountStats.realized_pnl + realized,
+            DailyAccountStats.gross_profit: DailyAccountStats.gross_profit + gross_profit,
+            DailyAccountStats.gross_loss: DailyAccountStats.gross_loss + gross_loss,
+            DailyAccountStats.sessions_with_ops: DailyAccountStats.sessions_with_ops + new_sessions,
+        },
+        synchronize_session=False,
+    )
+    db.expire(stats)
+
+
+def rebuild_daily_stats(db: Session, account_id: Optional[int] = None) -> int:
+    """
+    Recalcula el rollup desde `operations` (todas las cuentas o una).
+    Devuelve el número de días reconstruidos.
+    """
+    rows = db.query(
+        TradingDay.account_id,
+        TradingDay.date,
+        func.count(Operation.id).label("ops"),
+        func.sum(case((Operation.result == OperationResult.WIN, 1), else_=0)).label("wins"),
+        func.sum(case((Operation.result == OperationResult.LOSS, 1), else_=0)).label("losses"),
+        func.sum(case((Operation.result == OperationResult.DRAW, 1), else_=0)).label("draws"),
+        func.coalesce(func.sum(Operation.profit), 0.0).label("realized_pnl"),
+        func.sum(
+            case((Operation.result == OperationResult.WIN, Operation.profit), else_=0.0)
+        ).label("gross_profit"),
+        func.sum(
+            case((Operation.result == OperationResult.LOSS, -Operation.profit), else_=0.0)
+        ).label("gross_loss"),
+        func.count(func.distinct(Operation.session_id)).label("sessions_with_ops"),
+    ).join(
+        TradingSession, Operation.session_id == TradingSession.id
+    ).join(
+        TradingDay, TradingSession.trading_day_id == TradingDay.id
+    )
+    stale = db.query(DailyAccountStats)
+    if account_id is not None:
+        rows = rows.filter(TradingDay.account_id == account_id)
+        stale = stale.filter(DailyAccountStats.account_id == account_id)
+    rows = rows.group_by(TradingDay.account_id, TradingDay.date).all()
+
+    stale.delete(synchronize_session=False)
+    db.add_all([
+        DailyAccountStats(
+            account_id=row.account_id,
+            date=row.date,
+            ops=int(row.ops),
+            wins=int(row.wins or 0),
+            losses=int(row.losses or 0),
+            draws=int(row.draws or 0),
+            realized_pnl=float(row.realized_pnl or 0.0),
+            gross_profit=float(row.gross_profit or 0.0),
+            gross_loss=float(row.gross_loss or 0.0),
+            sessions_with_ops=int(row.sessions_with_ops),
+        )
+        for row in rows
+    ])
+    db.commit()
+    return len(rows)
+
+
+def get_stats_by_date(db: Session, account_id: int, from_date: date) -> dict:
+    """Rollups de la cuenta desde `from_date`, indexados por fecha."""
+    rows = db.query(DailyAccountStats).filter(
+        DailyAccountStats.account_id == account_id,
+        DailyAccountStats.date >= from_date,
+        DailyAccountStats.ops > 0,
+    ).all()
+    return {row.date: row for row in rows}
+
+
+def get_window_totals(db: Session, account_id: int, cutoffs: dict) -> dict:
+    """
+    Totales (operaciones, wins, PnL) desde cada fecha de `cutoffs` en una sola
+    consulta: cada ventana es un SUM(CASE WHEN date >= corte ...).
+    """
+    columns = []
+    for cutoff in cutoffs.values():
+        in_window = DailyAccountStats.date >= cutoff
+        columns += [
+            func.coalesce(func.sum(case((in_window, DailyAccountStats.ops), else_=0)), 0),
+            func.coalesce(func.sum(case((in_window, DailyAccountStats.wins), else_=0)), 0),
+            func.coalesce(func.sum(case((in_window, DailyAccountStats.realized_pnl), else_=0.0)), 0.0),
+        ]
+
+    row = db.query(*columns).filter(
+        DailyAccountStats.account_id == account_id,
+        DailyAccountStats.date >= min(cutoffs.values()),
+    ).one()
+
+    return {
+        key: WindowTotals(int(row[i * 3]), int(row[i * 3 + 1]), float(row[i * 3 + 2]))
+        for i, key in enumerate(cutoffs)
+    }
+
+
+def get_winrate_since(db: Session, account_id: int, from_date: date) -> Optional[float]:
+    """Winrate real desde `from_date` (None si no hay operaciones)."""
+    return get_window_totals(db, account_id, {"since": from_date})["since"].winrate
@@ -0,0 +1,244 @@
+"""
+Envío de los emails del outbox en segundo plano.
+
+Un hilo por proceso (`start_worker`) toma lotes de EMAIL_OUTBOX_BATCH_SIZE
+emails vencidos (`status = 'pending' AND next_attempt_at <= now`) y los
+envía por una única conexión SMTP que se mantiene abierta entre lotes
+(STARTTLS y login una sola vez). Los errores temporales (4xx, conexión
+caída) reprograman el email con backoff exponencial; los 5xx o agotar
+EMAIL_OUTBOX_MAX_ATTEMPTS lo marcan como `failed`.
+
+En PostgreSQL el lote se toma con FOR UPDATE SKIP LOCKED, así varios
+workers de uvicorn pueden drenar el outbox sin enviar dos veces el mismo
+email. La entrega es "al menos una vez": si el proceso muere a mitad de un
+lote, esos emails se reenvían.
+"""
+
+import logging
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.email_outbox import EmailOutbox
+from .email_service import build_message
+from .polling_worker import PollingWorker
+
+logger = logging.getLogger("app.email_outbox")
+
+# Sesiones del worker (los tests apuntan a su propia DB)
+session_factory: Optional[Callable[[], Session]] = None
+
+_lock = threading.Lock()
+_worker: Optional["OutboxWorker"] = None
+
+
+def _session() -> Session:
+    global session_factory
+    if session_factory is None:
+        from ..database import SessionLocal
+        session_factory = SessionLocal
+    return session_factory()
+
+
+class SmtpSender:
+    """Conexión SMTP reutilizable: se abre al primer envío y se reabre si el servidor la corta."""
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SEC)
+        if settings.SMTP_STARTTLS:
+            server.starttls()
+        if settings.SMTP_USER and settings.SMTP_PASS:
+            server.login(settings.SMTP_USER, settings.SMTP_PASS)
+        return server
+
+    def send(self, to_email: str, subject: str, html_body: str) -> None:
+        # Modo desarrollo: solo loguear
+        if not settings.SMTP_HOST:
+            logger.info("[EMAIL - DEV MODE] To: %s | Subject: %s\n%s", to_email, subject, html_body)
+            return
+
+        self.close_if_idle()
+        message = build_message(to_email, subject, html_body)
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(message)
+                break
+            except smtplib.SMTPServerDisconnected:
+                # Conexión reutilizada que el servidor ya cerró: una reconexión
+                self._server = None
+                if attempt:
+                    raise
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self) -> None:
+        if self._server is not None and time.monotonic() - self._last_used > settings.SMTP_IDLE_TIMEOUT_SEC:
+            self.close()
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+# Fallos de la sesión SMTP (no del email): se corta el lote y nunca son definitivos
+_CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    smtplib.SMTPHeloError,
+    smtplib.SMTPAuthenticationError,
+    smtplib.SMTPNotSupportedError,
+)
+
+
+def _is_permanent(exc: smtplib.SMTPException) -> bool:
+    """5xx del servidor para este email (remitente, destinatarios o contenido)."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+
+def _describe(exc: smtplib.SMTPException) -> str:
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return f"Recipients refused: {exc.recipients!r}"
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return f"{exc.smtp_code} {exc.smtp_error!r}"
+    return str(exc) or type(exc).__name__
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = settings.EMAIL_OUTBOX_BACKOFF_BASE_SEC * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.EMAIL_OUTBOX_BACKOFF_MAX_SEC))
+
+
+def _record_failure(email: EmailOutbox, error: str, permanent: bool) -> None:
+    email.attempts += 1
+    email.last_error = error[:500]
+    if permanent or email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = "failed"
+        logger.warning("Email %d to %s failed permanently: %s", email.id, email.to_email, email.last_error)
+    else:
+        email.next_attempt_at = datetime.utcnow() + _backoff(email.attempts)
+
+
+def drain_outbox(db: Session, sender: SmtpSender, limit: Optional[int] = None) -> int:
+    """
+    Envía un lote de emails vencidos y confirma su estado.
+    Devuelve cuántos se procesaron (enviados, reprogramados o fallidos).
+    """
+    batch = (
+        db.query(EmailOutbox)
+        .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime.utcnow())
+        .order_by(EmailOutbox.id)
+        .limit(limit or settings.EMAIL_OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    processed = 0
+    for email in batch:
+        processed += 1
+        try:
+            sender.send(email.to_email, email.subject, email.html_body)
+        except smtplib.SMTPException as exc:
+            if isinstance(exc, _CONNECTION_ERRORS):
+                sender.close()
+                _record_failure(email, str(exc) or type(exc).__name__, permanent=False)
+                break
+            _record_failure(email, _describe(exc), permanent=_is_permanent(exc))
+        except OSError as exc:
+            # SMTP inalcanzable: se reprograma este y el resto del lote queda para después
+            sender.close()
+            _record_failure(email, str(exc) or type(exc).__name__, permanent=False)
+            break
+        else:
+            email.status = "sent"
+            email.attempts += 1
+            email.last_error = None
+            email.sent_at = datetime.utcnow()
+
+    db.commit()
+    return processed
+
+
+def queue_depth(db: Session) -> dict:
+    """Emails pendientes (y cuántos ya vencidos), fallidos y antigüedad del más viejo."""
+    now = datetime.utcnow()
+    pending, due, oldest = db.query(
+        func.count(EmailOutbox.id),
+        func.count(EmailOutbox.id).filter(EmailOutbox.next_attempt_at <= now),
+        func.min(EmailOutbox.created_at),
+    ).filter(EmailOutbox.status == "pending").one()
+    failed = db.query(func.count(EmailOutbox.id)).filter(EmailOutbox.status == "failed").scalar()
+    return {
+        "pending": pending,
+        "due": due,
+        "failed": failed,
+        "oldest_pending_sec": round((now - oldest).total_seconds(), 1) if oldest else 0.0,
+    }
+
+
+class OutboxWorker(PollingWorker):
+    """Drena el outbox con una conexión SMTP que se reutiliza entre lotes."""
+
+    name = "email-outbox"
+
+    def __init__(self):
+        super().__init__()
+        self.sender = SmtpSender()
+
+    def batch_size(self) -> int:
+        return settings.EMAIL_OUTBOX_BATCH_SIZE
+
+    def poll_sec(self) -> float:
+        return settings.EMAIL_OUTBOX_POLL_SEC
+
+    def drain(self) -> int:
+        db = _session()
+        try:
+            return drain_outbox(db, self.sender)
+        finally:
+            db.close()
+
+    def idle(self) -> None:
+        self.sender.close_if_idle()
+
+    def close(self) -> None:
+        self.sender.close()
+
+
+def start_worker() -> None:
+    global _worker
+    with _lock:
+        if _worker is None and settings.EMAIL_OUTBOX_WORKER:
+            _worker = OutboxWorker()
+            _worker.start()
+
+
+def stop_worker() -> None:
+    global _worker
+    with _lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop()
+
+
+def notify() -> None:
+    """Avisa al worker de este proceso de que hay emails nuevos (tras el commit)."""
+    worker = _worker
+    if worker is not None:
+        worker.wake()
@@ -1,9 +1,11 @@
 """
-Servicio de envío de emails.
-Configuración SMTP desde .env
+Servicio de emails.
+
+Los emails no se envían dentro de la petición: se escriben en la tabla
+`email_outbox` junto con el resto de la transacción y los envía el worker
+de `email_outbox_service`. Configuración SMTP desde .env
 """
 
-import smtplib
 import secrets
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -13,6 +15,7 @@ from sqlalchemy.orm import Session
 
 from ..config import settings
 from ..models.user import User
+from ..models.email_outbox import EmailOutbox
 
 
 def generate_verification_token() -> str:
@@ -25,48 +28,37 @@ def create_verification_link(token: str) -> str:
     return f"{settings.FRONTEND_URL}/verify-email?token={token}"
 
 
-def send_email(to_email: str, subject: str, html_body: str) -> bool:
+def build_message(to_email: str, subject: str, html_body: str) -> MIMEMultipart:
+    """Mensaje MIME listo para `smtplib.SMTP.send_message`."""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = settings.SMTP_USER
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, html_body: str) -> EmailOutbox:
     """
-    Envía un email usando SMTP.
-    Retorna True si se envió correctamente, False si falló.
-    
-    NOTA: Si SMTP_HOST está vacío, solo loguea el email (modo desarrollo).
+    Deja el email en el outbox dentro de la transacción actual (no hace commit).
+    Lo envía el worker de `email_outbox_service` cuando la transacción se confirma.
     """
-    # Modo desarrollo: solo loguear
-    if not settings.SMTP_HOST:
-        print(f"\n{'='*60}")
-        print(f"[EMAIL - DEV MODE]")
-        print(f"To: {to_email}")
-        print(f"Subject: {subject}")
-        print(f"Body:\n{html_body}")
-        print(f"{'='*60}\n")
-        return True
-    
-    # Modo producción: enviar email real
-    try:
-        msg = MIMEMultipart('alternative')
-        msg['From'] = settings.SMTP_USER
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        html_part = MIMEText(html_body, 'html')
-        msg.attach(html_part)
-        
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASS)
-            server.send_message(msg)
-        
-        return True
-    
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
+    email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html_body=html_body,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(email)
+    return email
 
 
-def send_verification_email(db: Session, user: User) -> bool:
+def queue_verification_email(db: Session, user: User) -> EmailOutbox:
     """
-    Genera token de verificación y envía email al usuario.
+    Genera token de verificación y encola el email al usuario,
+    en la misma transacción que el llamador (no hace commit).
     """
     # Generar token
     token = generate_verification_token()
@@ -75,7 +67,6 @@ def send_verification_email(db: Session, user: User) -> bool:
     # Actualizar usuario
     user.email_verification_token = token
     user.email_verification_sent_at = datetime.utcnow()
-    db.commit()
     
     # Construir email
     subject = "Verify your email - Capital Manager"
@@ -122,7 +113,7 @@ def send_verification_email(db: Session, user: User) -> bool:
     </html>
     """
     
-    return send_email(user.email, subject, html_body)
+    return enqueue_email(db, user.email, subject, html_body)
 
 
 def verify_email_token(db: Session, token: str) -> Optional[User]:
@@ -1,14 +1,15 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from typing import Optional
-import math
 from ..models.goal import Goal
 from ..models.account import Account
 from ..schemas.goal_planner import (
     GoalCreate, GoalUpdate, GoalResponse, 
-    PlanCalculateRequest, PlanCalculateResponse
+    PlanCalculateRequest, PlanCalculateResponse,
+    PlanSimulateRequest, PlanSimulateResponse, CapitalBand
 )
 from ..utils.messages import get_message
+from . import projection_engine, risk_simulator
 
 def create_or_update_goal(
     db: Session, 
@@ -141,35 +142,22 @@ def calculate_plan(
     loss_amount = stake
     
     # Retorno esperado por operación
-    expected_return_per_op = (
-        plan_request.winrate * payout - 
-        (1 - plan_request.winrate) * 1.0
-    )
+    expected_return_per_op = projection_engine.expected_return_per_op(plan_request.winrate, payout)
     
     # Operaciones por día
     ops_per_day = plan_request.sessions_per_day * plan_request.ops_per_session
     
     # Factor de crecimiento diario
-    risk_fraction = plan_request.risk_percent / 100.0
-    daily_return = risk_fraction * ops_per_day * expected_return_per_op
-    daily_growth_factor = 1 + daily_return
+    daily_growth_factor = projection_engine.daily_growth_factor(
+        plan_request.risk_percent, ops_per_day, plan_request.winrate, payout
+    )
     
     # Proyecciones
-    if daily_growth_factor > 0:
-        projection_15 = current_capital * (daily_growth_factor ** 15)
-        projection_30 = current_capital * (daily_growth_factor ** 30)
-    else:
-        projection_15 = 0
-        projection_30 = 0
+    projection_15 = projection_engine.project_capital(current_capital, daily_growth_factor, 15)
+    projection_30 = projection_engine.project_capital(current_capital, daily_growth_factor, 30)
     
     # Días para alcanzar meta
-    days_to_goal = None
-    if target_capital and daily_growth_factor > 1:
-        try:
-            days_to_goal = math.log(target_capital / current_capital) / math.log(daily_growth_factor)
-            days_to_goal = int(math.ceil(days_to_goal))
-        except (ValueError, ZeroDivisionError):
-            days_to_goal = None
+    days_to_goal = projection_engine.days_to_target(current_capital, target_capital, daily_growth_factor)
     
     # Warnings y alertas
     warnings = []
@@ -215,4 +203,67 @@ def calculate_plan(
         blocked_recommended=blocked_recommended,
         warnings=warnings,
         limits_reminder=limits_reminder
-    )
\ No newline at end of file
+    )
+
+def simulate_plan(
+    db: Session, 
+    user_id: int, 
+    simulate_request: PlanSimulateRequest, 
+    lang: str = "en"
+) -> PlanSimulateResponse:
+    """Simular el plan con Monte Carlo: bandas de capital, probabilidad de meta y riesgo de ruina"""
+    account = db.query(Account).filter(Account.user_id == user_id).first()
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=get_message("account_not_found", lang)
+        )
+    
+    goal = db.query(Goal).filter(Goal.account_id == account.id).first()
+    target_capital = goal.target_capital if goal else None
+    
+    current_capital = round(float(account.capital), 2)
+    ruin_fraction = simulate_request.ruin_percent / 100.0
+    
+    # Parámetros redondeados: forman la clave de la caché de resultados
+    params = risk_simulator.SimulationParams(
+        capital=current_capital,
+        payout=float(account.payout),
+        target_capital=target_capital,
+        sessions_per_day=simulate_request.sessions_per_day,
+        ops_per_session=simulate_request.ops_per_session,
+        risk_percent=float(simulate_request.risk_percent),
+        winrate=round(simulate_request.winrate, 4),
+        draw_rate=round(simulate_request.draw_rate, 4),
+        days=simulate_request.days,
+        paths=simulate_request.paths,
+        ruin_fraction=ruin_fraction,
+        seed=simulate_request.seed,
+    )
+    result = risk_simulator.simulate_cached(params)
+    
+    return PlanSimulateResponse(
+        sessions_per_day=simulate_request.sessions_per_day,
+        ops_per_session=simulate_request.ops_per_session,
+        risk_percent=simulate_request.risk_percent,
+        winrate=simulate_request.winrate,
+        draw_rate=simulate_request.draw_rate,
+        days=simulate_request.days,
+        paths=result.paths,
+        seed=simulate_request.seed,
+        current_capital=current_capital,
+        payout=account.payout,
+        target_capital=target_capital,
+        probability_hit_target=(
+            round(result.probability_hit_target, 4)
+            if result.probability_hit_target is not None else None
+        ),
+        risk_of_ruin=round(result.risk_of_ruin, 4),
+        ruin_capital=round(current_capital * ruin_fraction, 2),
+        mean_final_capital=round(result.mean_final_capital, 2),
+        blocked_days_ratio=round(result.blocked_days_ratio, 4),
+        capital_bands=[
+            CapitalBand(day=day, p5=p5, p25=p25, p50=p50, p75=p75, p95=p95)
+            for day, p5, p25, p50, p75, p95 in result.bands
+        ]
+    )
@@ -1,19 +1,19 @@
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from typing import Optional
-import math
 from ..models.goal import Goal, GoalStatus
 from ..models.account import Account
-from ..models.operation import Operation, OperationResult
-from ..models.trading_session import TradingSession
-from ..models.trading_day import TradingDay
 from ..schemas.goal_extended import (
-    GoalCreateExtended, GoalUpdate, GoalResponseExtended, GoalProgressResponse
+    GoalCreateExtended, GoalUpdate, GoalResponseExtended, GoalProgressResponse, WinrateWindow
 )
 from ..services.daily_plan_service import regenerate_goal_calendar
+from ..services import projection_engine
+from ..services.daily_stats_service import get_window_totals, get_winrate_since
 from ..utils.messages import get_message
 
+WINRATE_WINDOWS = (7, 30, 90)
+
 def create_goal(
     db: Session, 
     user_id: int, 
@@ -179,7 +179,8 @@ def get_goal_progress(
     db: Session, 
     user_id: int, 
     goal_id: int, 
-    lang: str = "en"
+    lang: str = "en",
+    include_windows: bool = False
 ) -> GoalProgressResponse:
     """Obtener progreso detallado del objetivo con winrate real y ETA"""
     account = db.query(Account).filter(Account.user_id == user_id).first()
@@ -206,37 +207,28 @@ def get_goal_progress(
     progress_percent = (current_capital / goal.target_capital) * 100
     days_elapsed = (date.today() - goal.start_date).days
     
-    # Calcular winrate real desde el inicio del objetivo
-    operations = db.query(Operation).join(
-        TradingSession, Operation.session_id == TradingSession.id
-    ).join(
-        TradingDay, TradingSession.trading_day_id == TradingDay.id
-    ).filter(
-        TradingDay.account_id == account.id,
-        TradingDay.date >= goal.start_date
-    ).all()
-    
-    real_winrate = None
-    if operations:
-        wins = sum(1 for op in operations if op.result == OperationResult.WIN)
-        total = len(operations)
-        real_winrate = wins / total if total > 0 else None
+    # Winrate y PnL real desde el inicio del objetivo (y ventanas móviles
+    # opcionales) en una sola consulta agregada
+    cutoffs = {"goal": goal.start_date}
+    if include_windows:
+        for window in WINRATE_WINDOWS:
+            cutoffs[window] = date.today() - timedelta(days=window - 1)
+    totals = get_window_totals(db, account.id, cutoffs)
+    real_winrate = totals["goal"].winrate
     
     # Calcular ETA usando winrate real o estimate
     winrate_for_calc = real_winrate if real_winrate is not None else goal.winrate_estimate
     
-    risk_fraction = goal.risk_percent / 100.0
     ops_per_day = goal.sessions_per_day * goal.ops_per_session
-    expected_return = winrate_for_calc * goal.payout_snapshot - (1 - winrate_for_calc)
-    daily_growth_factor = 1 + (risk_fraction * ops_per_day * expected_return)
+    daily_growth_factor = projection_engine.daily_growth_factor(
+        goal.risk_percent, ops_per_day, winrate_for_calc, goal.payout_snapshot
+    )
     
     estimated_days_to_goal = None
-    if daily_growth_factor > 1 and current_capital < goal.target_capital:
-        try:
-            estimated_days_to_goal = math.log(goal.target_capital / current_capital) / math.log(daily_growth_factor)
-            estimated_days_to_goal = int(math.ceil(estimated_days_to_goal))
-        except (ValueError, ZeroDivisionError):
-            estimated_days_to_goal = None
+    if current_capital < goal.target_capital:
+        estimated_days_to_goal = projection_engine.days_to_target(
+            current_capital, goal.target_capital, daily_growth_factor
+        )
     
     # Construir respuesta
     goal_response = GoalResponseExtended.from_orm(goal)
@@ -250,28 +242,23 @@ def get_goal_progress(
         progress_percent=round(progress_percent, 2),
         days_elapsed=days_elapsed,
         real_winrate=round(real_winrate, 4) if real_winrate is not None else None,
+        realized_pnl=round(totals["goal"].realized_pnl, 2),
         estimated_days_to_goal=estimated_days_to_goal,
-        daily_growth_factor=round(daily_growth_factor, 6)
+        daily_growth_factor=round(daily_growth_factor, 6),
+        winrate_windows=[
+            WinrateWindow(
+                days=window,
+                operations=totals[window].operations,
+                wins=totals[window].wins,
+                winrate=round(totals[window].winrate, 4) if totals[window].winrate is not None else None,
+                realized_pnl=round(totals[window].realized_pnl, 2)
+            )
+            for window in WINRATE_WINDOWS
+        ] if include_windows else None
     )
 
 def calculate_real_winrate(db: Session, account_id: int, days: int = 30) -> Optional[float]:
     """Calcular winrate real de últimos N días"""
-    from datetime import timedelta
     cutoff_date = date.today() - timedelta(days=days)
     
-    operations = db.query(Operation).join(
-        TradingSession, Operation.session_id == TradingSession.id
-    ).join(
-        TradingDay, TradingSession.trading_day_id == TradingDay.id
-    ).filter(
-        TradingDay.account_id == account_id,
-        TradingDay.date >= cutoff_date
-    ).all()
-    
-    if not operations:
-        return None
-    
-    wins = sum(1 for op in operations if op.result == OperationResult.WIN)
-    total = len(operations)
-    
-    return wins / total if total > 0 else 0.0
+    return get_winrate_since(db, account_id, cutoff_date)
@@ -1,63 +1,185 @@
 """
 Servicio para verificación de compras de Google Play.
+
+El cliente de la API y las credenciales se crean una vez por proceso: el
+documento de discovery es el que trae googleapiclient (no se descarga ni
+se vuelve a parsear por compra) y las credenciales renuevan el token OAuth
+solo cuando vence. `verify_purchase_async` hace las mismas llamadas con
+httpx para no retener un hilo durante los round trips a Google.
 """
 
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from datetime import datetime
+from typing import Optional
+from urllib.parse import quote
+import asyncio
+import httplib2
+import httpx
 import json
-import os
+import logging
+import threading
 
 from ..models.google_play_purchase import GooglePlayPurchase
 from ..models.subscription import Subscription
 from ..models.plan import Plan
 from ..config import settings
-from .plan_service import create_subscription
+from .plan_service import create_subscription, invalidate_user_plan
+from ..utils.http_client import get_http_session
+
+logger = logging.getLogger("app.google_play")
+
+ANDROIDPUBLISHER_SCOPE = 'https://www.googleapis.com/auth/androidpublisher'
+
+# Mapear product_id a plan
+PLAN_MAPPING = {
+    "basic_monthly": "BASIC",
+    "basic_annual": "BASIC",
+    "pro_monthly": "PRO",
+    "pro_annual": "PRO"
+}
+
+_lock = threading.Lock()
+_token_lock = threading.Lock()
+_local = threading.local()
+_credentials: Optional[service_account.Credentials] = None
+_service = None
+_async_client: Optional[tuple] = None  # (event loop, httpx.AsyncClient)
+_generation = 0
+
+
+def _get_credentials() -> service_account.Credentials:
+    """Credenciales de la cuenta de servicio (una por proceso; renuevan su token solas)."""
+    global _credentials
+    with _lock:
+        if _credentials is None:
+            if not settings.GOOGLE_PLAY_SERVICE_ACCOUNT_JSON:
+                raise ValueError("GOOGLE_PLAY_SERVICE_ACCOUNT_JSON no configurado")
+            credentials_info = json.loads(settings.GOOGLE_PLAY_SERVICE_ACCOUNT_JSON)
+            _credentials = service_account.Credentials.from_service_account_info(
+                credentials_info, scopes=[ANDROIDPUBLISHER_SCOPE]
+            )
+        return _credentials
 
 
 def get_google_play_service():
     """
-    Inicializa el servicio de Google Play Developer API.
+    Cliente de Google Play Developer API, construido una vez por proceso con
+    el documento de discovery incluido en googleapiclient (sin descargarlo).
+
+    El objeto se comparte entre hilos, pero cada `execute` debe recibir el
+    `http` del hilo (`_authorized_http`): httplib2 no es thread-safe.
     """
-    if not settings.GOOGLE_PLAY_SERVICE_ACCOUNT_JSON:
-        raise ValueError("GOOGLE_PLAY_SERVICE_ACCOUNT_JSON no configurado")
-    
-    # Cargar credenciales desde JSON
-    credentials_info = json.loads(settings.GOOGLE_PLAY_SERVICE_ACCOUNT_JSON)
-    credentials = service_account.Credentials.from_service_account_info(
-        credentials_info,
-        scopes=['https://www.googleapis.com/auth/androidpublisher']
+    global _service
+    credentials = _get_credentials()
+    with _lock:
+        if _service is None:
+            _service = build(
+                'androidpublisher', 'v3',
+                credentials=credentials,
+                static_discovery=True,
+                cache_discovery=False,
+                client_options={"api_endpoint": settings.GOOGLE_PLAY_API_URL},
+            )
+        return _service
+
+
+def _authorized_http() -> AuthorizedHttp:
+    """Conexión autenticada del hilo actual (refresca el token cuando vence)."""
+    if getattr(_local, "generation", None) != _generation:
+        _local.http = AuthorizedHttp(_get_credentials(), http=httplib2.Http(timeout=settings.GOOGLE_PLAY_TIMEOUT_SEC))
+        _local.generation = _generation
+    return _local.http
+
+
+def reset_google_play_client() -> None:
+    """Descarta cliente y credenciales (cambio de configuración / tests)."""
+    global _service, _credentials, _async_client, _generation
+    with _lock:
+        _service = None
+        _credentials = None
+        _async_client = None
+        _generation += 1  # los hilos rehacen su AuthorizedHttp
+
+
+def fetch_subscription(package_name: str, product_id: str, purchase_token: str) -> dict:
+    """purchases.subscriptions.get con el cliente compartido."""
+    return get_google_play_service().purchases().subscriptions().get(
+        packageName=package_name,
+        subscriptionId=product_id,
+        token=purchase_token
+    ).execute(http=_authorized_http())
+
+
+# ── Variante async (sin bloquear un hilo por cada round trip) ──
+
+def _access_token() -> str:
+    """Token OAuth vigente; solo lo renueva (llamada bloqueante) cuando vence."""
+    credentials = _get_credentials()
+    with _token_lock:
+        if not credentials.valid:
+            credentials.refresh(GoogleAuthRequest(session=get_http_session()))
+        return credentials.token
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Cliente httpx del event loop actual (el pool de conexiones no se comparte entre loops)."""
+    global _async_client
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if _async_client is None or _async_client[0] is not loop:
+            _async_client = (loop, httpx.AsyncClient(
+                base_url=settings.GOOGLE_PLAY_API_URL,
+                timeout=settings.GOOGLE_PLAY_TIMEOUT_SEC,
+            ))
+        return _async_client[1]
+
+
+async def close_async_client() -> None:
+    global _async_client
+    with _lock:
+        current, _async_client = _async_client, None
+    if current is not None and current[0] is asyncio.get_running_loop():
+        await current[1].aclose()
+
+
+def _subscription_path(package_name: str, product_id: str, purchase_token: str) -> str:
+    return (
+        f"androidpublisher/v3/applications/{quote(package_name, safe='')}"
+        f"/purchases/subscriptions/{quote(product_id, safe='')}/tokens/{quote(purchase_token, safe='')}"
     )
-    
-    service = build('androidpublisher', 'v3', credentials=credentials)
-    return service
 
 
-def verify_purchase(
-    db: Session,
-    user_id: int,
-    purchase_token: str,
-    product_id: str,
-    package_name: str = None
-) -> dict:
-    """
-    Verifica una compra con Google Play y la registra en la base de datos.
-    
-    Args:
-        db: Sesión de base de datos
-        user_id: ID del usuario
-        purchase_token: Token de compra de Google
-        product_id: ID del producto (ej: "basic_monthly")
-        package_name: Nombre del paquete (opcional, usa el de config si no se provee)
-    
-    Returns:
-        dict con información de la compra verificada
-    """
-    if not package_name:
-        package_name = settings.GOOGLE_PLAY_PACKAGE_NAME
-    
-    # Verificar si la compra ya existe
+async def _api_call_async(method: str, path: str) -> dict:
+    credentials = _get_credentials()
+    token = credentials.token if credentials.valid else await run_in_threadpool(_access_token)
+    response = await _get_async_client().request(
+        method, path, headers={"Authorization": f"Bearer {token}"}
+    )
+    if response.status_code == 401:
+        # Token revocado o vencido entre la comprobación y la llamada: renovar una vez
+        with _token_lock:
+            credentials.token = None
+        token = await run_in_threadpool(_access_token)
+        response = await _get_async_client().request(
+            method, path, headers={"Authorization": f"Bearer {token}"}
+        )
+    response.raise_for_status()
+    return response.json() if response.content else {}
+
+
+async def fetch_subscription_async(package_name: str, product_id: str, purchase_token: str) -> dict:
+    """purchases.subscriptions.get por HTTP async (mismo JSON que `fetch_subscription`)."""
+    return await _api_call_async("GET", _subscription_path(package_name, product_id, purchase_token))
+
+
+# ── Verificación de compras ────────────────────────
+
+def _existing_purchase_result(db: Session, purchase_token: str) -> Optional[dict]:
     existing_purchase = db.query(GooglePlayPurchase).filter(
         GooglePlayPurchase.purchase_token == purchase_token
     ).first()
@@ -68,18 +190,22 @@ def verify_purchase(
             "purchase_id": existing_purchase.id,
             "verified": existing_purchase.verified
         }
-    
+    return None
+
+
+def _record_purchase(
+    db: Session,
+    user_id: int,
+    purchase_token: str,
+    product_id: str,
+    package_name: str,
+    result: dict,
+) -> tuple[dict, bool]:
+    """
+    Registra la compra verificada (y la suscripción si está pagada).
+    Devuelve (respuesta, hay_que_reconocerla).
+    """
     try:
-        # Obtener servicio de Google Play
-        service = get_google_play_service()
-        
-        # Verificar la compra con Google
-        result = service.purchases().subscriptions().get(
-            packageName=package_name,
-            subscriptionId=product_id,
-            token=purchase_token
-        ).execute()
-        
         # Extraer información
         purchase_time_millis = int(result.get('startTimeMillis', 0))
         expiry_time_millis = int(result.get('expiryTimeMillis', 0))
@@ -112,15 +238,7 @@ def verify_purchase(
         db.add(purchase)
         db.flush()
         
-        # Mapear product_id a plan
-        plan_mapping = {
-            "basic_monthly": "BASIC",
-            "basic_annual": "BASIC",
-            "pro_monthly": "PRO",
-            "pro_annual": "PRO"
-        }
-        
-        plan_name = plan_mapping.get(product_id, "FREE")
+        plan_name = PLAN_MAPPING.get(product_id, "FREE")
         
         # Crear o actualizar suscripción
         if purchase_state == "PURCHASED":
@@ -135,10 +253,6 @@ def verify_purchase(
         
         db.commit()
         
-        # Reconocer compra si no está reconocida
-        if ack_state == "NOT_ACKNOWLEDGED":
-            acknowledge_purchase(service, package_name, product_id, purchase_token)
-        
         return {
             "status": "verified",
             "purchase_id": purchase.id,
@@ -146,12 +260,90 @@ def verify_purchase(
             "plan": plan_name,
             "expiry": purchase.expiry_datetime.isoformat() if purchase.expiry_datetime else None,
             "auto_renewing": auto_renewing
-        }
+        }, ack_state == "NOT_ACKNOWLEDGED"
         
     except Exception as e:
         db.rollback()
-        print(f"Error verifying purchase: {e}")
+        logger.exception("Error recording Google Play purchase")
+        raise ValueError(f"Error al verificar compra: {str(e)}")
+
+
+def verify_purchase(
+    db: Session,
+    user_id: int,
+    purchase_token: str,
+    product_id: str,
+    package_name: str = None
+) -> dict:
+    """
+    Verifica una compra con Google Play y la registra en la base de datos.
+    
+    Args:
+        db: Sesión de base de datos
+        user_id: ID del usuario
+        purchase_token: Token de compra de Google
+        product_id: ID del producto (ej: "basic_monthly")
+        package_name: Nombre del paquete (opcional, usa el de config si no se provee)
+    
+    Returns:
+        dict con información de la compra verificada
+    """
+    if not package_name:
+        package_name = settings.GOOGLE_PLAY_PACKAGE_NAME
+    
+    # Verificar si la compra ya existe
+    existing = _existing_purchase_result(db, purchase_token)
+    if existing:
+        return existing
+    
+    try:
+        # Verificar la compra con Google
+        result = fetch_subscription(package_name, product_id, purchase_token)
+    except Exception as e:
+        logger.warning("Error verifying purchase: %s", e)
+        raise ValueError(f"Error al verificar compra: {str(e)}")
+    
+    response, needs_ack = _record_purchase(db, user_id, purchase_token, product_id, package_name, result)
+    
+    # Reconocer compra si no está reconocida
+    if needs_ack:
+        acknowledge_purchase(get_google_play_service(), package_name, product_id, purchase_token)
+    
+    return response
+
+
+async def verify_purchase_async(
+    db: Session,
+    user_id: int,
+    purchase_token: str,
+    product_id: str,
+    package_name: str = None
+) -> dict:
+    """
+    Igual que `verify_purchase`, pero las llamadas a Google van por HTTP async
+    y solo el acceso a la DB (síncrono) pasa por el threadpool.
+    """
+    if not package_name:
+        package_name = settings.GOOGLE_PLAY_PACKAGE_NAME
+    
+    existing = await run_in_threadpool(_existing_purchase_result, db, purchase_token)
+    if existing:
+        return existing
+    
+    try:
+        result = await fetch_subscription_async(package_name, product_id, purchase_token)
+    except Exception as e:
+        logger.warning("Error verifying purchase: %s", e)
         raise ValueError(f"Error al verificar compra: {str(e)}")
+    
+    response, needs_ack = await run_in_threadpool(
+        _record_purchase, db, user_id, purchase_token, product_id, package_name, result
+    )
+    
+    if needs_ack:
+        await acknowledge_purchase_async(package_name, product_id, purchase_token)
+    
+    return response
 
 
 def acknowledge_purchase(service, package_name: str, product_id: str, purchase_token: str):
@@ -164,12 +356,22 @@ def acknowledge_purchase(service, package_name: str, product_id: str, purchase_t
             packageName=package_name,
             subscriptionId=product_id,
             token=purchase_token
-        ).execute()
+        ).execute(http=_authorized_http())
         
-        print(f"Purchase acknowledged: {purchase_token}")
+        logger.info("Purchase acknowledged: %s", purchase_token)
+        return True
+    except Exception as e:
+        logger.warning("Error acknowledging purchase: %s", e)
+        return False
+
+
+async def acknowledge_purchase_async(package_name: str, product_id: str, purchase_token: str) -> bool:
+    try:
+        await _api_call_async("POST", _subscription_path(package_name, product_id, purchase_token) + ":acknowledge")
+        logger.info("Purchase acknowledged: %s", purchase_token)
         return True
     except Exception as e:
-        print(f"Error acknowledging purchase: {e}")
+        logger.warning("Error acknowledging purchase: %s", e)
         return False
 
 
@@ -236,4 +438,5 @@ def cancel_google_play_subscription(db: Session, user_id: int) -> bool:
         purchase.subscription.canceled_at = datetime.utcnow()
     
     db.commit()
+    invalidate_user_plan(user_id)
     return True
\ No newline at end of file
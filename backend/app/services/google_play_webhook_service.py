@@ -1,73 +1,308 @@
 """
 Servicio para procesar webhooks de Google Play.
 Google envía notificaciones sobre cambios en suscripciones.
+
+Pub/Sub espera la respuesta del push en pocos segundos y reintenta si no
+llega, así que el webhook solo guarda el mensaje (`GooglePlayNotification`)
+y responde. Un hilo por proceso (`start_worker`) procesa las notificaciones
+pendientes por lotes de GOOGLE_PLAY_RTDN_BATCH_SIZE:
+
+- Cada `messageId` de Pub/Sub se guarda una sola vez (unique): las
+  reentregas responden `duplicate` y no se procesan de nuevo.
+- Las renovaciones (recuperada, renovada, comprada, reiniciada) consultan
+  la suscripción en la API para actualizar `expiry_time_millis`.
+- Si la API falla o la compra todavía no está registrada (el RTDN puede
+  llegar antes que el /billing/verify de la app) se reintenta con backoff
+  exponencial; un mensaje que no se puede decodificar falla sin reintentos.
+- Las notificaciones de una misma compra se aplican en orden de llegada:
+  mientras haya una anterior pendiente (por ejemplo una renovación a la
+  espera de reintento) las siguientes esperan. Si no, una cancelación
+  aplicada antes que la renovación reintentada quedaría reactivada.
+
+Como en el outbox de emails, el lote se toma con FOR UPDATE SKIP LOCKED y
+cada notificación se aplica en un savepoint: un error deshace solo esa.
 """
 
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Callable, Optional
 import base64
+import binascii
+import hashlib
 import json
+import logging
+import threading
 
+from ..config import settings
+from ..models.google_play_notification import GooglePlayNotification
 from ..models.google_play_purchase import GooglePlayPurchase
 from ..models.subscription import Subscription
+from . import google_play_service
 from .abuse_detection import log_abuse_event
+from .plan_service import invalidate_user_plan
+from .polling_worker import PollingWorker
+
+logger = logging.getLogger("app.google_play_rtdn")
+
+# Tipos tras los que la suscripción tiene un nuevo vencimiento
+RENEWAL_TYPES = {1, 2, 4, 7}
+
+# Sesiones del worker (los tests apuntan a su propia DB)
+session_factory: Optional[Callable[[], Session]] = None
+
+_lock = threading.Lock()
+_worker: Optional["NotificationWorker"] = None
+
+
+def _session() -> Session:
+    global session_factory
+    if session_factory is None:
+        from ..database import SessionLocal
+        session_factory = SessionLocal
+    return session_factory()
+
+
+class InvalidNotification(ValueError):
+    """Mensaje que no se puede decodificar: reintentarlo no sirve."""
+
+
+class RetryLater(Exception):
+    """La notificación no se puede aplicar todavía (API caída, compra sin registrar)."""
+
+
+def _message_id(notification_data: dict) -> str:
+    message = notification_data.get('message', {})
+    message_id = message.get('messageId') or message.get('message_id')
+    if message_id:
+        return str(message_id)[:128]
+    # Sin id de Pub/Sub (pruebas manuales): el propio contenido identifica el mensaje
+    return "sha256:" + hashlib.sha256(str(message.get('data', '')).encode()).hexdigest()
 
 
 def process_google_play_notification(db: Session, notification_data: dict) -> dict:
     """
-    Procesa una notificación de Google Play Real-Time Developer Notifications (RTDN).
+    Guarda una notificación de Google Play Real-Time Developer Notifications (RTDN)
+    para procesarla en segundo plano.
     
     Args:
         db: Sesión de base de datos
         notification_data: Datos del webhook de Google
     
     Returns:
-        dict con resultado del procesamiento
+        dict con `queued` o `duplicate` (mensaje ya recibido)
     """
+    message_id = _message_id(notification_data)
+    if db.query(GooglePlayNotification.id).filter(GooglePlayNotification.message_id == message_id).first():
+        return {"status": "duplicate", "message_id": message_id}
+
+    db.add(GooglePlayNotification(
+        message_id=message_id,
+        subscription=notification_data.get('subscription'),
+        purchase_token=_purchase_token(notification_data),
+        payload=notification_data,
+    ))
     try:
-        # Decodificar mensaje de Pub/Sub
-        message = notification_data.get('message', {})
-        data_encoded = message.get('data', '')
-        
-        # Decodificar base64
-        data_decoded = base64.b64decode(data_encoded).decode('utf-8')
-        data = json.loads(data_decoded)
-        
-        # Extraer información
-        notification_type = data.get('notificationType')
-        subscription_notification = data.get('subscriptionNotification', {})
-        
-        notification_type_id = subscription_notification.get('notificationType')
-        purchase_token = subscription_notification.get('purchaseToken')
-        subscription_id = subscription_notification.get('subscriptionId')
-        
-        if not purchase_token:
-            return {"status": "skipped", "reason": "no_purchase_token"}
-        
-        # Buscar compra en base de datos
-        purchase = db.query(GooglePlayPurchase).filter(
-            GooglePlayPurchase.purchase_token == purchase_token
-        ).first()
-        
-        if not purchase:
-            return {"status": "skipped", "reason": "purchase_not_found"}
-        
-        # Procesar según tipo de notificación
-        result = handle_notification_type(db, purchase, notification_type_id)
-        
         db.commit()
-        
-        return {
-            "status": "processed",
-            "notification_type": notification_type_id,
-            "purchase_id": purchase.id,
-            "action": result
-        }
-        
-    except Exception as e:
+    except IntegrityError:
+        # Reentrega simultánea del mismo mensaje
         db.rollback()
-        print(f"Error processing webhook: {e}")
-        return {"status": "error", "message": str(e)}
+        return {"status": "duplicate", "message_id": message_id}
+
+    notify()
+    return {"status": "queued", "message_id": message_id}
+
+
+def _decode(notification_data: dict) -> dict:
+    """Decodifica el `data` (base64 + JSON) del mensaje de Pub/Sub."""
+    try:
+        data_encoded = notification_data.get('message', {}).get('data', '')
+        data = json.loads(base64.b64decode(data_encoded).decode('utf-8'))
+    except (binascii.Error, UnicodeDecodeError, ValueError, AttributeError) as exc:
+        raise InvalidNotification(f"Undecodable message: {exc}")
+    if not isinstance(data, dict):
+        raise InvalidNotification("Message data is not an object")
+    return data
+
+
+def _purchase_token(notification_data: dict) -> Optional[str]:
+    """Token de la compra afectada (None si el mensaje no lo trae o no se decodifica)."""
+    try:
+        data = _decode(notification_data)
+    except InvalidNotification:
+        return None
+    token = (data.get('subscriptionNotification') or {}).get('purchaseToken')
+    return str(token)[:512] if token else None
+
+
+def _older_pending(db: Session, notification: GooglePlayNotification) -> Optional[GooglePlayNotification]:
+    """Notificación anterior de la misma compra que todavía no se aplicó."""
+    if not notification.purchase_token:
+        return None
+    return db.query(GooglePlayNotification).filter(
+        GooglePlayNotification.purchase_token == notification.purchase_token,
+        GooglePlayNotification.status == "pending",
+        GooglePlayNotification.id < notification.id,
+    ).order_by(GooglePlayNotification.id).first()
+
+
+def _refresh_from_api(purchase: GooglePlayPurchase) -> None:
+    """Actualiza vencimiento y renovación automática con el estado actual en Google."""
+    try:
+        result = google_play_service.fetch_subscription(
+            purchase.package_name, purchase.product_id, purchase.purchase_token
+        )
+    except Exception as exc:
+        raise RetryLater(f"Google Play API: {exc}")
+
+    if result.get('expiryTimeMillis'):
+        purchase.expiry_time_millis = int(result['expiryTimeMillis'])
+    if 'autoRenewing' in result:
+        purchase.auto_renewing = result['autoRenewing']
+    purchase.google_response = result
+
+
+def _apply_notification(db: Session, notification: GooglePlayNotification) -> dict:
+    """Aplica la notificación sobre la compra. Devuelve el resultado a guardar."""
+    data = _decode(notification.payload)
+    subscription_notification = data.get('subscriptionNotification') or {}
+    notification_type_id = subscription_notification.get('notificationType')
+    purchase_token = subscription_notification.get('purchaseToken')
+
+    if not purchase_token:
+        # testNotification, compras únicas, etc.
+        return {"status": "skipped", "reason": "no_purchase_token"}
+
+    purchase = db.query(GooglePlayPurchase).filter(
+        GooglePlayPurchase.purchase_token == purchase_token
+    ).first()
+    if not purchase:
+        raise RetryLater("purchase_not_found")
+
+    action = handle_notification_type(db, purchase, notification_type_id)
+    if notification_type_id in RENEWAL_TYPES:
+        # Si la API falla, el savepoint deshace también lo que hizo el handler
+        _refresh_from_api(purchase)
+
+    return {
+        "status": "processed",
+        "notification_type": notification_type_id,
+        "purchase_id": purchase.id,
+        "user_id": purchase.user_id,
+        "action": action
+    }
+
+
+def _backoff(attempts: int) -> timedelta:
+    seconds = settings.GOOGLE_PLAY_RTDN_BACKOFF_BASE_SEC * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.GOOGLE_PLAY_RTDN_BACKOFF_MAX_SEC))
+
+
+def _record_failure(notification: GooglePlayNotification, error: str, permanent: bool) -> None:
+    notification.attempts += 1
+    notification.last_error = error[:500]
+    if permanent or notification.attempts >= settings.GOOGLE_PLAY_RTDN_MAX_ATTEMPTS:
+        notification.status = "failed"
+        notification.processed_at = datetime.utcnow()
+        logger.warning("RTDN %s failed permanently: %s", notification.message_id, notification.last_error)
+    else:
+        notification.next_attempt_at = datetime.utcnow() + _backoff(notification.attempts)
+
+
+def process_pending_notifications(db: Session, limit: Optional[int] = None) -> int:
+    """
+    Procesa un lote de notificaciones vencidas y confirma su estado.
+    Devuelve cuántas se procesaron (aplicadas, omitidas, reprogramadas o fallidas).
+    """
+    batch = (
+        db.query(GooglePlayNotification)
+        .filter(
+            GooglePlayNotification.status == "pending",
+            GooglePlayNotification.next_attempt_at <= datetime.utcnow(),
+        )
+        .order_by(GooglePlayNotification.id)
+        .limit(limit or settings.GOOGLE_PLAY_RTDN_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    affected_users = set()
+    for notification in batch:
+        # Las anteriores del lote ya tienen su estado: que la consulta lo vea
+        db.flush()
+        blocker = _older_pending(db, notification)
+        if blocker is not None:
+            # Se reintenta detrás de la anterior (no cuenta como intento)
+            notification.next_attempt_at = max(
+                blocker.next_attempt_at,
+                datetime.utcnow() + timedelta(seconds=settings.GOOGLE_PLAY_RTDN_POLL_SEC),
+            )
+            notification.last_error = f"waiting for {blocker.message_id}"[:500]
+            continue
+
+        try:
+            with db.begin_nested():
+                result = _apply_notification(db, notification)
+        except InvalidNotification as exc:
+            _record_failure(notification, str(exc), permanent=True)
+        except RetryLater as exc:
+            _record_failure(notification, str(exc), permanent=False)
+        except Exception as exc:
+            logger.exception("Error processing RTDN %s", notification.message_id)
+            _record_failure(notification, str(exc) or type(exc).__name__, permanent=False)
+        else:
+            notification.status = "done" if result["status"] == "processed" else "skipped"
+            notification.attempts += 1
+            notification.last_error = None
+            notification.result = result
+            notification.processed_at = datetime.utcnow()
+            if result.get("user_id"):
+                affected_users.add(result["user_id"])
+
+    db.commit()
+    for user_id in affected_users:
+        invalidate_user_plan(user_id)
+    return len(batch)
+
+
+class NotificationWorker(PollingWorker):
+    name = "google-play-rtdn"
+
+    def batch_size(self) -> int:
+        return settings.GOOGLE_PLAY_RTDN_BATCH_SIZE
+
+    def poll_sec(self) -> float:
+        return settings.GOOGLE_PLAY_RTDN_POLL_SEC
+
+    def drain(self) -> int:
+        db = _session()
+        try:
+            return process_pending_notifications(db)
+        finally:
+            db.close()
+
+
+def start_worker() -> None:
+    global _worker
+    with _lock:
+        if _worker is None and settings.GOOGLE_PLAY_RTDN_WORKER:
+            _worker = NotificationWorker()
+            _worker.start()
+
+
+def stop_worker() -> None:
+    global _worker
+    with _lock:
+        worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop()
+
+
+def notify() -> None:
+    """Avisa al worker de este proceso de que hay notificaciones nuevas (tras el commit)."""
+    worker = _worker
+    if worker is not None:
+        worker.wake()
 
 
 def handle_notification_type(db: Session, purchase: GooglePlayPurchase, notification_type: int) -> str:
@@ -126,7 +361,7 @@ def handle_subscription_renewed(db: Session, purchase: GooglePlayPurchase) -> st
     purchase.purchase_state = "PURCHASED"
     purchase.auto_renewing = True
     
-    # Aquí podrías actualizar expiry_time_millis si Google lo provee en la notificación
+    # El nuevo expiry_time_millis lo trae el worker desde la API (_refresh_from_api)
     
     if purchase.subscription:
         purchase.subscription.status = "ACTIVE"
@@ -170,7 +405,8 @@ def handle_subscription_on_hold(db: Session, purchase: GooglePlayPurchase) -> st
         event_type="payment_on_hold",
         severity="medium",
         user_id=purchase.user_id,
-        description=f"Google Play subscription on hold for purchase {purchase.id}"
+        description=f"Google Play subscription on hold for purchase {purchase.id}",
+        commit=False
     )
     
     return "on_hold"
@@ -212,7 +448,8 @@ def handle_subscription_revoked(db: Session, purchase: GooglePlayPurchase) -> st
         event_type="subscription_refunded",
         severity="high",
         user_id=purchase.user_id,
-        description=f"Google Play subscription refunded for purchase {purchase.id}"
+        description=f"Google Play subscription refunded for purchase {purchase.id}",
+        commit=False
     )
     
     return "revoked"
@@ -0,0 +1,575 @@
+"""
+Importación del historial de operaciones exportado por el broker.
+
+La subida se copia a IMPORTS_DIR en bloques (sin cargar el archivo en
+memoria) y se registra un `ImportJob`; un pool de hilos lo procesa en
+segundo plano:
+
+1. Lee el archivo en streaming (CSV con cabecera, o JSON: array de objetos
+   o un objeto por línea) y valida cada fila con `OperationImportRow`.
+2. Cada IMPORT_CHUNK_ROWS filas resuelve los días y sesiones que falten
+   (una consulta + un INSERT masivo para cada tabla), inserta las
+   operaciones con un INSERT masivo y hace commit junto con el progreso.
+3. Al terminar (también si el job falla a mitad) ajusta una sola vez el
+   capital de la cuenta, los `loss_count` de las sesiones tocadas, el
+   rollup diario y el calendario del objetivo activo, con lo ya importado.
+
+Los jobs viven en el pool de este proceso: si se reinicia, un job queda
+`pending`/`running` para siempre. Cada lote confirmado renueva `updated_at`;
+al consultarlo, un job sin terminar cuyo último latido supera
+IMPORT_JOB_STALE_SEC se marca como fallido, se cierra con lo que llegó a
+confirmar (el job guarda el profit y la primera fecha de cada lote) y se
+borra el archivo subido. Todos los cambios de estado son UPDATE
+condicionales: si el worker original sigue vivo y ve su job cerrado,
+descarta el lote en curso y no vuelve a aplicar el cierre.
+
+La memoria depende del tamaño del lote y del número de días distintos, no
+del número de filas del archivo.
+"""
+
+import codecs
+import csv
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.account import Account
+from ..models.goal import Goal, GoalStatus
+from ..models.import_job import ImportJob
+from ..models.operation import Operation
+from ..models.trading_day import TradingDay
+from ..models.trading_session import TradingSession
+from ..schemas.imports import OperationImportRow
+from .daily_plan_service import refresh_goal_calendar
+from .daily_stats_service import rebuild_daily_stats
+from .operation_service import _resolve_amount_and_profit
+
+logger = logging.getLogger("app.import_service")
+
+# Nombres de columna habituales en los exports de brokers → campo de OperationImportRow
+COLUMN_ALIASES = {
+    "day": "date",
+    "datetime": "opened_at",
+    "open_time": "opened_at",
+    "timestamp": "opened_at",
+    "outcome": "result",
+    "stake": "amount",
+    "investment": "amount",
+    "pnl": "profit",
+    "session_number": "session",
+    "risk": "risk_percent",
+    "note": "comment",
+    "notes": "comment",
+}
+
+# Sesiones del worker (los tests apuntan a su propia DB)
+session_factory: Optional[Callable[[], Session]] = None
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_inflight: dict[int, Future] = {}
+
+
+def _session() -> Session:
+    global session_factory
+    if session_factory is None:
+        from ..database import SessionLocal
+        session_factory = SessionLocal
+    return session_factory()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMPORT_JOB_WORKERS, thread_name_prefix="import-job"
+            )
+        return _executor
+
+
+def _upload_path(job_id: int) -> str:
+    return os.path.join(settings.IMPORTS_DIR, f"import_{job_id}.upload")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".json", ".jsonl", ".ndjson")) or "json" in (content_type or ""):
+        return "json"
+    if name.endswith((".csv", ".txt")) or "csv" in (content_type or ""):
+        return "csv"
+    raise HTTPException(status_code=400, detail="Unsupported file type. Upload a .csv or .json file.")
+
+
+# ── Subida ─────────────────────────────────────────
+
+def create_import_job(
+    db: Session,
+    user_id: int,
+    account: Account,
+    upload: BinaryIO,
+    filename: Optional[str],
+    content_type: Optional[str] = None,
+) -> ImportJob:
+    """Guarda la subida en disco, registra el job y lo encola."""
+    file_format = detect_format(filename, content_type)
+
+    job = ImportJob(
+        user_id=user_id,
+        account_id=account.id,
+        filename=(filename or "")[:255] or None,
+        file_format=file_format,
+        status="pending",
+        errors=[],
+    )
+    db.add(job)
+    db.flush()
+
+    path = _upload_path(job.id)
+    os.makedirs(settings.IMPORTS_DIR, exist_ok=True)
+    size = 0
+    try:
+        with open(path, "wb") as target:
+            while True:
+                block = upload.read(1024 * 1024)
+                if not block:
+                    break
+                size += len(block)
+                if size > settings.IMPORT_MAX_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds {settings.IMPORT_MAX_BYTES} bytes",
+                    )
+                target.write(block)
+    except Exception:
+        db.rollback()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    job.bytes_total = size
+    db.commit()
+    db.refresh(job)
+
+    future = _get_executor().submit(run_import, job.id)
+    with _lock:
+        _inflight[job.id] = future
+    future.add_done_callback(lambda _: _forget(job.id))
+    return job
+
+
+def _forget(job_id: int) -> None:
+    with _lock:
+        _inflight.pop(job_id, None)
+
+
+def wait_for_import(job_id: int, timeout: Optional[float] = None) -> None:
+    """Espera a que termine un job encolado por este proceso (tests / scripts)."""
+    with _lock:
+        future = _inflight.get(job_id)
+    if future is not None:
+        future.result(timeout=timeout)
+
+
+def get_import_job(db: Session, user_id: int, job_id: int) -> ImportJob:
+    job = db.query(ImportJob).filter(ImportJob.id == job_id, ImportJob.user_id == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    _expire_if_stale(db, job)
+    return job
+
+
+def list_import_jobs(db: Session, user_id: int, limit: int = 20) -> List[ImportJob]:
+    jobs = db.query(ImportJob).filter(
+        ImportJob.user_id == user_id
+    ).order_by(ImportJob.id.desc()).limit(limit).all()
+    for job in jobs:
+        _expire_if_stale(db, job)
+    return jobs
+
+
+def _expire_if_stale(db: Session, job: ImportJob) -> None:
+    """Cierra como fallido un job abandonado por un proceso que se reinició."""
+    if job.status not in ("pending", "running"):
+        return
+    with _lock:
+        if job.id in _inflight:
+            return  # lo está procesando este proceso
+    last_seen = job.updated_at or job.started_at or job.created_at
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.IMPORT_JOB_STALE_SEC)
+    if last_seen is None or last_seen > cutoff:
+        return
+
+    # UPDATE condicional: si dos peticiones lo ven a la vez, solo una lo cierra,
+    # y no se cierra si el worker confirmó otro lote desde que se leyó el job
+    heartbeat = ImportJob.updated_at.is_(None) if job.updated_at is None else ImportJob.updated_at == job.updated_at
+    claimed = db.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job.id, ImportJob.status.in_(("pending", "running")), heartbeat)
+        .values(
+            status="failed",
+            error="Import interrupted (server restarted); rows already imported were kept",
+            finished_at=datetime.utcnow(),
+        ),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        db.refresh(job)
+        return
+
+    logger.warning("Import job %d abandoned; closing with committed rows", job.id)
+    account = db.get(Account, job.account_id)
+    if account is not None:
+        # finish() confirma el cierre junto con el capital y el rollup
+        _Importer.resume(db, job, account).finish()
+    db.commit()
+    db.refresh(job)
+
+    path = _upload_path(job.id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# ── Lectura en streaming ───────────────────────────
+
+def _normalize(record) -> dict:
+    """Claves en minúsculas con alias resueltos; vacíos de CSV → ausentes."""
+    if not isinstance(record, dict):
+        return record
+    normalized = {}
+    for key, value in record.items():
+        if key is None or value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        key = str(key).strip().lower().replace(" ", "_")
+        normalized[COLUMN_ALIASES.get(key, key)] = value.strip() if isinstance(value, str) else value
+    return normalized
+
+
+def iter_csv_records(stream: BinaryIO) -> Iterator[tuple[int, dict]]:
+    """(número de fila de datos, registro) de un CSV con cabecera."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        for row_number, record in enumerate(csv.DictReader(text), start=1):
+            yield row_number, record
+    finally:
+        text.detach()
+
+
+def iter_json_records(stream: BinaryIO, read_size: int = 64 * 1024) -> Iterator[tuple[int, object]]:
+    """
+    (número de registro, valor) de un array JSON de objetos o de JSON Lines,
+    decodificando de a un registro sin cargar el archivo completo.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer, pos, eof, row_number = "", 0, False, 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+            pos += 1
+        if pos < len(buffer):
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"Invalid JSON after record {row_number}")
+            else:
+                row_number += 1
+                yield row_number, record
+                continue
+        elif eof:
+            return
+
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[pos:] + text_decoder.decode(chunk, final=eof)
+        pos = 0
+
+
+def _chunks(records: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ── Worker ─────────────────────────────────────────
+
+class _JobClosed(Exception):
+    """El job se cerró desde otro proceso (ver `_expire_if_stale`) mientras corría."""
+
+
+class _Importer:
+    """Estado de un job mientras se procesa: cachés de días/sesiones y totales ya confirmados."""
+
+    def __init__(self, db: Session, job: ImportJob, account: Account):
+        self.db = db
+        self.job = job
+        self.account_id = account.id
+        self.start_capital = float(account.capital or 0)
+        self.days: dict[date, int] = {}
+        self.sessions: dict[tuple[int, int], int] = {}
+        self.touched_sessions: set[int] = set()
+        self.errors: list = list(job.errors or [])
+        self.committed_profit = 0.0
+        self.first_date: Optional[date] = None
+        self._pending_profit = 0.0
+        self._pending_sessions: set[int] = set()
+        self._pending_first_date: Optional[date] = None
+
+    @classmethod
+    def resume(cls, db: Session, job: ImportJob, account: Account) -> "_Importer":
+        """Importer con lo que un job interrumpido llegó a confirmar (para `finish`)."""
+        importer = cls(db, job, account)
+        importer.committed_profit = float(job.profit_committed or 0)
+        importer.first_date = job.first_date
+        if job.first_date is not None:
+            # Recontar loss_count desde la primera fecha importada es idempotente
+            importer.touched_sessions = set(db.scalars(
+                select(TradingSession.id).join(TradingDay).where(
+                    TradingDay.account_id == account.id, TradingDay.date >= job.first_date
+                )
+            ))
+        return importer
+
+    def _error(self, row_number: int, message: str) -> None:
+        self.job.rows_failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS_KEPT:
+            self.errors.append({"row": row_number, "message": message[:300]})
+
+    def _resolve_days(self, dates: set) -> None:
+        """
+        Ids de los días del lote, creando los que falten. El capital real al
+        inicio de un día histórico no se conoce: los días creados aquí llevan
+        el capital de la cuenta al empezar el import como `start_capital`,
+        que para ellos es solo un valor de relleno.
+        """
+        missing = dates - self.days.keys()
+        if not missing:
+            return
+        existing = self.db.execute(
+            select(TradingDay.date, TradingDay.id).where(
+                TradingDay.account_id == self.account_id, TradingDay.date.in_(missing)
+            )
+        ).all()
+        self.days.update({row.date: row.id for row in existing})
+
+        missing -= self.days.keys()
+        if missing:
+            created = self.db.execute(
+                insert(TradingDay).returning(TradingDay.date, TradingDay.id),
+                [
+                    {
+                        "account_id": self.account_id, "date": day,
+                        "start_capital": self.start_capital, "status": "active",
+                        "loss_count": 0, "drawdown": 0.0, "created_at": datetime.utcnow(),
+                    }
+                    for day in sorted(missing)
+                ],
+            ).all()
+            self.days.update({row.date: row.id for row in created})
+
+    def _resolve_sessions(self, keys: set) -> None:
+        missing = keys - self.sessions.keys()
+        if not missing:
+            return
+        day_ids = {day_id for day_id, _ in missing}
+        existing = self.db.execute(
+            select(TradingSession.trading_day_id, TradingSession.session_number, TradingSession.id).where(
+                TradingSession.trading_day_id.in_(day_ids)
+            )
+        ).all()
+        self.sessions.update({(row.trading_day_id, row.session_number): row.id for row in existing})
+
+        missing -= self.sessions.keys()
+        if missing:
+            created = self.db.execute(
+                insert(TradingSession).returning(
+                    TradingSession.trading_day_id, TradingSession.session_number, TradingSession.id
+                ),
+                [
+                    {
+                        "trading_day_id": day_id, "session_number": number, "status": "active",
+                        "loss_count": 0, "created_at": datetime.utcnow(),
+                    }
+                    for day_id, number in sorted(missing)
+                ],
+            ).all()
+            self.sessions.update({(row.trading_day_id, row.session_number): row.id for row in created})
+
+    def import_chunk(self, records: list) -> None:
+        """Valida e inserta un lote (sin commit: el llamador confirma lote + progreso)."""
+        rows: List[OperationImportRow] = []
+        for row_number, record in records:
+            self.job.rows_read += 1
+            try:
+                row = OperationImportRow.model_validate(_normalize(record))
+                amount, profit = _resolve_amount_and_profit(row, self.start_capital, "en")
+            except (ValidationError, ValueError) as exc:
+                message = "; ".join(
+                    f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in exc.errors()
+                ) if isinstance(exc, ValidationError) else str(exc)
+                self._error(row_number, message)
+                continue
+            rows.append((row, amount, profit))
+
+        if not rows:
+            return
+
+        self._resolve_days({row.date for row, _, _ in rows})
+        self._resolve_sessions({(self.days[row.date], row.session) for row, _, _ in rows})
+
+        operations = []
+        for row, amount, profit in rows:
+            session_id = self.sessions[(self.days[row.date], row.session)]
+            operations.append({
+                "session_id": session_id,
+                "result": row.result,
+                "risk_percent": row.risk_percent,
+                "amount": amount,
+                "profit": profit,
+                "comment": row.comment,
+                "created_at": row.opened_at,
+            })
+            self._pending_sessions.add(session_id)
+            self._pending_profit += float(profit)
+            if self._pending_first_date is None or row.date < self._pending_first_date:
+                self._pending_first_date = row.date
+
+        self.db.execute(insert(Operation.__table__), operations)
+        self.job.rows_imported += len(operations)
+
+    def commit(self, bytes_read: int) -> None:
+        """Confirma el lote y el progreso; a partir de aquí cuenta para `finish`."""
+        # Latido condicional: bloquea la fila frente a un cierre concurrente
+        alive = self.db.execute(
+            update(ImportJob)
+            .where(ImportJob.id == self.job.id, ImportJob.status == "running")
+            .values(updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        if not alive:
+            self.db.rollback()
+            raise _JobClosed(self.job.id)
+
+        self.job.bytes_read = bytes_read
+        self.job.errors = list(self.errors)
+        self.job.profit_committed = self.committed_profit + self._pending_profit
+        if self._pending_first_date and (self.job.first_date is None or self._pending_first_date < self.job.first_date):
+            self.job.first_date = self._pending_first_date
+        self.db.commit()
+
+        self.committed_profit += self._pending_profit
+        self.touched_sessions |= self._pending_sessions
+        if self._pending_first_date and (self.first_date is None or self._pending_first_date < self.first_date):
+            self.first_date = self._pending_first_date
+        self._pending_profit, self._pending_sessions, self._pending_first_date = 0.0, set(), None
+
+    def finish(self) -> None:
+        """Capital, loss_count, rollup y calendario: una vez por job, con lo confirmado."""
+        if not self.touched_sessions:
+            return
+
+        self.db.execute(
+            update(Account).where(Account.id == self.account_id).values(
+                capital=Account.capital + self.committed_profit
+            )
+        )
+
+        session_ids = sorted(self.touched_sessions)
+        for start in range(0, len(session_ids), 500):
+            batch = session_ids[start:start + 500]
+            losses = (
+                select(func.count(Operation.id))
+                .where(Operation.session_id == TradingSession.id, Operation.result == "LOSS")
+                .scalar_subquery()
+            )
+            self.db.execute(
+                update(TradingSession).where(TradingSession.id.in_(batch)).values(loss_count=losses),
+                execution_options={"synchronize_session": False},
+            )
+
+        # rebuild_daily_stats hace commit (incluye capital y loss_count)
+        rebuild_daily_stats(self.db, self.account_id)
+
+        goal = self.db.query(Goal).filter(
+            Goal.account_id == self.account_id, Goal.status == GoalStatus.ACTIVE
+        ).first()
+        if goal:
+            refresh_goal_calendar(self.db, goal.id, self.first_date)
+
+
+def run_import(job_id: int) -> None:
+    """Procesa un job de importación (se ejecuta en el pool de hilos)."""
+    db = _session()
+    path = _upload_path(job_id)
+    importer = None
+    started = False
+    final_status, error = "done", None
+    try:
+        now = datetime.utcnow()
+        started = bool(db.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id, ImportJob.status == "pending")
+            .values(status="running", started_at=now, updated_at=now),
+            execution_options={"synchronize_session": False},
+        ).rowcount)
+        db.commit()
+        if not started:
+            return
+
+        job = db.get(ImportJob, job_id)
+        account = db.get(Account, job.account_id)
+        importer = _Importer(db, job, account)
+
+        with open(path, "rb") as upload:
+            records = iter_csv_records(upload) if job.file_format == "csv" else iter_json_records(upload)
+            try:
+                for chunk in _chunks(records, settings.IMPORT_CHUNK_ROWS):
+                    importer.import_chunk(chunk)
+                    importer.commit(upload.tell())
+            finally:
+                records.close()  # antes de cerrar el archivo (el lector CSV lo desacopla)
+
+            importer.commit(job.bytes_total)
+    except _JobClosed:
+        # Quien lo cerró ya aplicó `finish` con los lotes confirmados
+        logger.warning("Import job %d was closed while running; stopping", job_id)
+        final_status = None
+    except Exception as exc:
+        logger.exception("Import job %d failed", job_id)
+        db.rollback()
+        final_status, error = "failed", str(exc)[:500] or type(exc).__name__
+    finally:
+        try:
+            if started and final_status is not None:
+                # Estado final y ajustes en el mismo commit; solo si nadie lo cerró antes
+                closed = db.execute(
+                    update(ImportJob)
+                    .where(ImportJob.id == job_id, ImportJob.status == "running")
+                    .values(status=final_status, error=error, finished_at=datetime.utcnow()),
+                    execution_options={"synchronize_session": False},
+                ).rowcount
+                if closed and importer is not None:
+                    importer.finish()
+                db.commit()
+        finally:
+            db.close()
+            if started and os.path.exists(path):
+                os.remove(path)
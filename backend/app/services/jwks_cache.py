@@ -0,0 +1,78 @@
+"""
+Caché de claves públicas (JWKS) para verificar tokens firmados localmente.
+
+Las claves se guardan por `kid` en un LRU acotado (OAUTH_JWKS_MAX_KEYS) y
+el set completo se vuelve a descargar cuando vence el `max-age` del
+Cache-Control de la respuesta (o OAUTH_JWKS_DEFAULT_TTL_SEC). Un `kid`
+desconocido también provoca una descarga (rotación de claves), pero como
+mucho una cada OAUTH_JWKS_MIN_REFRESH_SEC. Si el proveedor no responde se
+siguen usando las claves ya conocidas.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from ..config import settings
+from ..utils.http_cache import cache_control_max_age
+from ..utils.http_client import get_http_session
+
+logger = logging.getLogger("app.jwks")
+
+
+class JwksCache:
+    def __init__(self, url: Callable[[], str]):
+        self._url = url
+        self._lock = threading.Lock()
+        self._keys: "OrderedDict[str, dict]" = OrderedDict()
+        self._expires_at = 0.0
+        self._fetched_at: Optional[float] = None
+
+    def get_key(self, kid: Optional[str]) -> Optional[dict]:
+        """JWK con ese `kid`, descargando el set si hace falta; None si no existe."""
+        if not kid:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            key = self._keys.get(kid)
+            stale = now >= self._expires_at
+            if (key is None or stale) and self._may_fetch(now):
+                try:
+                    self._refresh(now)
+                except Exception as exc:
+                    logger.warning("JWKS refresh from %s failed: %s", self._url(), exc)
+                key = self._keys.get(kid)
+            if key is not None:
+                self._keys.move_to_end(kid)
+            return key
+
+    def _may_fetch(self, now: float) -> bool:
+        return self._fetched_at is None or now - self._fetched_at >= settings.OAUTH_JWKS_MIN_REFRESH_SEC
+
+    def _refresh(self, now: float) -> None:
+        self._fetched_at = now
+        response = get_http_session().get(self._url(), timeout=settings.OAUTH_HTTP_TIMEOUT_SEC)
+        response.raise_for_status()
+
+        # Solo las claves publicadas ahora: una clave retirada deja de validar
+        keys: "OrderedDict[str, dict]" = OrderedDict()
+        for key in response.json().get("keys", []):
+            if key.get("kid"):
+                keys[key["kid"]] = key
+                while len(keys) > settings.OAUTH_JWKS_MAX_KEYS:
+                    keys.popitem(last=False)
+        self._keys = keys
+
+        max_age = cache_control_max_age(response.headers.get("Cache-Control"))
+        self._expires_at = now + (settings.OAUTH_JWKS_DEFAULT_TTL_SEC if max_age is None else max_age)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+            self._expires_at = 0.0
+            self._fetched_at = None
+
+
+google_jwks = JwksCache(lambda: settings.GOOGLE_JWKS_URL)
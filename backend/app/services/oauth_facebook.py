@@ -6,13 +6,69 @@ Verifica access tokens de Facebook y gestiona usuarios.
 from typing import Optional, Dict
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from collections import OrderedDict
+import hashlib
+import logging
+import threading
+import time
 import requests
 
 from ..config import settings
 from ..models.user import User
 from ..models.user_identity import UserIdentity
 from ..services.plan_service import assign_free_plan_to_new_user
-from ..utils.security import create_access_token
+from ..utils.security import create_token_pair
+from ..utils.http_client import get_http_session
+
+logger = logging.getLogger("app.oauth_facebook")
+
+# Tokens ya verificados: sha256(token) → (expira, usuario), LRU acotado
+_cache_lock = threading.Lock()
+_verified_tokens: "OrderedDict[str, tuple[float, Dict]]" = OrderedDict()
+
+
+def _graph_get(path: str, params: Dict) -> Optional[Dict]:
+    """GET a la Graph API por el cliente HTTP compartido; None si no responde 200."""
+    response = get_http_session().get(
+        f"{settings.FACEBOOK_GRAPH_URL}/{path}",
+        params=params,
+        timeout=settings.OAUTH_HTTP_TIMEOUT_SEC,
+    )
+    if response.status_code != 200:
+        return None
+    return response.json()
+
+
+def _cache_key(access_token: str) -> str:
+    # No guardar tokens en claro en memoria
+    return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+
+def _get_cached(key: str) -> Optional[Dict]:
+    with _cache_lock:
+        cached = _verified_tokens.get(key)
+        if cached is None:
+            return None
+        if time.monotonic() >= cached[0]:
+            del _verified_tokens[key]
+            return None
+        _verified_tokens.move_to_end(key)
+        return dict(cached[1])
+
+
+def _store(key: str, ttl: float, user: Dict) -> None:
+    if ttl <= 0:
+        return
+    with _cache_lock:
+        _verified_tokens[key] = (time.monotonic() + ttl, dict(user))
+        _verified_tokens.move_to_end(key)
+        while len(_verified_tokens) > settings.FACEBOOK_TOKEN_CACHE_MAX:
+            _verified_tokens.popitem(last=False)
+
+
+def clear_token_cache() -> None:
+    with _cache_lock:
+        _verified_tokens.clear()
 
 
 def verify_facebook_token(access_token: str) -> Optional[Dict]:
@@ -20,56 +76,54 @@ def verify_facebook_token(access_token: str) -> Optional[Dict]:
     Verifica un access token de Facebook.
     Retorna dict con info del usuario si es válido, None si no.
     
-    Usa el Facebook Graph API: https://graph.facebook.com/me
+    Usa el Facebook Graph API (/me y, con FACEBOOK_APP_ID, /debug_token)
+    por conexiones reutilizadas. Un token ya verificado se recuerda hasta
+    FACEBOOK_TOKEN_CACHE_TTL_SEC (nunca más allá de su expiración).
     """
+    key = _cache_key(access_token)
+    cached = _get_cached(key)
+    if cached is not None:
+        return cached
+
     try:
+        ttl = float(settings.FACEBOOK_TOKEN_CACHE_TTL_SEC)
+
+        # Validar token contra app_id (si está configurado)
+        if settings.FACEBOOK_APP_ID:
+            debug = _graph_get('debug_token', {
+                'input_token': access_token,
+                'access_token': f"{settings.FACEBOOK_APP_ID}|{settings.FACEBOOK_APP_SECRET}",
+            })
+            debug_data = (debug or {}).get('data', {})
+            if not debug_data.get('is_valid'):
+                return None
+            if debug_data.get('app_id') != settings.FACEBOOK_APP_ID:
+                return None
+            if debug_data.get('expires_at'):
+                ttl = min(ttl, debug_data['expires_at'] - time.time())
+
         # Obtener info del usuario
-        response = requests.get(
-            'https://graph.facebook.com/me',
-            params={
-                'access_token': access_token,
-                'fields': 'id,email,name,picture'
-            },
-            timeout=5
-        )
-        
-        if response.status_code != 200:
-            return None
-        
-        data = response.json()
+        data = _graph_get('me', {
+            'access_token': access_token,
+            'fields': 'id,email,name,picture'
+        })
         
         # Verificar que tiene email
-        if not data.get('email'):
+        if not data or not data.get('email'):
             return None
         
-        # Validar token contra app_id (si está configurado)
-        if settings.FACEBOOK_APP_ID:
-            debug_response = requests.get(
-                'https://graph.facebook.com/debug_token',
-                params={
-                    'input_token': access_token,
-                    'access_token': f"{settings.FACEBOOK_APP_ID}|{settings.FACEBOOK_APP_SECRET}"
-                },
-                timeout=5
-            )
-            
-            if debug_response.status_code == 200:
-                debug_data = debug_response.json().get('data', {})
-                if not debug_data.get('is_valid'):
-                    return None
-                if debug_data.get('app_id') != settings.FACEBOOK_APP_ID:
-                    return None
-        
-        return {
+        user = {
             'provider_user_id': data.get('id'),
             'email': data.get('email'),
             'name': data.get('name'),
             'picture': data.get('picture', {}).get('data', {}).get('url'),
             'email_verified': True  # Facebook solo retorna emails verificados
         }
+        _store(key, ttl, user)
+        return user
     
-    except Exception as e:
-        print(f"Error verifying Facebook token: {e}")
+    except (requests.RequestException, ValueError) as e:
+        logger.warning("Error verifying Facebook token: %s", e)
         return None
 
 
@@ -117,10 +171,11 @@ def facebook_oauth_login(db: Session, access_token: str) -> Dict:
         db.commit()
         
         # Generar JWT
-        access_token_jwt = create_access_token(data={"sub": identity.user.email})
+        tokens = create_token_pair(identity.user)
         
         return {
-            "access_token": access_token_jwt,
+            "access_token": tokens["access_token"],
+            "refresh_token": tokens["refresh_token"],
             "token_type": "bearer",
             "user": {
                 "id": identity.user.id,
@@ -151,10 +206,11 @@ def facebook_oauth_login(db: Session, access_token: str) -> Dict:
         db.commit()
         
         # Generar JWT
-        access_token_jwt = create_access_token(data={"sub": existing_user.email})
+        tokens = create_token_pair(existing_user)
         
         return {
-            "access_token": access_token_jwt,
+            "access_token": tokens["access_token"],
+            "refresh_token": tokens["refresh_token"],
             "token_type": "bearer",
             "user": {
                 "id": existing_user.id,
@@ -197,10 +253,11 @@ def facebook_oauth_login(db: Session, access_token: str) -> Dict:
     db.refresh(new_user)
     
     # Generar JWT
-    access_token_jwt = create_access_token(data={"sub": new_user.email})
+    tokens = create_token_pair(new_user)
     
     return {
-        "access_token": access_token_jwt,
+        "access_token": tokens["access_token"],
+        "refresh_token": tokens["refresh_token"],
         "token_type": "bearer",
         "user": {
             "id": new_user.id,
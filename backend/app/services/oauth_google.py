@@ -6,13 +6,21 @@ Verifica tokens ID de Google y gestiona usuarios.
 from typing import Optional, Dict
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-import requests
+from jose import jwt
+from jose.exceptions import JOSEError
+import logging
 
 from ..config import settings
 from ..models.user import User
 from ..models.user_identity import UserIdentity
 from ..services.plan_service import assign_free_plan_to_new_user
-from ..utils.security import create_access_token
+from ..utils.security import create_token_pair
+from ..services.jwks_cache import google_jwks
+
+logger = logging.getLogger("app.oauth_google")
+
+# Emisores válidos de los ID tokens de Google
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
 
 
 def verify_google_token(token: str) -> Optional[Dict]:
@@ -20,23 +28,25 @@ def verify_google_token(token: str) -> Optional[Dict]:
     Verifica un token ID de Google.
     Retorna dict con info del usuario si es válido, None si no.
     
-    Usa el endpoint de Google: https://oauth2.googleapis.com/tokeninfo
+    La firma (RS256) se verifica localmente con las claves públicas de Google
+    (`google_jwks`, cacheadas según Cache-Control), junto con exp, aud e iss:
+    no hay llamada de red por login salvo cuando toca refrescar las claves.
     """
     try:
-        response = requests.get(
-            'https://oauth2.googleapis.com/tokeninfo',
-            params={'id_token': token},
-            timeout=5
-        )
-        
-        if response.status_code != 200:
+        header = jwt.get_unverified_header(token)
+        key = google_jwks.get_key(header.get('kid'))
+        if key is None:
             return None
         
-        data = response.json()
-        
-        # Verificar que el token pertenece a nuestra app
-        if settings.GOOGLE_CLIENT_ID and data.get('aud') != settings.GOOGLE_CLIENT_ID:
-            return None
+        data = jwt.decode(
+            token,
+            key,
+            algorithms=['RS256'],
+            audience=settings.GOOGLE_CLIENT_ID or None,
+            issuer=GOOGLE_ISSUERS,
+            # Sin GOOGLE_CLIENT_ID no se valida el aud (igual que antes)
+            options={'verify_aud': bool(settings.GOOGLE_CLIENT_ID), 'verify_at_hash': False, 'leeway': 30},
+        )
         
         # Verificar que el email está verificado
         if not data.get('email_verified'):
@@ -50,8 +60,8 @@ def verify_google_token(token: str) -> Optional[Dict]:
             'email_verified': data.get('email_verified', False)
         }
     
-    except Exception as e:
-        print(f"Error verifying Google token: {e}")
+    except (JOSEError, ValueError) as e:
+        logger.info("Rejected Google token: %s", e)
         return None
 
 
@@ -99,10 +109,11 @@ def google_oauth_login(db: Session, id_token: str) -> Dict:
         db.commit()
         
         # Generar JWT
-        access_token = create_access_token(data={"sub": identity.user.email})
+        tokens = create_token_pair(identity.user)
         
         return {
-            "access_token": access_token,
+            "access_token": tokens["access_token"],
+            "refresh_token": tokens["refresh_token"],
             "token_type": "bearer",
             "user": {
                 "id": identity.user.id,
@@ -133,10 +144,11 @@ def google_oauth_login(db: Session, id_token: str) -> Dict:
         db.commit()
         
         # Generar JWT
-        access_token = create_access_token(data={"sub": existing_user.email})
+        tokens = create_token_pair(existing_user)
         
         return {
-            "access_token": access_token,
+            "access_token": tokens["access_token"],
+            "refresh_token": tokens["refresh_token"],
             "token_type": "bearer",
             "user": {
                 "id": existing_user.id,
@@ -179,10 +191,11 @@ def google_oauth_login(db: Session, id_token: str) -> Dict:
     db.refresh(new_user)
     
     # Generar JWT
-    access_token = create_access_token(data={"sub": new_user.email})
+    tokens = create_token_pair(new_user)
     
     return {
-        "access_token": access_token,
+        "access_token": tokens["access_token"],
+        "refresh_token": tokens["refresh_token"],
         "token_type": "bearer",
         "user": {
             "id": new_user.id,
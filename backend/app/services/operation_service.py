@@ -2,9 +2,11 @@
 Servicio para gestionar operaciones de trading.
 """
 
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import List
+from typing import List, Optional, TYPE_CHECKING
 
 from ..models.operation import Operation
 from ..models.trading_session import TradingSession
@@ -12,26 +14,69 @@ from ..models.trading_day import TradingDay
 from ..models.account import Account
 from ..models.goal import Goal, GoalStatus
 from ..schemas.operation import OperationCreate
-from ..services.daily_plan_service import regenerate_goal_calendar
+from ..services.daily_plan_service import refresh_goal_calendar
+from ..services.daily_stats_service import record_operation, record_operations
+from ..services.risk_simulator import DAY_DRAWDOWN_LIMIT, DAY_LOSS_LIMIT, SESSION_LOSS_LIMIT
+from ..services.session_service import check_day_unblocked
+from ..utils.messages import get_message
+
+if TYPE_CHECKING:
+    from ..api.deps import RequestContext
+
+
+def _resolve_amount_and_profit(operation_data: OperationCreate, capital: float, lang: str) -> tuple[float, float]:
+    """
+    Monto y profit de la operación.
+
+    - amount = capital_actual * (risk_percent/100) si no viene desde el frontend.
+    - profit con convención conservadora si no viene:
+      WIN: +0.92 * amount, LOSS: -amount, DRAW: 0
+    """
+    amount = operation_data.amount
+    if amount is None:
+        if capital <= 0:
+            raise ValueError("Invalid capital" if lang == "en" else "Capital inválido")
+
+        amount = round(capital * (operation_data.risk_percent / 100), 6)
+
+    # Validación extra por seguridad
+    if amount <= 0:
+        raise ValueError("Invalid amount" if lang == "en" else "Monto inválido")
+
+    profit = operation_data.profit
+    if profit is None:
+        if operation_data.result == "WIN":
+            profit = round(amount * 0.92, 6)
+        elif operation_data.result == "LOSS":
+            profit = round(-amount, 6)
+        else:  # DRAW
+            profit = 0.0
+
+    return amount, profit
 
 
 def create_operation(
     db: Session,
     user_id: int,
     operation_data: OperationCreate,
-    lang: str = "en"
+    lang: str = "en",
+    session: Optional[TradingSession] = None,
+    context: Optional["RequestContext"] = None
 ) -> Operation:
     """Crea una nueva operación y actualiza métricas básicas.
 
     - En este proyecto TradingSession NO guarda contadores wins/total, solo `loss_count`.
     - `amount` puede venir vacío desde frontend; si viene None, aquí se calcula.
     - `profit` puede venir vacío; si viene None, aquí se calcula con una convención conservadora.
+    - `session` y `context` (cuenta y objetivo activo ya resueltos en la petición)
+      son opcionales y evitan repetir esas consultas.
     """
 
     # 1) Verificar que la sesión existe
-    session = db.query(TradingSession).filter(
-        TradingSession.id == operation_data.session_id
-    ).first()
+    if session is None:
+        session = db.query(TradingSession).filter(
+            TradingSession.id == operation_data.session_id
+        ).first()
 
     if not session:
         raise ValueError("Session not found" if lang == "en" else "Sesión no encontrada")
@@ -41,41 +86,26 @@ def create_operation(
     if not trading_day:
         raise ValueError("Trading day not found" if lang == "en" else "Día de trading no encontrado")
 
-    account = db.query(Account).filter(Account.id == trading_day.account_id).first()
-    if not account:
-        raise ValueError("Account not found" if lang == "en" else "Cuenta no encontrada")
+    if context is not None:
+        account = context.account
+        if account is None or account.id != trading_day.account_id:
+            raise ValueError("Unauthorized" if lang == "en" else "No autorizado")
+    else:
+        account = db.query(Account).filter(Account.id == trading_day.account_id).first()
+        if not account:
+            raise ValueError("Account not found" if lang == "en" else "Cuenta no encontrada")
 
     if account.user_id != user_id:
         raise ValueError("Unauthorized" if lang == "en" else "No autorizado")
 
-    # 3) Calcular amount si no viene desde el frontend
-    # amount = capital_actual * (risk_percent/100)
-    amount = operation_data.amount
-    if amount is None:
-        current_capital = float(account.capital or 0)
-        if current_capital <= 0:
-            raise ValueError("Invalid capital" if lang == "en" else "Capital inválido")
-
-        amount = round(current_capital * (operation_data.risk_percent / 100), 6)
-
-    # Validación extra por seguridad
-    if amount <= 0:
-        raise ValueError("Invalid amount" if lang == "en" else "Monto inválido")
-
-    # 4) Calcular profit si no viene (convención conservadora)
-    # WIN: +0.92 * amount
-    # LOSS: -amount
-    # DRAW: 0
-    profit = operation_data.profit
-    if profit is None:
-        if operation_data.result == "WIN":
-            profit = round(amount * 0.92, 6)
-        elif operation_data.result == "LOSS":
-            profit = round(-amount, 6)
-        else:  # DRAW
-            profit = 0.0
+    # 3-4) Calcular amount/profit si no vienen desde el frontend
+    amount, profit = _resolve_amount_and_profit(operation_data, float(account.capital or 0), lang)
 
     # 5) Crear operación
+    first_in_session = db.query(Operation.id).filter(
+        Operation.session_id == session.id
+    ).first() is None
+
     new_operation = Operation(
         session_id=operation_data.session_id,
         result=operation_data.result,
@@ -95,49 +125,226 @@ def create_operation(
     # 7) Actualizar capital de la cuenta (neto)
     account.capital = float(account.capital or 0) + float(profit)
 
+    # 8) Rollup diario en la misma transacción que la operación
+    record_operation(
+        db, account.id, trading_day.date, operation_data.result, profit, first_in_session
+    )
+
+    # Meta activa y fecha se leen antes del commit, que expira los objetos cargados
+    if context is not None:
+        active_goal = context.active_goal
+    else:
+        active_goal = db.query(Goal).filter(
+            Goal.account_id == account.id,
+            Goal.status == GoalStatus.ACTIVE
+        ).first()
+    active_goal_id = active_goal.id if active_goal else None
+    operation_date = trading_day.date
+
     db.commit()
     db.refresh(new_operation)
 
-    # 8) Recalcular calendario de la meta activa para reajustar montos futuros.
-    active_goal = db.query(Goal).filter(
-        Goal.account_id == account.id,
-        Goal.status == GoalStatus.ACTIVE
-    ).first()
-    if active_goal:
-        regenerate_goal_calendar(db, active_goal.id)
+    # 9) Recalcular calendario de la meta activa desde el día de la operación
+    # para reajustar montos futuros (los días anteriores no cambian).
+    if active_goal_id:
+        refresh_goal_calendar(db, active_goal_id, operation_date)
 
     return new_operation
 
 
-def get_operations_by_session(
+class BatchItemError(Exception):
+    """Operación del lote rechazada (el resto del lote sigue adelante)."""
+
+    def __init__(self, error: str, message: str):
+        super().__init__(message)
+        self.error = error
+        self.message = message
+
+
+def create_operations_batch(
     db: Session,
-    session_id: int,
-    user_id: int
-) -> List[Operation]:
-    """Obtiene todas las operaciones de una sesión."""
+    context: "RequestContext",
+    items: List[OperationCreate],
+    max_ops_per_session: int,
+    lang: str = "en",
+) -> tuple[List[Operation], List[dict]]:
+    """
+    Registra un lote de operaciones (de una o varias sesiones) en una sola
+    transacción.
 
-    # Verificar que la sesión pertenece al usuario
-    session = db.query(TradingSession).filter(
-        TradingSession.id == session_id
-    ).first()
+    Cada operación se valida en orden contra el estado acumulado del lote:
+    sesión de la cuenta, día no bloqueado (ni por DAY_LOSS_LIMIT pérdidas
+    ni por DAY_DRAWDOWN_LIMIT de drawdown sobre su capital de apertura),
+    sesión no bloqueada por SESSION_LOSS_LIMIT pérdidas y límite del plan
+    `max_ops_per_session`.
+    Las que fallan se reportan en `errors` (con su índice) y no se insertan.
 
-    if not session:
-        return []
+    Las válidas se insertan con un INSERT masivo; el capital de la cuenta,
+    el rollup diario (un UPDATE por día) y el calendario del objetivo activo
+    se actualizan una sola vez para todo el lote.
+    """
+    account = context.account
+    if account is None:
+        raise ValueError(get_message("account_not_found", lang))
 
-    trading_day = db.query(TradingDay).filter(TradingDay.id == session.trading_day_id).first()
-    if not trading_day:
-        return []
+    # Sesiones del lote que pertenecen a la cuenta, con su día (1 consulta)
+    session_ids = {item.session_id for item in items}
+    sessions = {
+        session.id: (session, day)
+        for session, day in db.query(TradingSession, TradingDay).join(
+            TradingDay, TradingSession.trading_day_id == TradingDay.id
+        ).filter(
+            TradingSession.id.in_(session_ids),
+            TradingDay.account_id == account.id,
+        ).all()
+    }
 
-    account = db.query(Account).filter(Account.id == trading_day.account_id).first()
-    if not account:
-        return []
+    # Operaciones ya registradas por sesión (1 consulta)
+    op_counts = dict(
+        db.query(Operation.session_id, func.count(Operation.id)).filter(
+            Operation.session_id.in_(sessions.keys())
+        ).group_by(Operation.session_id).all()
+    ) if sessions else {}
 
-    if account.user_id != user_id:
-        return []
+    # Pérdidas y profit ya registrados por día (1 consulta)
+    day_ids = {day.id for _, day in sessions.values()}
+    day_totals = {
+        day_id: [losses or 0, float(profit or 0)]
+        for day_id, losses, profit in db.query(
+            TradingSession.trading_day_id,
+            func.sum(case((Operation.result == "LOSS", 1), else_=0)),
+            func.sum(Operation.profit),
+        ).join(Operation, Operation.session_id == TradingSession.id).filter(
+            TradingSession.trading_day_id.in_(day_ids)
+        ).group_by(TradingSession.trading_day_id).all()
+    } if day_ids else {}
+
+    capital = float(account.capital or 0)
+    loss_counts = {sid: session.loss_count or 0 for sid, (session, _) in sessions.items()}
+    day_open: dict[int, bool] = {}
+    rows: List[dict] = []
+    by_date: dict = {}
+    new_sessions: dict = {}
+    errors: List[dict] = []
+    now = datetime.utcnow()
+
+    for index, item in enumerate(items):
+        try:
+            if item.session_id not in sessions:
+                raise BatchItemError(
+                    "session_not_found", "Session not found" if lang == "en" else "Sesión no encontrada"
+                )
+            session, day = sessions[item.session_id]
+
+            if day.id not in day_open:
+                day_open[day.id] = check_day_unblocked(day)
+            if not day_open[day.id]:
+                raise BatchItemError("day_blocked", get_message("day_blocked", lang))
+
+            day_losses, day_profit = day_totals.setdefault(day.id, [0, 0.0])
+            if day_losses >= DAY_LOSS_LIMIT:
+                raise BatchItemError("loss_limit_day", get_message("loss_limit_day", lang))
+            start_capital = float(day.start_capital or 0)
+            if start_capital > 0 and -day_profit >= start_capital * DAY_DRAWDOWN_LIMIT:
+                raise BatchItemError("drawdown_limit", get_message("drawdown_limit", lang))
+
+            if loss_counts[session.id] >= SESSION_LOSS_LIMIT:
+                raise BatchItemError("session_blocked", get_message("session_blocked", lang))
+
+            count = op_counts.get(session.id, 0)
+            if count >= max_ops_per_session:
+                raise BatchItemError(
+                    "plan_limit_reached",
+                    f"Maximum operations per session ({max_ops_per_session}) reached. "
+                    "Upgrade your plan for more operations.",
+                )
+
+            try:
+                amount, profit = _resolve_amount_and_profit(item, capital, lang)
+            except ValueError as exc:
+                raise BatchItemError("invalid_operation", str(exc))
+        except BatchItemError as exc:
+            errors.append({
+                "index": index, "session_id": item.session_id,
+                "error": exc.error, "message": exc.message,
+            })
+            continue
+
+        rows.append({
+            "session_id": session.id,
+            "result": item.result,
+            "risk_percent": item.risk_percent,
+            "amount": amount,
+            "profit": profit,
+            "comment": item.comment,
+            "created_at": now,
+        })
+        if count == 0:
+            new_sessions[day.date] = new_sessions.get(day.date, 0) + 1
+        op_counts[session.id] = count + 1
+        if item.result == "LOSS":
+            loss_counts[session.id] += 1
+            day_totals[day.id][0] += 1
+        day_totals[day.id][1] += float(profit)
+        capital += float(profit)
+        by_date.setdefault(day.date, []).append((item.result, profit))
+
+    if not rows:
+        db.rollback()
+        return [], errors
 
-    # Obtener operaciones
-    operations = db.query(Operation).filter(
-        Operation.session_id == session_id
-    ).order_by(Operation.created_at.desc()).all()
+    # render_nulls: mismas columnas en todas las filas → un único INSERT multi-fila
+    created = db.scalars(
+        insert(Operation).returning(Operation), rows, execution_options={"render_nulls": True}
+    ).all()
 
-    return operations
+    for sid, (session, _) in sessions.items():
+        if loss_counts[sid] != (session.loss_count or 0):
+            session.loss_count = loss_counts[sid]
+
+    account.capital = capital
+
+    for stats_date, results in by_date.items():
+        record_operations(db, account.id, stats_date, results, new_sessions.get(stats_date, 0))
+
+    active_goal = context.active_goal
+    active_goal_id = active_goal.id if active_goal else None
+    first_date = min(by_date)
+
+    db.commit()
+    created = sorted(created, key=lambda operation: operation.id)
+
+    if active_goal_id:
+        refresh_goal_calendar(db, active_goal_id, first_date)
+
+    return created, errors
+
+
+def _session_operations_stmt(session_id: int, user_id: int):
+    """Operaciones de la sesión, solo si pertenece al usuario (sesión → día → cuenta)."""
+    return (
+        select(Operation)
+        .join(TradingSession, Operation.session_id == TradingSession.id)
+        .join(TradingDay, TradingSession.trading_day_id == TradingDay.id)
+        .join(Account, TradingDay.account_id == Account.id)
+        .where(Operation.session_id == session_id, Account.user_id == user_id)
+        .order_by(Operation.created_at.desc())
+    )
+
+
+def get_operations_by_session(
+    db: Session,
+    session_id: int,
+    user_id: int
+) -> List[Operation]:
+    """Obtiene todas las operaciones de una sesión (vacío si no es del usuario)."""
+    return db.execute(_session_operations_stmt(session_id, user_id)).scalars().all()
+
+
+async def get_operations_by_session_async(
+    db: AsyncSession,
+    session_id: int,
+    user_id: int
+) -> List[Operation]:
+    """Variante async de `get_operations_by_session`."""
+    return (await db.execute(_session_operations_stmt(session_id, user_id))).scalars().all()
@@ -0,0 +1,105 @@
+"""
+bcrypt fuera de los hilos de las rutas.
+
+Con el coste por defecto cada hash/verificación tarda ~250 ms de CPU. En
+las rutas síncronas eso ocupa un hilo del threadpool por login, y una
+ráfaga de logins deja sin hilos al resto de peticiones. Aquí bcrypt corre
+en un pool de procesos propio (PASSWORD_HASH_WORKERS) y la cola está
+acotada: como mucho PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_PENDING
+peticiones esperan un hash a la vez; las demás reciben 503 al instante,
+así que los hilos que puede retener la autenticación están limitados.
+
+Con PASSWORD_HASH_WORKERS=0 se hashea en el hilo que llama.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+
+from ..config import settings
+from ..utils.security import get_password_hash, password_needs_rehash, verify_password
+
+logger = logging.getLogger("app.password_hasher")
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn: no hereda hilos ni conexiones abiertas del proceso web
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _reset_executor() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy. Please try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
+def queue_depth() -> int:
+    """Peticiones esperando (o ejecutando) un hash en este proceso."""
+    return _pending
+
+
+def _run(fn: Callable, *args):
+    global _pending
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+
+    with _lock:
+        if _pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING:
+            raise _busy()
+        _pending += 1
+    try:
+        future = _get_executor().submit(fn, *args)
+        return future.result(timeout=settings.PASSWORD_HASH_TIMEOUT_SEC)
+    except FutureTimeoutError:
+        future.cancel()
+        raise _busy()
+    except BrokenProcessPool:
+        logger.exception("Password hash pool crashed, restarting it")
+        _reset_executor()
+        raise _busy()
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def hash_password(password: str) -> str:
+    """Hash bcrypt con el coste actual (`BCRYPT_ROUNDS`)."""
+    return _run(get_password_hash, password, settings.BCRYPT_ROUNDS)
+
+
+def check_password(password: str, hashed_password: Optional[str]) -> bool:
+    """Verifica la contraseña; False sin consumir el pool si la cuenta no tiene hash (OAuth)."""
+    if not hashed_password:
+        return False
+    return _run(verify_password, password, hashed_password)
+
+
+def needs_rehash(hashed_password: Optional[str]) -> bool:
+    return bool(hashed_password) and password_needs_rehash(hashed_password, settings.BCRYPT_ROUNDS)
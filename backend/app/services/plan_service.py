@@ -1,8 +1,19 @@
 """
 Servicio para gestionar planes y suscripciones.
+
+Cachés en memoria (por proceso):
+- Catálogo de planes activos, con TTL `PLAN_CACHE_TTL_SEC`.
+- Plan efectivo de cada usuario, con TTL corto `USER_PLAN_CACHE_TTL_SEC`.
+
+Ambas guardan copias desconectadas de la sesión (`_snapshot`): sirven para
+leer `name`, `id` y `features`, no para asignarlas a relaciones ORM.
+Cualquier cambio de suscripción debe llamar a `invalidate_user_plan`.
 """
 
-from sqlalchemy.orm import Session
+import threading
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 from typing import Optional
 
@@ -12,28 +23,86 @@ from ..models.user import User
 from ..config import settings
 
 
+_cache_lock = threading.Lock()
+_plan_catalog: dict[str, Plan] = {}
+_plan_catalog_expires_at = 0.0
+_user_plans: dict[int, tuple[float, Plan]] = {}
+
+
+def _snapshot(plan: Plan) -> Plan:
+    """Copia transitoria del plan: no se expira con el commit de ninguna sesión."""
+    return Plan(
+        id=plan.id,
+        name=plan.name,
+        display_name_es=plan.display_name_es,
+        display_name_en=plan.display_name_en,
+        price_usd=plan.price_usd,
+        features=dict(plan.features or {}),
+        is_active=plan.is_active,
+        created_at=plan.created_at,
+    )
+
+
+def _load_plan_catalog(db: Session) -> dict[str, Plan]:
+    global _plan_catalog, _plan_catalog_expires_at
+
+    plans = db.query(Plan).filter(Plan.is_active == True).order_by(Plan.price_usd).all()
+    catalog = {plan.name: _snapshot(plan) for plan in plans}
+    with _cache_lock:
+        _plan_catalog = catalog
+        _plan_catalog_expires_at = time.monotonic() + settings.PLAN_CACHE_TTL_SEC
+    return catalog
+
+
+def _get_plan_catalog(db: Session) -> dict[str, Plan]:
+    with _cache_lock:
+        if time.monotonic() < _plan_catalog_expires_at:
+            return _plan_catalog
+    return _load_plan_catalog(db)
+
+
+def invalidate_plan_catalog() -> None:
+    """Descarta el catálogo (y los planes por usuario que se derivan de él)."""
+    global _plan_catalog, _plan_catalog_expires_at
+    with _cache_lock:
+        _plan_catalog = {}
+        _plan_catalog_expires_at = 0.0
+        _user_plans.clear()
+
+
+def invalidate_user_plan(user_id: int) -> None:
+    """Descarta el plan efectivo cacheado del usuario (cambio de suscripción)."""
+    with _cache_lock:
+        _user_plans.pop(user_id, None)
+
+
 def get_plan_by_name(db: Session, plan_name: str) -> Optional[Plan]:
     """Obtiene un plan por nombre (FREE, BASIC, PRO)."""
-    return db.query(Plan).filter(Plan.name == plan_name, Plan.is_active == True).first()
+    plan = _get_plan_catalog(db).get(plan_name)
+    if plan is None:
+        # Un plan recién creado no espera al TTL: el fallo recarga el catálogo
+        plan = _load_plan_catalog(db).get(plan_name)
+    return plan
 
 
 def get_all_plans(db: Session) -> list[Plan]:
-    """Obtiene todos los planes activos."""
-    return db.query(Plan).filter(Plan.is_active == True).order_by(Plan.price_usd).all()
+    """Obtiene todos los planes activos (ordenados por precio)."""
+    return list(_get_plan_catalog(db).values())
 
 
 def get_user_active_subscription(db: Session, user_id: int) -> Optional[Subscription]:
-    """Obtiene la suscripción activa del usuario."""
-    return db.query(Subscription).filter(
+    """Obtiene la suscripción activa del usuario (con su plan en el mismo query)."""
+    return db.query(Subscription).options(joinedload(Subscription.plan)).filter(
         Subscription.user_id == user_id,
         Subscription.status == "ACTIVE"
     ).order_by(Subscription.created_at.desc()).first()
 
 
-def get_user_plan(db: Session, user_id: int) -> Plan:
+def get_user_plan(db: Session, user_id: int, user: Optional[User] = None) -> Plan:
     """
     Obtiene el plan actual del usuario.
     Si no tiene suscripción, retorna FREE por defecto.
+    `user` evita volver a cargar el usuario cuando el llamador ya lo tiene.
 
     ADMIN BYPASS:
     - Si ADMIN_BYPASS_PAYMENT=true y el email del usuario coincide con ADMIN_EMAIL,
@@ -42,7 +111,8 @@ def get_user_plan(db: Session, user_id: int) -> Plan:
 
     # ── ADMIN BYPASS (plan sintético) ───────────────────────────
     if settings.ADMIN_BYPASS_PAYMENT and settings.ADMIN_EMAIL:
-        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            user = db.query(User).filter(User.id == user_id).first()
         if user and user.email and user.email.lower() == settings.ADMIN_EMAIL.lower():
             return Plan(
                 name="ADMIN",
@@ -62,22 +132,50 @@ def get_user_plan(db: Session, user_id: int) -> Plan:
                     "max_ops_per_session": 9999,
                     "max_active_goals": 999,
                     "history_days": 365,
+                    # rate limits
+                    "rate_writes_per_minute": 0,
+                    "rate_reports_per_hour": 0,
                 },
                 is_active=True,
             )
     # ───────────────────────────────────────────────────────────
 
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _user_plans.get(user_id)
+    if cached and now < cached[0]:
+        return cached[1]
+
+    ttl = settings.USER_PLAN_CACHE_TTL_SEC
     subscription = get_user_active_subscription(db, user_id)
 
     if subscription and subscription.is_active():
-        return subscription.plan
-
-    # Si no tiene suscripción activa, retornar FREE
-    free_plan = get_plan_by_name(db, "FREE")
-    if not free_plan:
-        raise Exception("FREE plan not found in database")
-
-    return free_plan
+        plan = _snapshot(subscription.plan)
+        if subscription.end_date is not None:
+            # No servir el plan pagado más allá del vencimiento
+            ttl = min(ttl, (subscription.end_date - datetime.utcnow()).total_seconds())
+    else:
+        # Si no tiene suscripción activa, retornar FREE
+        plan = get_plan_by_name(db, "FREE")
+        if not plan:
+            raise Exception("FREE plan not found in database")
+
+    with _cache_lock:
+        _user_plans[user_id] = (now + ttl, plan)
+    return plan
+
+
+async def get_user_plan_async(db: AsyncSession, user_id: int) -> Plan:
+    """
+    `get_user_plan` para rutas async: sale de la caché si está vigente y, si no,
+    resuelve el plan sobre la conexión de la sesión async (sin tocar el pool sync).
+    """
+    if not (settings.ADMIN_BYPASS_PAYMENT and settings.ADMIN_EMAIL):
+        with _cache_lock:
+            cached = _user_plans.get(user_id)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+    return await db.run_sync(get_user_plan, user_id)
 
 
 def create_subscription(
@@ -116,6 +214,7 @@ def create_subscription(
     db.add(new_subscription)
     db.commit()
     db.refresh(new_subscription)
+    invalidate_user_plan(user_id)
     
     return new_subscription
 
@@ -140,5 +239,6 @@ def cancel_subscription(db: Session, user_id: int) -> bool:
     subscription.status = "CANCELED"
     subscription.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_user_plan(user_id)
     
     return True
\ No newline at end of file
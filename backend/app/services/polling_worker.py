@@ -0,0 +1,70 @@
+"""
+Hilo base para los workers que drenan una cola guardada en la DB
+(outbox de emails, notificaciones de Google Play).
+
+`drain()` procesa un lote y devuelve cuántos elementos tomó: si el lote
+vino completo se pide otro enseguida; si no, el hilo espera `poll_sec()`
+o hasta que alguien llame a `wake()` (por ejemplo tras encolar).
+"""
+
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger("app.workers")
+
+
+class PollingWorker:
+    name = "worker"
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── A implementar por cada worker ──────────────
+
+    def batch_size(self) -> int:
+        raise NotImplementedError
+
+    def poll_sec(self) -> float:
+        raise NotImplementedError
+
+    def drain(self) -> int:
+        raise NotImplementedError
+
+    def idle(self) -> None:
+        """Se llama antes de cada espera (liberar conexiones ociosas, etc.)."""
+
+    def close(self) -> None:
+        """Se llama al parar el hilo."""
+
+    # ── Ciclo de vida ──────────────────────────────
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            processed = 0
+            try:
+                processed = self.drain()
+            except Exception:
+                logger.exception("%s drain failed", self.name)
+
+            if processed >= self.batch_size():
+                continue
+            self.idle()
+            self._wake.wait(self.poll_sec())
+            self._wake.clear()
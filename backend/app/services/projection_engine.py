@@ -0,0 +1,101 @@
+"""
+Motor de proyección de capital compartido.
+
+Centraliza la matemática de crecimiento compuesto que usan el planificador
+(`goal_planner_service`), el progreso del objetivo (`goal_service`), las
+proyecciones (`projections_service`) y la cola futura del calendario
+(`daily_plan_service`).
+"""
+
+import math
+from typing import NamedTuple, Optional
+
+
+class ProjectedDay(NamedTuple):
+    """Valores planificados de un día futuro del calendario (redondeados a centavos)."""
+    capital_start: float
+    planned_stake: float
+    expected_win_profit: float
+    expected_loss: float
+    expected_daily_pnl: float
+
+
+def expected_return_per_op(winrate: float, payout: float) -> float:
+    """Retorno esperado por unidad apostada: WIN paga `payout`, LOSS pierde el stake."""
+    return winrate * payout - (1 - winrate)
+
+
+def daily_growth_factor(risk_percent: float, ops_per_day: int, winrate: float, payout: float) -> float:
+    """Factor diario con stake fijo durante el día (riesgo sobre el capital de apertura)."""
+    risk_fraction = risk_percent / 100.0
+    return 1 + risk_fraction * ops_per_day * expected_return_per_op(winrate, payout)
+
+
+def project_capital(capital: float, growth_factor: float, periods: int) -> float:
+    """Capital tras `periods` periodos de crecimiento compuesto (0 si el factor <= 0)."""
+    if growth_factor <= 0:
+        return 0.0
+    return float(capital * growth_factor ** periods)
+
+
+def days_to_target(capital: float, target: float, growth_factor: float) -> Optional[int]:
+    """
+    Días (redondeados hacia arriba) para llegar a `target`, en forma cerrada:
+    ceil(log(target / capital) / log(factor)). None si no hay crecimiento.
+    """
+    if not target or growth_factor <= 1:
+        return None
+    try:
+        return int(math.ceil(math.log(target / capital) / math.log(growth_factor)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def plan_day(
+    capital_start: float,
+    risk_fraction: float,
+    ops_total: int,
+    payout: float,
+    expected_return: float,
+) -> ProjectedDay:
+    """Valores planificados de un día a partir de su capital de apertura."""
+    capital_start = round(capital_start, 2)
+    planned_stake = round(max(capital_start, 0.0) * risk_fraction, 2)
+    return ProjectedDay(
+        capital_start=capital_start,
+        planned_stake=planned_stake,
+        expected_win_profit=round(planned_stake * payout, 2),
+        expected_loss=round(planned_stake, 2),
+        expected_daily_pnl=round(planned_stake * ops_total * expected_return, 2),
+    )
+
+
+def project_daily_plan_tail(
+    capital: float,
+    risk_fraction: float,
+    ops_total: int,
+    payout: float,
+    expected_return: float,
+    target_capital: float,
+    max_days: int,
+) -> list[ProjectedDay]:
+    """
+    Proyección día a día de la cola futura del calendario.
+
+    Cada día redondea stake, PnL esperado y capital a centavos, igual que los
+    valores guardados en `goal_daily_plans`; como cada día parte del capital
+    ya redondeado del anterior, la recurrencia no admite un producto acumulado
+    exacto. Se detiene al llegar a la meta o a capital <= 0 (el día que lo
+    alcanza se incluye) o tras `max_days` días.
+    """
+    days = []
+    capital_start = capital
+    for _ in range(max(max_days, 0)):
+        day = plan_day(capital_start, risk_fraction, ops_total, payout, expected_return)
+        days.append(day)
+
+        capital_start = round(day.capital_start + day.expected_daily_pnl, 2)
+        if capital_start >= target_capital or capital_start <= 0:
+            break
+
+    return days
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from ..models.account import Account
 from ..schemas.reports import ProjectionResponse
+from . import projection_engine
 
 def get_projections(db: Session, user_id: int, days: int) -> ProjectionResponse:
     account = db.query(Account).filter(Account.user_id == user_id).first()
@@ -17,14 +18,11 @@ def get_projections(db: Session, user_id: int, days: int) -> ProjectionResponse:
     operations_per_day = 5
     
     current_capital = account.capital
-    estimated_capital = current_capital
-    
-    for _ in range(days):
-        for _ in range(operations_per_day):
-            amount = estimated_capital * (risk_percent / 100.0)
-            profit = amount * account.payout * winrate
-            loss = amount * (1 - winrate)
-            estimated_capital += profit - loss
+    # El stake se recalcula en cada operación: el capital compone por operación.
+    op_growth_factor = projection_engine.daily_growth_factor(risk_percent, 1, winrate, account.payout)
+    estimated_capital = projection_engine.project_capital(
+        current_capital, op_growth_factor, days * operations_per_day
+    )
     
     estimated_profit = estimated_capital - current_capital
     
@@ -33,4 +31,4 @@ def get_projections(db: Session, user_id: int, days: int) -> ProjectionResponse:
         estimated_capital=round(estimated_capital, 2),
         estimated_profit=round(estimated_profit, 2),
         scenario="conservative"
-    )
\ No newline at end of file
+    )
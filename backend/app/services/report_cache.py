@@ -0,0 +1,126 @@
+"""
+Caché en disco de reportes renderizados (CSV/PDF/Excel).
+
+Los archivos viven en REPORTS_DIR/goal_<id>/ con un nombre derivado de la
+versión de los datos (`report_data_version`), así que una entrada nunca
+queda desactualizada: si los datos cambian, cambia el nombre. El tamaño
+total se acota con REPORT_CACHE_MAX_BYTES expulsando primero los archivos
+menos usados (cada acierto actualiza su mtime).
+"""
+
+import logging
+import os
+import threading
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from ..config import settings
+
+logger = logging.getLogger("app.report_cache")
+
+# Sufijos de archivos en construcción o de estado: nunca se expulsan ni se sirven
+_TRANSIENT_SUFFIXES = (".part", ".failed")
+
+_evict_lock = threading.Lock()
+
+
+def artifact_path(goal_id: int, name: str) -> str:
+    return os.path.join(settings.REPORTS_DIR, f"goal_{goal_id}", name)
+
+
+def lookup(path: str) -> Optional[str]:
+    """Ruta del artefacto si existe, marcándolo como usado recientemente."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def evict(max_bytes: Optional[int] = None) -> int:
+    """
+    Borra los artefactos menos usados hasta que REPORTS_DIR ocupe como
+    máximo `max_bytes`. Devuelve los bytes liberados.
+    """
+    max_bytes = settings.REPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        total = 0
+        for root, _, files in os.walk(settings.REPORTS_DIR):
+            for name in files:
+                if name.endswith(_TRANSIENT_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        freed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total - freed <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                freed += size
+            except FileNotFoundError:
+                pass
+
+    if freed:
+        logger.info("Report cache evicted %d bytes", freed)
+    return freed
+
+
+def store_gzip_stream(chunks: Iterable[bytes], path: str, compressed: bool) -> Iterator[bytes]:
+    """
+    Reenvía `chunks` al cliente (comprimidos con gzip o tal cual, según
+    `compressed`) mientras guarda la versión gzip en `path`. El archivo solo
+    se publica si el stream termina completo; si el cliente corta, se descarta.
+    """
+    part_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    completed = False
+    try:
+        with open(part_path, "wb") as part:
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                part.write(data)
+                if compressed:
+                    if data:
+                        yield data
+                else:
+                    yield chunk
+            tail = compressor.flush()
+            part.write(tail)
+            if compressed:
+                yield tail
+        os.replace(part_path, path)
+        completed = True
+    finally:
+        if not completed and os.path.exists(part_path):
+            os.remove(part_path)
+    evict()
+
+
+def read_file(path: str, decompress: bool = False, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Lee un artefacto en chunks; con `decompress` deshace el gzip al vuelo."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if decompress else None
+    with open(path, "rb") as artifact:
+        while True:
+            chunk = artifact.read(chunk_size)
+            if not chunk:
+                break
+            if decompressor is None:
+                yield chunk
+            else:
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+    if decompressor is not None:
+        tail = decompressor.flush()
+        if tail:
+            yield tail
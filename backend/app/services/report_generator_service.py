@@ -1,138 +1,79 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from datetime import datetime
+import csv
+import hashlib
 import io
-from typing import Optional
+from typing import Iterator, Optional
+from ..config import settings
 from ..models.goal import Goal
 from ..models.account import Account
 from ..models.goal_daily_plan import GoalDailyPlan
 from ..models.withdrawal import Withdrawal
+from ..models.operation import Operation
+from ..models.trading_day import TradingDay
+from ..models.trading_session import TradingSession
 
-# Nota: Las librerías de reportlab y openpyxl se instalarán después
-# Por ahora, definimos las funciones que las usarán
-
-def generate_pdf_report(
-    db: Session,
-    user_id: int,
-    goal_id: int,
-    lang: str = "en"
-) -> bytes:
-    """
-    Generar reporte PDF del objetivo
-    TODO: Implementar con reportlab después de instalar las dependencias
-    """
-    # Verificar que el objetivo existe y pertenece al usuario
+def get_report_goal(db: Session, user_id: int, goal_id: int) -> Goal:
+    """Objetivo del usuario para exportar (404 si no existe o no es suyo)."""
     account = db.query(Account).filter(Account.user_id == user_id).first()
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
-    
+
     goal = db.query(Goal).filter(
         Goal.id == goal_id,
         Goal.account_id == account.id
     ).first()
-    
+
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
-    
-    # Obtener datos del objetivo
-    daily_plans = db.query(GoalDailyPlan).filter(
-        GoalDailyPlan.goal_id == goal_id
-    ).order_by(GoalDailyPlan.date).all()
-    
-    withdrawals = db.query(Withdrawal).filter(
-        Withdrawal.goal_id == goal_id
-    ).order_by(Withdrawal.withdrawn_at).all()
-    
-    # TODO: Implementar generación de PDF con reportlab
-    # Por ahora, retornamos un placeholder
-    raise HTTPException(
-        status_code=501,
-        detail="PDF generation not implemented yet. Install 'reportlab' first."
-    )
+    return goal
 
-def generate_excel_report(
-    db: Session,
-    user_id: int,
-    goal_id: int,
-    lang: str = "en"
-) -> bytes:
+
+CSV_YIELD_PER = 500         # filas por página al leer de la DB
+CSV_CHUNK_BYTES = 64 * 1024  # tamaño aproximado de cada chunk emitido
+
+
+def _csv_sections(db: Session, goal: Goal):
     """
-    Generar reporte Excel del objetivo
-    TODO: Implementar con openpyxl después de instalar las dependencias
+    Secciones del CSV como (título, cabecera, filas). Las filas son generadores
+    sobre consultas con `yield_per`: se leen por páginas, nunca todas a la vez.
     """
-    # Verificar que el objetivo existe y pertenece al usuario
-    account = db.query(Account).filter(Account.user_id == user_id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-    
-    goal = db.query(Goal).filter(
-        Goal.id == goal_id,
-        Goal.account_id == account.id
-    ).first()
-    
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
-    
-    # Obtener datos del objetivo
     daily_plans = db.query(GoalDailyPlan).filter(
-        GoalDailyPlan.goal_id == goal_id
-    ).order_by(GoalDailyPlan.date).all()
-    
-    withdrawals = db.query(Withdrawal).filter(
-        Withdrawal.goal_id == goal_id
-    ).order_by(Withdrawal.withdrawn_at).all()
-    
-    # TODO: Implementar generación de Excel con openpyxl
-    # Por ahora, retornamos un placeholder
-    raise HTTPException(
-        status_code=501,
-        detail="Excel generation not implemented yet. Install 'openpyxl' first."
+        GoalDailyPlan.goal_id == goal.id
+    ).order_by(GoalDailyPlan.date).yield_per(CSV_YIELD_PER)
+
+    operations = db.query(
+        TradingDay.date,
+        TradingSession.session_number,
+        Operation.created_at,
+        Operation.result,
+        Operation.risk_percent,
+        Operation.amount,
+        Operation.profit,
+        Operation.comment,
+    ).join(
+        TradingSession, Operation.session_id == TradingSession.id
+    ).join(
+        TradingDay, TradingSession.trading_day_id == TradingDay.id
+    ).filter(
+        TradingDay.account_id == goal.account_id
     )
+    if goal.start_date:
+        operations = operations.filter(TradingDay.date >= goal.start_date)
+    operations = operations.order_by(Operation.created_at, Operation.id).yield_per(CSV_YIELD_PER)
 
-def generate_csv_report(
-    db: Session,
-    user_id: int,
-    goal_id: int,
-    lang: str = "en"
-) -> str:
-    """
-    Generar reporte CSV del objetivo (sin dependencias externas)
-    """
-    import csv
-    from io import StringIO
-    
-    # Verificar que el objetivo existe y pertenece al usuario
-    account = db.query(Account).filter(Account.user_id == user_id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-    
-    goal = db.query(Goal).filter(
-        Goal.id == goal_id,
-        Goal.account_id == account.id
-    ).first()
-    
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found")
-    
-    # Obtener planes diarios
-    daily_plans = db.query(GoalDailyPlan).filter(
-        GoalDailyPlan.goal_id == goal_id
-    ).order_by(GoalDailyPlan.date).all()
-    
-    # Crear CSV
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    # Header
-    writer.writerow([
+    withdrawals = db.query(Withdrawal).filter(
+        Withdrawal.goal_id == goal.id
+    ).order_by(Withdrawal.withdrawn_at).yield_per(CSV_YIELD_PER)
+
+    yield None, [
         "Date", "Capital Start", "Planned Sessions", "Planned Ops",
         "Actual Sessions", "Actual Ops", "Wins", "Losses", "Draws",
         "Realized PnL", "Status", "Notes"
-    ])
-    
-    # Rows
-    for plan in daily_plans:
-        writer.writerow([
+    ], (
+        [
             plan.date.isoformat(),
             plan.capital_start_of_day,
             plan.planned_sessions,
@@ -145,6 +86,235 @@ def generate_csv_report(
             plan.realized_pnl,
             plan.status.value,
             plan.notes or ""
-        ])
-    
-    return output.getvalue()
\ No newline at end of file
+        ]
+        for plan in daily_plans
+    )
+
+    yield "Operations", [
+        "Date", "Session", "Time", "Result", "Risk %", "Amount", "Profit", "Comment"
+    ], (
+        [
+            row.date.isoformat(),
+            row.session_number,
+            row.created_at.isoformat() if row.created_at else "",
+            row.result.value,
+            row.risk_percent,
+            row.amount,
+            row.profit,
+            row.comment or "",
+        ]
+        for row in operations
+    )
+
+    yield "Withdrawals", [
+        "Date", "Amount", "Capital Before", "Capital After", "Note"
+    ], (
+        [
+            withdrawal.withdrawn_at.isoformat(),
+            withdrawal.amount,
+            withdrawal.capital_before,
+            withdrawal.capital_after,
+            withdrawal.note or "",
+        ]
+        for withdrawal in withdrawals
+    )
+
+
+def iter_csv_report(db: Session, goal: Goal, close_session: bool = False) -> Iterator[bytes]:
+    """
+    CSV del objetivo en chunks de ~CSV_CHUNK_BYTES: planes diarios y, tras una
+    línea en blanco y el título de cada una, las secciones de operaciones y
+    retiros. La memoria no crece con el historial.
+
+    Con `close_session` la sesión se cierra al terminar el stream (la
+    dependencia `get_db` ya salió cuando StreamingResponse empieza a iterar).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    try:
+        for title, header, rows in _csv_sections(db, goal):
+            if title:
+                writer.writerow([])
+                writer.writerow([title])
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(row)
+                if buffer.tell() >= CSV_CHUNK_BYTES:
+                    yield flush()
+        if buffer.tell():
+            yield flush()
+    finally:
+        if close_session:
+            db.close()
+
+
+def report_data_version(db: Session, goal: Goal) -> tuple[str, datetime]:
+    """
+    Versión de los datos del reporte: hash de los últimos cambios (y conteos,
+    para detectar borrados) de planes diarios, operaciones y retiros del
+    objetivo, más la fecha del cambio más reciente.
+    """
+    plans = db.query(
+        func.count(GoalDailyPlan.id), func.max(GoalDailyPlan.updated_at)
+    ).filter(GoalDailyPlan.goal_id == goal.id).one()
+
+    withdrawals = db.query(
+        func.count(Withdrawal.id), func.max(Withdrawal.created_at)
+    ).filter(Withdrawal.goal_id == goal.id).one()
+
+    operations = db.query(
+        func.count(Operation.id), func.max(Operation.created_at)
+    ).join(
+        TradingSession, Operation.session_id == TradingSession.id
+    ).join(
+        TradingDay, TradingSession.trading_day_id == TradingDay.id
+    ).filter(TradingDay.account_id == goal.account_id)
+    if goal.start_date:
+        operations = operations.filter(TradingDay.date >= goal.start_date)
+    operations = operations.one()
+
+    markers = [goal.id, goal.updated_at, *plans, *withdrawals, *operations]
+    version = hashlib.sha1(repr(markers).encode()).hexdigest()[:16]
+    last_modified = max(
+        (value for value in (goal.updated_at, goal.created_at, plans[1], withdrawals[1], operations[1]) if value),
+        default=datetime.utcnow(),
+    )
+    return version, last_modified
+
+
+_SECTION_TITLES = {
+    "en": {None: "Daily Plans", "Operations": "Operations", "Withdrawals": "Withdrawals",
+           "summary": "Summary", "report": "Goal Report",
+           "truncated": "Truncated: the full history is in the Excel and CSV reports"},
+    "es": {None: "Planes diarios", "Operations": "Operaciones", "Withdrawals": "Retiros",
+           "summary": "Resumen", "report": "Reporte del objetivo",
+           "truncated": "Recortado: el historial completo está en los reportes Excel y CSV"},
+}
+
+
+def _titles(lang: str) -> dict:
+    return _SECTION_TITLES.get((lang or "en")[:2].lower(), _SECTION_TITLES["en"])
+
+
+def _summary_rows(goal: Goal) -> list:
+    return [
+        ["Goal ID", goal.id],
+        ["Status", goal.status.value if goal.status else ""],
+        ["Target Capital", goal.target_capital],
+        ["Start Capital", goal.start_capital_snapshot],
+        ["Start Date", goal.start_date.isoformat() if goal.start_date else ""],
+        ["Risk %", goal.risk_percent],
+        ["Sessions / Day", goal.sessions_per_day],
+        ["Ops / Session", goal.ops_per_session],
+        ["Winrate Estimate", goal.winrate_estimate],
+    ]
+
+
+def render_excel_report(db: Session, goal: Goal, path: str, lang: str = "en") -> None:
+    """
+    Escribe el reporte Excel en `path` con openpyxl en modo write-only: las
+    filas se vuelcan a disco al añadirse, así que la memoria no crece con
+    el historial. Una hoja de resumen y una por sección del CSV.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("Excel reports require 'openpyxl'")
+
+    titles = _titles(lang)
+    workbook = Workbook(write_only=True)
+
+    summary = workbook.create_sheet(titles["summary"])
+    for row in _summary_rows(goal):
+        summary.append(row)
+
+    for title, header, rows in _csv_sections(db, goal):
+        sheet = workbook.create_sheet(titles[title])
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+
+    workbook.save(path)
+
+
+_PDF_FONT_SIZE = 7
+_PDF_LINE_HEIGHT = 10
+_PDF_MARGIN = 36
+
+
+def render_pdf_report(db: Session, goal: Goal, path: str, lang: str = "en") -> None:
+    """
+    Escribe el reporte PDF en `path` dibujando fila a fila con el canvas de
+    reportlab: resumen y, a continuación, cada sección con su cabecera
+    repetida en cada página. El canvas retiene todas las páginas hasta
+    `save()`, así que cada sección se corta en `REPORT_PDF_MAX_ROWS` filas
+    para acotar la memoria; el historial completo sale en Excel y CSV.
+    """
+    try:
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+    except ImportError:
+        raise RuntimeError("PDF reports require 'reportlab'")
+
+    titles = _titles(lang)
+    width, height = landscape(A4)
+    pdf = canvas.Canvas(path, pagesize=(width, height), pageCompression=1)
+    y = height - _PDF_MARGIN
+
+    def new_page():
+        nonlocal y
+        pdf.showPage()
+        y = height - _PDF_MARGIN
+
+    def write_line(values, columns: int, bold: bool = False):
+        nonlocal y
+        if y < _PDF_MARGIN:
+            new_page()
+        pdf.setFont("Helvetica-Bold" if bold else "Helvetica", _PDF_FONT_SIZE)
+        column_width = (width - 2 * _PDF_MARGIN) / columns
+        for i, value in enumerate(values):
+            text = "" if value is None else str(value)
+            pdf.drawString(_PDF_MARGIN + i * column_width, y, text[:40])
+        y -= _PDF_LINE_HEIGHT
+
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(_PDF_MARGIN, y, f"{titles['report']} #{goal.id}")
+    y -= 2 * _PDF_LINE_HEIGHT
+    for row in _summary_rows(goal):
+        write_line(row, 4)
+
+    for title, header, rows in _csv_sections(db, goal):
+        y -= _PDF_LINE_HEIGHT
+        write_line([titles[title]], 1, bold=True)
+        write_line(header, len(header), bold=True)
+        for count, row in enumerate(rows):
+            if count == settings.REPORT_PDF_MAX_ROWS:
+                write_line([titles["truncated"]], 1, bold=True)
+                break
+            if y < _PDF_MARGIN:
+                new_page()
+                write_line(header, len(header), bold=True)
+            write_line(row, len(header))
+
+    pdf.save()
+
+
+def generate_csv_report(
+    db: Session,
+    user_id: int,
+    goal_id: int,
+    lang: str = "en"
+) -> str:
+    """
+    Generar reporte CSV del objetivo completo en memoria (sin dependencias
+    externas). La ruta de descarga usa `iter_csv_report` en streaming.
+    """
+    goal = get_report_goal(db, user_id, goal_id)
+    return b"".join(iter_csv_report(db, goal)).decode("utf-8")
@@ -0,0 +1,207 @@
+"""
+Jobs en segundo plano para los reportes PDF/Excel.
+
+La petición solo encola el build y responde; un pool de hilos
+(REPORT_JOB_WORKERS) renderiza el archivo en modo streaming y lo deja en
+disco bajo REPORTS_DIR, con nombre derivado de la versión de los datos
+(`report_data_version`). Si los datos no cambian, el mismo job id apunta al
+mismo archivo y no se vuelve a renderizar.
+
+El estado vive en disco, así que cualquier worker de uvicorn lo ve:
+- `<job>.<ext>`     listo para descargar
+- `<job>.<ext>.part` en construcción (creado con O_EXCL: un solo build por job)
+- `<job>.failed`     error del último intento (se reintenta al volver a pedirlo)
+Un `.part` sin tocar en REPORT_JOB_STALE_SEC se considera abandonado.
+Los artefactos listos comparten el límite de tamaño de `report_cache`.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.goal import Goal
+from . import report_cache, report_generator_service
+
+logger = logging.getLogger("app.report_jobs")
+
+REPORT_FORMATS = {
+    "pdf": ("pdf", "application/pdf", report_generator_service.render_pdf_report),
+    "excel": (
+        "xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        report_generator_service.render_excel_report,
+    ),
+}
+
+JOB_PENDING = "pending"
+JOB_READY = "ready"
+JOB_FAILED = "failed"
+JOB_NOT_FOUND = "not_found"
+
+
+class ReportJob(NamedTuple):
+    job_id: str
+    goal_id: int
+    format: str
+    status: str
+    path: Optional[str] = None
+    error: Optional[str] = None
+
+
+# Sesiones del worker (los tests apuntan a su propia DB)
+session_factory: Optional[Callable[[], Session]] = None
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_inflight: dict[str, Future] = {}
+
+
+def _session() -> Session:
+    global session_factory
+    if session_factory is None:
+        from ..database import SessionLocal
+        session_factory = SessionLocal
+    return session_factory()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORT_JOB_WORKERS, thread_name_prefix="report-job"
+            )
+        return _executor
+
+
+def job_id_for(fmt: str, lang: str, version: str) -> str:
+    """Job id (y nombre del artefacto) del reporte para una versión de los datos."""
+    return f"{fmt}-{(lang or 'en')[:2].lower()}-{version}"
+
+
+def _parse_job_id(job_id: str) -> tuple[str, str, str]:
+    parts = job_id.split("-")
+    if len(parts) != 3 or parts[0] not in REPORT_FORMATS or not parts[2].isalnum():
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return parts[0], parts[1], parts[2]
+
+
+def _paths(goal_id: int, job_id: str) -> tuple[str, str, str]:
+    extension = REPORT_FORMATS[job_id.split("-")[0]][0]
+    base = report_cache.artifact_path(goal_id, job_id)
+    return f"{base}.{extension}", f"{base}.{extension}.part", f"{base}.failed"
+
+
+def get_job(goal_id: int, job_id: str) -> ReportJob:
+    """Estado del job según los archivos en disco."""
+    fmt, _, _ = _parse_job_id(job_id)
+    final_path, part_path, failed_path = _paths(goal_id, job_id)
+
+    if os.path.exists(final_path):
+        return ReportJob(job_id, goal_id, fmt, JOB_READY, path=final_path)
+    if os.path.exists(failed_path):
+        with open(failed_path, encoding="utf-8") as failed:
+            return ReportJob(job_id, goal_id, fmt, JOB_FAILED, error=failed.read())
+    try:
+        if time.time() - os.path.getmtime(part_path) < settings.REPORT_JOB_STALE_SEC:
+            return ReportJob(job_id, goal_id, fmt, JOB_PENDING)
+    except FileNotFoundError:
+        pass
+    return ReportJob(job_id, goal_id, fmt, JOB_NOT_FOUND)
+
+
+def _claim(part_path: str) -> bool:
+    """Crea el `.part` de forma exclusiva; False si otro build ya lo tiene."""
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    for _ in range(2):
+        try:
+            os.close(os.open(part_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(part_path) < settings.REPORT_JOB_STALE_SEC:
+                    return False
+                os.remove(part_path)  # build abandonado (worker caído)
+            except FileNotFoundError:
+                pass
+    return False
+
+
+def enqueue_report(
+    db: Session, goal: Goal, fmt: str, lang: str = "en", version: Optional[str] = None
+) -> ReportJob:
+    """
+    Devuelve el job del reporte para la versión actual de los datos,
+    encolándolo si no está listo ni en curso. 503 si la cola está llena.
+    """
+    if fmt not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported report format: {fmt}")
+
+    if version is None:
+        version, _ = report_generator_service.report_data_version(db, goal)
+    job_id = job_id_for(fmt, lang, version)
+    job = get_job(goal.id, job_id)
+    if job.status in (JOB_READY, JOB_PENDING):
+        return job
+
+    with _lock:
+        if len(_inflight) >= settings.REPORT_JOB_MAX_PENDING:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Report queue is full. Please try again later.",
+                headers={"Retry-After": "30"},
+            )
+
+    final_path, part_path, failed_path = _paths(goal.id, job_id)
+    if not _claim(part_path):
+        return ReportJob(job_id, goal.id, fmt, JOB_PENDING)
+    if os.path.exists(failed_path):
+        os.remove(failed_path)
+
+    future = _get_executor().submit(_build, goal.id, fmt, lang, job_id)
+    with _lock:
+        _inflight[f"{goal.id}:{job_id}"] = future
+    return ReportJob(job_id, goal.id, fmt, JOB_PENDING)
+
+
+def _build(goal_id: int, fmt: str, lang: str, job_id: str) -> None:
+    final_path, part_path, failed_path = _paths(goal_id, job_id)
+    _, _, render = REPORT_FORMATS[fmt]
+    started = time.perf_counter()
+    db = _session()
+    try:
+        goal = db.query(Goal).filter(Goal.id == goal_id).one()
+        render(db, goal, part_path, lang)
+        os.replace(part_path, final_path)
+        report_cache.evict()
+        logger.info("Report %s for goal %d built in %.2fs", job_id, goal_id, time.perf_counter() - started)
+    except Exception as exc:
+        logger.exception("Report %s for goal %d failed", job_id, goal_id)
+        with open(failed_path, "w", encoding="utf-8") as failed:
+            failed.write(str(exc) or type(exc).__name__)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    finally:
+        db.close()
+        with _lock:
+            _inflight.pop(f"{goal_id}:{job_id}", None)
+
+
+def wait_for_job(goal_id: int, job_id: str, timeout: Optional[float] = None) -> ReportJob:
+    """Espera a que termine un build encolado por este proceso (tests / scripts)."""
+    with _lock:
+        future = _inflight.get(f"{goal_id}:{job_id}")
+    if future is not None:
+        future.result(timeout=timeout)
+    return get_job(goal_id, job_id)
+
+
+def media_type(fmt: str) -> str:
+    return REPORT_FORMATS[fmt][1]
@@ -1,69 +1,56 @@
-from sqlalchemy import case, func
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
 from ..models.account import Account
 from ..models.trading_day import TradingDay
-from ..models.trading_session import TradingSession
-from ..models.operation import Operation, OperationResult
+from ..models.daily_account_stats import DailyAccountStats
 from ..schemas.reports import ReportResponse, DailyMetric
 
-def get_reports(db: Session, user_id: int, days: int) -> ReportResponse:
-    account = db.query(Account).filter(Account.user_id == user_id).first()
-    if not account:
-        return ReportResponse(
-            metrics=[],
-            total_operations=0,
-            total_profit=0.0,
-            total_loss=0.0,
-            winrate=0.0,
-            avg_drawdown=0.0
-        )
-    
+def _empty_report() -> ReportResponse:
+    return ReportResponse(
+        metrics=[],
+        total_operations=0,
+        total_profit=0.0,
+        total_loss=0.0,
+        winrate=0.0,
+        avg_drawdown=0.0
+    )
+
+
+def _report_days_stmt(account_id: int, days: int):
     end_date = date.today()
     start_date = end_date - timedelta(days=days - 1)
-    
-    aggregated_days = (
-        db.query(
+
+    # Un join por día contra el rollup diario: O(días), no O(operaciones)
+    return (
+        select(
             TradingDay.date.label("date"),
             TradingDay.drawdown.label("drawdown"),
-            func.coalesce(
-                func.sum(
-                    case((Operation.result == OperationResult.WIN, Operation.profit), else_=0.0)
-                ),
-                0.0,
-            ).label("day_profit"),
-            func.coalesce(
-                func.sum(
-                    case((Operation.result == OperationResult.LOSS, -Operation.profit), else_=0.0)
-                ),
-                0.0,
-            ).label("day_loss"),
-            func.coalesce(func.count(Operation.id), 0).label("day_operations"),
-            func.coalesce(
-                func.sum(case((Operation.result == OperationResult.WIN, 1), else_=0)),
-                0,
-            ).label("day_wins"),
-            func.coalesce(
-                func.sum(case((Operation.result == OperationResult.LOSS, 1), else_=0)),
-                0,
-            ).label("day_losses"),
-            func.coalesce(
-                func.sum(case((Operation.result == OperationResult.DRAW, 1), else_=0)),
-                0,
-            ).label("day_draws"),
+            DailyAccountStats.gross_profit.label("day_profit"),
+            DailyAccountStats.gross_loss.label("day_loss"),
+            DailyAccountStats.ops.label("day_operations"),
+            DailyAccountStats.wins.label("day_wins"),
+            DailyAccountStats.losses.label("day_losses"),
+            DailyAccountStats.draws.label("day_draws"),
+        )
+        .outerjoin(
+            DailyAccountStats,
+            and_(
+                DailyAccountStats.account_id == TradingDay.account_id,
+                DailyAccountStats.date == TradingDay.date,
+            ),
         )
-        .outerjoin(TradingSession, TradingSession.trading_day_id == TradingDay.id)
-        .outerjoin(Operation, Operation.session_id == TradingSession.id)
-        .filter(
-            TradingDay.account_id == account.id,
+        .where(
+            TradingDay.account_id == account_id,
             TradingDay.date >= start_date,
             TradingDay.date <= end_date,
         )
-        .group_by(TradingDay.id, TradingDay.date, TradingDay.drawdown)
         .order_by(TradingDay.date.asc())
-        .all()
     )
 
+
+def _build_report(capital: float, aggregated_days) -> ReportResponse:
     metrics = []
     total_operations = 0
     total_profit = 0.0
@@ -82,7 +69,7 @@ def get_reports(db: Session, user_id: int, days: int) -> ReportResponse:
         metrics.append(
             DailyMetric(
                 date=row.date,
-                capital=float(account.capital),
+                capital=float(capital),
                 profit=day_profit,
                 loss=day_loss,
                 operations=day_operations,
@@ -109,3 +96,24 @@ def get_reports(db: Session, user_id: int, days: int) -> ReportResponse:
         winrate=winrate,
         avg_drawdown=avg_drawdown
     )
+
+
+def get_reports(db: Session, user_id: int, days: int) -> ReportResponse:
+    account = db.query(Account).filter(Account.user_id == user_id).first()
+    if not account:
+        return _empty_report()
+
+    aggregated_days = db.execute(_report_days_stmt(account.id, days)).all()
+    return _build_report(account.capital, aggregated_days)
+
+
+async def get_reports_async(db: AsyncSession, user_id: int, days: int) -> ReportResponse:
+    """Variante async de `get_reports` (misma consulta, driver async)."""
+    account = (await db.execute(
+        select(Account).where(Account.user_id == user_id)
+    )).scalars().first()
+    if not account:
+        return _empty_report()
+
+    aggregated_days = (await db.execute(_report_days_stmt(account.id, days))).all()
+    return _build_report(account.capital, aggregated_days)
@@ -0,0 +1,153 @@
+"""
+Simulador Monte Carlo de riesgo de ruina para el planificador de objetivos.
+
+Genera miles de trayectorias WIN/LOSS/DRAW en bloques vectorizados de NumPy
+respetando las reglas de bloqueo de la app:
+
+- 2 pérdidas bloquean la sesión.
+- 4 pérdidas bloquean el día.
+- 10% de drawdown (sobre el capital de apertura) bloquea el día.
+
+Igual que `projection_engine.daily_growth_factor`, el stake se fija al abrir
+el día (riesgo sobre el capital de apertura), así que cada día se reduce a un
+factor y la trayectoria completa es un producto acumulado.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+SESSION_LOSS_LIMIT = 2
+DAY_LOSS_LIMIT = 4
+DAY_DRAWDOWN_LIMIT = 0.10
+
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Presupuesto de latencia: tope de operaciones simuladas por petición
+# (trayectorias x días x ops/día) y tamaño de cada bloque en memoria.
+MAX_SIMULATED_OPS = 4_000_000
+BATCH_OPS = 1_000_000
+
+
+class SimulationParams(NamedTuple):
+    """Tupla de parámetros: también es la clave de la caché de resultados."""
+    capital: float
+    payout: float
+    target_capital: Optional[float]
+    sessions_per_day: int
+    ops_per_session: int
+    risk_percent: float
+    winrate: float
+    draw_rate: float
+    days: int
+    paths: int
+    ruin_fraction: float
+    seed: Optional[int]
+
+
+class SimulationResult(NamedTuple):
+    paths: int
+    bands: tuple[tuple[float, ...], ...]  # (día, p5, p25, p50, p75, p95)
+    probability_hit_target: Optional[float]
+    risk_of_ruin: float
+    mean_final_capital: float
+    blocked_days_ratio: float
+
+
+def capped_paths(paths: int, days: int, ops_per_day: int) -> int:
+    """Trayectorias que caben en el presupuesto de operaciones (mínimo 1)."""
+    return max(1, min(paths, MAX_SIMULATED_OPS // max(days * ops_per_day, 1)))
+
+
+def _simulate_day_units(
+    rng: np.random.Generator,
+    shape: tuple[int, int],
+    sessions_per_day: int,
+    ops_per_session: int,
+    risk_fraction: float,
+    p_win: float,
+    p_draw: float,
+    payout: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Resultado de cada día en unidades de stake (WIN = +payout, LOSS = -1).
+
+    Devuelve (unidades, bloqueado) con forma `shape` = (trayectorias, días).
+    """
+    ops_per_day = sessions_per_day * ops_per_session
+    draws = rng.random((*shape, sessions_per_day, ops_per_session))
+    win = draws < p_win
+    loss = draws >= p_win + p_draw
+    units = np.where(win, payout, np.where(loss, -1.0, 0.0))
+
+    # Sesión: una operación solo se juega si antes hubo menos de 2 pérdidas.
+    prior_session_losses = np.cumsum(loss, axis=-1) - loss
+    session_active = (prior_session_losses < SESSION_LOSS_LIMIT).reshape(*shape, ops_per_day)
+    loss = loss.reshape(*shape, ops_per_day) & session_active
+    units = units.reshape(*shape, ops_per_day) * session_active
+
+    # Día: se corta en la primera operación tras 4 pérdidas o 10% de drawdown.
+    prior_day_losses = np.cumsum(loss, axis=-1) - loss
+    prior_day_units = np.cumsum(units, axis=-1) - units
+    can_trade = (prior_day_losses < DAY_LOSS_LIMIT) & (
+        -prior_day_units * risk_fraction < DAY_DRAWDOWN_LIMIT - 1e-9
+    )
+    day_active = np.logical_and.accumulate(can_trade, axis=-1)
+
+    day_units = (units * day_active).sum(axis=-1)
+    return day_units, ~day_active[..., -1]
+
+
+def simulate(params: SimulationParams) -> SimulationResult:
+    """Ejecuta la simulación por bloques de días sin pasar de `BATCH_OPS` operaciones."""
+    ops_per_day = params.sessions_per_day * params.ops_per_session
+    paths = capped_paths(params.paths, params.days, ops_per_day)
+    risk_fraction = params.risk_percent / 100.0
+    p_win = params.winrate * (1 - params.draw_rate)
+
+    rng = np.random.default_rng(params.seed)
+    trajectory = np.empty((paths, params.days + 1), dtype=np.float64)
+    trajectory[:, 0] = params.capital
+    blocked_days = 0
+
+    days_per_batch = max(1, BATCH_OPS // (paths * ops_per_day))
+    for start in range(0, params.days, days_per_batch):
+        batch_days = min(days_per_batch, params.days - start)
+        day_units, blocked = _simulate_day_units(
+            rng, (paths, batch_days), params.sessions_per_day, params.ops_per_session,
+            risk_fraction, p_win, params.draw_rate, params.payout,
+        )
+        factors = 1 + risk_fraction * day_units
+        trajectory[:, start + 1:start + batch_days + 1] = (
+            trajectory[:, start:start + 1] * np.cumprod(factors, axis=1)
+        )
+        blocked_days += int(blocked.sum())
+
+    percentiles = np.percentile(trajectory, BAND_PERCENTILES, axis=0)
+    bands = tuple(
+        (day, *(round(float(value), 2) for value in percentiles[:, day]))
+        for day in range(params.days + 1)
+    )
+
+    probability_hit_target = None
+    if params.target_capital:
+        hit = (trajectory >= params.target_capital).any(axis=1)
+        probability_hit_target = float(hit.mean())
+
+    ruined = (trajectory <= params.capital * params.ruin_fraction).any(axis=1)
+
+    return SimulationResult(
+        paths=paths,
+        bands=bands,
+        probability_hit_target=probability_hit_target,
+        risk_of_ruin=float(ruined.mean()),
+        mean_final_capital=float(trajectory[:, -1].mean()),
+        blocked_days_ratio=blocked_days / (paths * params.days),
+    )
+
+
+@lru_cache(maxsize=256)
+def simulate_cached(params: SimulationParams) -> SimulationResult:
+    """Caché LRU por proceso: la misma tupla de parámetros no se vuelve a simular."""
+    return simulate(params)
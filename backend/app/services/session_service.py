@@ -1,6 +1,9 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from datetime import datetime, date
+from typing import Optional
 from ..models.account import Account
 from ..models.trading_day import TradingDay
 from ..models.trading_session import TradingSession
@@ -41,8 +44,15 @@ def check_day_unblocked(trading_day: TradingDay) -> bool:
         return True
     return trading_day.status == "active"
 
-def create_session(db: Session, user_id: int, session_data: SessionCreate, lang: str = "en") -> SessionResponse:
-    account = db.query(Account).filter(Account.user_id == user_id).first()
+def create_session(
+    db: Session,
+    user_id: int,
+    session_data: SessionCreate,
+    lang: str = "en",
+    account: Optional[Account] = None
+) -> SessionResponse:
+    if account is None:
+        account = db.query(Account).filter(Account.user_id == user_id).first()
     if not account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -79,22 +89,22 @@ def create_session(db: Session, user_id: int, session_data: SessionCreate, lang:
     
     return SessionResponse.from_orm(new_session)
 
+def _today_sessions_stmt(user_id: int):
+    """Sesiones de hoy del usuario en una sola consulta (cuenta → día → sesiones)."""
+    return (
+        select(TradingSession)
+        .join(TradingDay, TradingSession.trading_day_id == TradingDay.id)
+        .join(Account, TradingDay.account_id == Account.id)
+        .where(Account.user_id == user_id, TradingDay.date == date.today())
+        .order_by(TradingSession.session_number)
+    )
+
+
 def get_sessions_today(db: Session, user_id: int) -> list[SessionResponse]:
-    account = db.query(Account).filter(Account.user_id == user_id).first()
-    if not account:
-        return []
-    
-    today = date.today()
-    trading_day = db.query(TradingDay).filter(
-        TradingDay.account_id == account.id,
-        TradingDay.date == today
-    ).first()
-    
-    if not trading_day:
-        return []
-    
-    sessions = db.query(TradingSession).filter(
-        TradingSession.trading_day_id == trading_day.id
-    ).all()
-    
+    sessions = db.execute(_today_sessions_stmt(user_id)).scalars().all()
+    return [SessionResponse.from_orm(s) for s in sessions]
+
+
+async def get_sessions_today_async(db: AsyncSession, user_id: int) -> list[SessionResponse]:
+    sessions = (await db.execute(_today_sessions_stmt(user_id))).scalars().all()
     return [SessionResponse.from_orm(s) for s in sessions]
\ No newline at end of file
@@ -5,7 +5,7 @@ from typing import List, Optional
 from ..models.withdrawal import Withdrawal
 from ..models.account import Account
 from ..models.goal import Goal, GoalStatus
-from ..services.daily_plan_service import regenerate_goal_calendar
+from ..services.daily_plan_service import refresh_goal_calendar
 from ..schemas.withdrawal import WithdrawalCreate, WithdrawalResponse, WithdrawalListResponse
 from ..utils.messages import get_message
 
@@ -61,7 +61,7 @@ def create_withdrawal(
 
     # Recalcular calendario de meta activa con el nuevo capital base.
     if active_goal:
-        regenerate_goal_calendar(db, active_goal.id)
+        refresh_goal_calendar(db, active_goal.id)
 
     return WithdrawalResponse.from_orm(new_withdrawal)
 
@@ -0,0 +1,89 @@
+"""
+Utilidades de caché HTTP (ETag / If-None-Match, Last-Modified / If-Modified-Since).
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+
+def make_etag(*parts) -> str:
+    """Construye un ETag fuerte a partir de los valores que definen la representación."""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara el header If-None-Match (lista separada por comas, admite W/ y *) con el ETag."""
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
+
+
+def http_date(value: datetime) -> str:
+    """Fecha en formato HTTP (RFC 7231). Las fechas naive se toman como UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    """True si If-Modified-Since es igual o posterior a `last_modified` (resolución de segundos)."""
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> bool:
+    """
+    Condicional de GET: If-None-Match tiene prioridad; If-Modified-Since solo
+    se evalúa si el cliente no envió If-None-Match.
+    """
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+    return last_modified is not None and not_modified_since(if_modified_since, last_modified)
+
+
+def cache_control_max_age(cache_control: Optional[str]) -> Optional[int]:
+    """`max-age` (segundos) de un header Cache-Control; None si no hay o si es no-store/no-cache."""
+    if not cache_control:
+        return None
+    max_age = None
+    for directive in cache_control.split(","):
+        name, _, value = directive.strip().partition("=")
+        name = name.strip().lower()
+        if name in ("no-store", "no-cache"):
+            return None
+        if name == "max-age":
+            try:
+                max_age = max(0, int(value.strip().strip('"')))
+            except ValueError:
+                return None
+    return max_age
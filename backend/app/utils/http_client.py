@@ -0,0 +1,42 @@
+"""
+Cliente HTTP compartido (uno por proceso) para llamar a proveedores externos.
+
+Reutiliza las conexiones (keep-alive + TLS) entre peticiones en lugar de
+abrir una nueva con cada `requests.get`. `requests.Session` es seguro para
+peticiones concurrentes desde varios hilos mientras no se cambie su
+configuración (headers, auth...) después de crearla.
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config import settings
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+
+def get_http_session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings.OAUTH_HTTP_POOL_SIZE,
+                pool_maxsize=settings.OAUTH_HTTP_POOL_SIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def close_http_session() -> None:
+    global _session
+    with _lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
@@ -3,6 +3,7 @@ Utilidades de seguridad para autenticación.
 """
 
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import jwt
 import bcrypt
 from ..config import settings
@@ -10,10 +11,10 @@ from ..config import settings
 
 # ── Password Hashing con bcrypt directo ────────────────────────
 
-def get_password_hash(password: str) -> str:
-    """Hashea una contraseña usando bcrypt."""
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    """Hashea una contraseña usando bcrypt (coste `BCRYPT_ROUNDS` por defecto)."""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -28,27 +29,57 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 
+def password_needs_rehash(hashed_password: str, rounds: Optional[int] = None) -> bool:
+    """True si el hash ($2b$<coste>$...) se generó con un coste distinto al configurado."""
+    try:
+        return int(hashed_password.split('$')[2]) != (rounds or settings.BCRYPT_ROUNDS)
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+
 # ── JWT Tokens ────────────────────────────────────────────────
+#
+# El access token es corto y lleva el `uid`, que las rutas de lectura usan
+# sin ir a la DB. Nada que pueda cambiar (rol, bloqueo, plan) viaja en él.
+# El refresh token solo lleva sub/uid y se canjea en /auth/refresh, que
+# siempre vuelve a leer el usuario.
 
-def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
-    """Crea un token JWT."""
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+
+def create_access_token(data: dict, expires_delta: timedelta = None, token_type: str = ACCESS_TOKEN_TYPE) -> str:
+    """Crea un token JWT (access por defecto, refresh con `token_type`)."""
     to_encode = data.copy()
+    now = datetime.utcnow()
     
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
+    elif token_type == REFRESH_TOKEN_TYPE:
+        expire = now + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": now, "type": token_type})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     
     return encoded_jwt
 
 
+def create_token_pair(user) -> dict:
+    """Access token + refresh token del usuario."""
+    return {
+        "access_token": create_access_token({"sub": user.email, "uid": user.id}),
+        "refresh_token": create_access_token(
+            {"sub": user.email, "uid": user.id}, token_type=REFRESH_TOKEN_TYPE
+        ),
+    }
+
+
 def decode_access_token(token: str) -> dict:
     """Decodifica un token JWT."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except jwt.JWTError:
-        return None
\ No newline at end of file
+        return None
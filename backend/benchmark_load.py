@@ -0,0 +1,87 @@
+"""
+Benchmark de carga para las rutas de lectura calientes.
+
+Lanza N peticiones con C clientes concurrentes contra un servidor en marcha y
+mide throughput (req/s) y latencias p50/p99 por ruta. Para comparar el stack
+async con el sync, ejecutar el mismo comando contra cada versión del backend
+(mismo número de workers y misma base de datos):
+
+    uvicorn app.main:app --workers 4
+    python benchmark_load.py --email demo@example.com --password Demo1234 \\
+        --concurrency 200 --requests 5000 \\
+        /sessions "/operations?session_id=1" /reports "/goals/1/calendar"
+
+Uso: python benchmark_load.py [--base-url URL] (--token T | --email E --password P) rutas...
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _run_path(client: httpx.AsyncClient, path: str, headers: dict, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    pending = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in pending:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "path": path,
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "errors": errors,
+    }
+
+
+async def main(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        token = args.token or await _login(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print(f"{args.requests} peticiones por ruta, concurrencia {args.concurrency}")
+        print(f"{'ruta':<32}{'req/s':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'errores':>10}")
+        for path in args.paths:
+            result = await _run_path(client, path, headers, args.requests, args.concurrency)
+            print(
+                f"{result['path']:<32}{result['rps']:>10.1f}"
+                f"{result['p50_ms']:>12.1f}{result['p99_ms']:>12.1f}{result['errors']:>10}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    if not args.token and not (args.email and args.password):
+        parser.error("--token o --email/--password son obligatorios")
+    asyncio.run(main(args))
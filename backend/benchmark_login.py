@@ -0,0 +1,121 @@
+"""
+Benchmark de login concurrente: bcrypt en el hilo de la ruta vs pool de procesos.
+
+Monta en proceso (sin red ni DB) una app mínima con `POST /login` síncrono,
+que verifica un hash bcrypt real, y un `GET /ping` síncrono que hace de
+petición de trading. Lanza una ráfaga de logins con concurrencia C y, a la
+vez, un goteo de pings; mide logins/s, cuántos logins recibieron 503 y la
+latencia p50/p99 de los pings, primero con bcrypt inline (como antes) y
+luego con `password_hasher` (PASSWORD_HASH_WORKERS procesos, cola acotada):
+
+    python benchmark_login.py --logins 400 --concurrency 100 --rounds 12
+
+Uso: python benchmark_login.py [--logins N] [--concurrency C] [--rounds R]
+                               [--workers W] [--max-pending P] [--threads T]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import anyio
+import httpx
+from fastapi import FastAPI
+
+from app.config import settings
+from app.services import password_hasher
+from app.utils.security import get_password_hash, verify_password
+
+PASSWORD = "Test1234"
+
+
+def _build_app(hashed: str, pooled: bool) -> FastAPI:
+    app = FastAPI()
+    check = password_hasher.check_password if pooled else verify_password
+
+    @app.post("/login")
+    def login():
+        if not check(PASSWORD, hashed):
+            return {"ok": False}
+        return {"ok": True}
+
+    @app.get("/ping")
+    def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+def _percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else 0.0
+
+
+async def _run(app: FastAPI, logins: int, concurrency: int) -> dict:
+    pending = iter(range(logins))
+    statuses = []
+    ping_latencies = []
+    done = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def login_worker():
+            for _ in pending:
+                response = await client.post("/login")
+                statuses.append(response.status_code)
+
+        async def pinger():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        ping_task = asyncio.create_task(pinger())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ping_task
+
+    ok = statuses.count(200)
+    return {
+        "login_rps": ok / elapsed,
+        "rejected": statuses.count(503),
+        "ping_p50_ms": statistics.median(ping_latencies) * 1000 if ping_latencies else 0.0,
+        "ping_p99_ms": _percentile(ping_latencies, 0.99),
+    }
+
+
+async def main(args) -> None:
+    settings.BCRYPT_ROUNDS = args.rounds
+    settings.PASSWORD_HASH_WORKERS = args.workers
+    settings.PASSWORD_HASH_MAX_PENDING = args.max_pending
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+
+    hashed = get_password_hash(PASSWORD)
+    password_hasher.check_password(PASSWORD, hashed)  # arranca los procesos fuera de la medición
+
+    print(
+        f"{args.logins} logins, concurrencia {args.concurrency}, bcrypt {args.rounds} rondas, "
+        f"{args.threads} hilos, pool {args.workers} procesos + {args.max_pending} en cola"
+    )
+    print(f"{'modo':<14}{'logins/s':>10}{'503':>8}{'ping p50 (ms)':>16}{'ping p99 (ms)':>16}")
+    for name, pooled in (("inline", False), ("pool", True)):
+        result = await _run(_build_app(hashed, pooled), args.logins, args.concurrency)
+        print(
+            f"{name:<14}{result['login_rps']:>10.1f}{result['rejected']:>8}"
+            f"{result['ping_p50_ms']:>16.2f}{result['ping_p99_ms']:>16.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=settings.PASSWORD_HASH_MAX_PENDING)
+    parser.add_argument("--threads", type=int, default=40)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""
+Benchmark del middleware de errores: `BaseHTTPMiddleware` vs ASGI puro.
+
+Monta dos apps mínimas en proceso (sin red ni DB) con el mismo `/health` y un
+endpoint de export en streaming, una con la versión antigua del middleware
+(basada en `BaseHTTPMiddleware`) y otra con `GlobalErrorMiddleware`, y mide
+req/s y latencias p50/p99 con httpx sobre ASGITransport:
+
+    python benchmark_middleware.py --requests 5000 --concurrency 50 --chunks 200
+
+Uso: python benchmark_middleware.py [--requests N] [--concurrency C] [--chunks K]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware.error_handler import GlobalErrorMiddleware, unhandled_exception_response
+
+
+class LegacyErrorMiddleware(BaseHTTPMiddleware):
+    """Implementación anterior (solo para comparar)."""
+
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except Exception:
+            return unhandled_exception_response(request)
+
+
+def _build_app(middleware, chunks: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware)
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/export")
+    def export():
+        row = b"2024-01-01,12,8,4,66.67,153.20\n"
+
+        def rows():
+            yield b"date,operations,wins,losses,winrate,pnl\n"
+            for _ in range(chunks):
+                yield row
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return app
+
+
+async def _run(app: FastAPI, path: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    pending = iter(range(total))
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for _ in pending:
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+async def main(args) -> None:
+    apps = {
+        "BaseHTTPMiddleware": _build_app(LegacyErrorMiddleware, args.chunks),
+        "ASGI puro": _build_app(GlobalErrorMiddleware, args.chunks),
+    }
+    print(f"{args.requests} peticiones por ruta, concurrencia {args.concurrency}")
+    print(f"{'middleware':<22}{'ruta':<10}{'req/s':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for path in ("/health", "/export"):
+        for name, app in apps.items():
+            result = await _run(app, path, args.requests, args.concurrency)
+            print(
+                f"{name:<22}{path:<10}{result['rps']:>10.1f}"
+                f"{result['p50_ms']:>12.2f}{result['p99_ms']:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark del motor de proyección para horizontes de 730 días.
+
+Compara, por petición, los bucles originales en Python con las funciones de
+`app.services.projection_engine` que ahora usan el planificador, el progreso
+del objetivo, las proyecciones y la cola futura del calendario.
+
+Uso: python benchmark_projection_engine.py [repeticiones]
+"""
+
+import math
+import sys
+import timeit
+
+from app.services import projection_engine
+
+HORIZON_DAYS = 730
+CAPITAL = 1000.0
+PAYOUT = 0.85
+WINRATE = 0.60
+RISK_PERCENT = 2.0
+OPS_PER_DAY = 10
+TARGET = 1e12  # inalcanzable en el horizonte: se recorren los 730 días
+
+
+def legacy_projections():
+    capital = CAPITAL
+    for _ in range(HORIZON_DAYS):
+        for _ in range(OPS_PER_DAY):
+            amount = capital * (RISK_PERCENT / 100.0)
+            capital += amount * PAYOUT * WINRATE - amount * (1 - WINRATE)
+    return capital
+
+
+def engine_projections():
+    factor = projection_engine.daily_growth_factor(RISK_PERCENT, 1, WINRATE, PAYOUT)
+    return projection_engine.project_capital(CAPITAL, factor, HORIZON_DAYS * OPS_PER_DAY)
+
+
+def legacy_days_to_target():
+    factor = 1 + RISK_PERCENT / 100.0 * OPS_PER_DAY * (WINRATE * PAYOUT - (1 - WINRATE))
+    capital, days = CAPITAL, 0
+    while capital < 1e6 and days < 100_000:
+        capital *= factor
+        days += 1
+    return days
+
+
+def engine_days_to_target():
+    factor = projection_engine.daily_growth_factor(RISK_PERCENT, OPS_PER_DAY, WINRATE, PAYOUT)
+    return projection_engine.days_to_target(CAPITAL, 1e6, factor)
+
+
+def engine_calendar_tail():
+    expected_return = projection_engine.expected_return_per_op(WINRATE, PAYOUT)
+    return projection_engine.project_daily_plan_tail(
+        CAPITAL, RISK_PERCENT / 100.0, OPS_PER_DAY, PAYOUT, expected_return,
+        TARGET, max_days=HORIZON_DAYS,
+    )
+
+
+CASES = [
+    ("projections (días x ops)", legacy_projections, engine_projections),
+    ("días hasta la meta", legacy_days_to_target, engine_days_to_target),
+    ("cola del calendario", None, engine_calendar_tail),
+]
+
+
+def _per_call_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main(number: int = 200) -> None:
+    assert math.isclose(legacy_projections(), engine_projections(), rel_tol=1e-9)
+    assert legacy_days_to_target() == engine_days_to_target()
+
+    print(f"Horizonte: {HORIZON_DAYS} días, {number} repeticiones por caso")
+    print(f"{'caso':<28}{'bucle (µs)':>14}{'motor (µs)':>14}")
+    for name, legacy, engine in CASES:
+        legacy_us = f"{_per_call_us(legacy, number):.1f}" if legacy else "-"
+        print(f"{name:<28}{legacy_us:>14}{_per_call_us(engine, number):>14.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,29 @@
+import argparse
+
+from app.database import SessionLocal
+from app.services.daily_stats_service import rebuild_daily_stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the daily_account_stats rollup from operations."
+    )
+    parser.add_argument(
+        "--account-id",
+        type=int,
+        required=False,
+        default=None,
+        help="Rebuild only this account (default: all accounts)",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_daily_stats(db, args.account_id)
+        print(f"OK: {rebuilt} daily rows rebuilt")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
+from sqlalchemy.pool import NullPool
+from app.database import Base, get_db, get_async_db
 from app.main import app
+from app.middleware.rate_limit import reset_rate_limits
+from app.services.plan_service import invalidate_plan_catalog
 from fastapi.testclient import TestClient
 
 # ── Motor de pruebas (SQLite en memoria) ──────────────────────────────────
@@ -14,6 +18,11 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Rutas async: mismo archivo con aiosqlite. NullPool porque cada TestClient
+# corre su propio event loop y una conexión no puede pasar de uno a otro.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 # ── Fixture: sesión de DB ──────────────────────────────────────────────────
 # Se usa scope="function" para que cada test tenga DB limpia.
@@ -33,7 +42,18 @@ def test_db():
         finally:
             pass
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    # El rate-limiter es global al proceso: se limpia por test
+    reset_rate_limits()
+
+    # Igual con la caché de planes: los ids cambian entre bases de datos
+    invalidate_plan_catalog()
 
     yield db
 
@@ -43,6 +63,19 @@ def test_db():
     app.dependency_overrides.clear()
 
 
+# ── Fixture: reportes e importaciones en directorios temporales ───────────
+# Los workers (outbox de emails, RTDN de Google Play) no arrancan con la app:
+# los tests los drenan a mano.
+@pytest.fixture(autouse=True)
+def reports_dir(tmp_path, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "REPORTS_DIR", str(tmp_path / "reports"))
+    monkeypatch.setattr(settings, "IMPORTS_DIR", str(tmp_path / "imports"))
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_WORKER", False)
+    monkeypatch.setattr(settings, "GOOGLE_PLAY_RTDN_WORKER", False)
+    return tmp_path / "reports"
+
+
 # ── Fixture: cliente HTTP ──────────────────────────────────────────────────
 # Depende de test_db para garantizar que el override ya está activo
 # cuando el cliente hace las peticiones.
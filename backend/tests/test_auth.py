@@ -27,4 +27,65 @@ def test_login_success(client):
         "password": "Test1234"
     })
     assert response.status_code == 200
-    assert "access_token" in response.json()
\ No newline at end of file
+    assert "access_token" in response.json()
+
+def _register(client):
+    return client.post("/auth/register", json={
+        "email": "test@example.com",
+        "password": "Test1234"
+    }).json()
+
+
+def test_access_token_carries_claims(client):
+    from app.utils.security import decode_access_token
+
+    tokens = _register(client)
+    payload = decode_access_token(tokens["access_token"])
+    assert payload["type"] == "access"
+    assert payload["sub"] == "test@example.com"
+    assert payload["uid"] is not None
+    # Rol, bloqueo y plan se leen de la DB, no del token
+    assert not {"adm", "blk", "plan"} & payload.keys()
+    assert decode_access_token(tokens["refresh_token"])["type"] == "refresh"
+
+
+def test_refresh_token_issues_new_pair(client):
+    tokens = _register(client)
+
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    assert "access_token" in response.json()
+
+    # Un access token no sirve para refrescar, ni un refresh token para autenticar
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == 401
+    response = client.get("/sessions", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == 401
+
+
+def test_read_endpoint_trusts_uid_claim(client, test_db):
+    from sqlalchemy import event
+    from app.utils.security import create_access_token
+
+    tokens = _register(client)
+    legacy = create_access_token({"sub": "test@example.com"})  # token sin uid
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        assert client.get("/account", headers=headers).status_code in (200, 404)
+        trusted = [s for s in statements if "FROM users" in s]
+
+        statements.clear()
+        assert client.get("/account", headers={"Authorization": f"Bearer {legacy}"}).status_code in (200, 404)
+        checked = [s for s in statements if "FROM users" in s]
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert trusted == []
+    assert len(checked) == 1
@@ -0,0 +1,118 @@
+import datetime as dt
+
+import pytest
+
+from app.models.user import User
+from app.models.account import Account
+from app.models.daily_account_stats import DailyAccountStats
+from app.models.trading_day import TradingDay
+from app.models.trading_session import TradingSession
+from app.models.operation import Operation, OperationResult
+from app.services import daily_stats_service, reports_service
+
+
+TODAY = dt.date.today()
+PROFITS = {"WIN": 17.0, "LOSS": -20.0, "DRAW": 0.0}
+
+
+@pytest.fixture
+def account(test_db):
+    user = User(email="stats@example.com", hashed_password="x")
+    test_db.add(user)
+    test_db.commit()
+
+    account = Account(user_id=user.id, capital=1000.0, payout=0.85)
+    test_db.add(account)
+    test_db.commit()
+    return account
+
+
+def _add_session(db, account_id, day, results):
+    trading_day = db.query(TradingDay).filter(
+        TradingDay.account_id == account_id,
+        TradingDay.date == day,
+    ).first()
+    if not trading_day:
+        trading_day = TradingDay(account_id=account_id, date=day, start_capital=1000.0)
+        db.add(trading_day)
+        db.commit()
+
+    session_number = db.query(TradingSession).filter(
+        TradingSession.trading_day_id == trading_day.id
+    ).count() + 1
+    session = TradingSession(trading_day_id=trading_day.id, session_number=session_number)
+    db.add(session)
+    db.commit()
+
+    for index, result in enumerate(results):
+        db.add(Operation(
+            session_id=session.id,
+            result=OperationResult(result),
+            risk_percent=2,
+            amount=20.0,
+            profit=PROFITS[result],
+        ))
+        daily_stats_service.record_operation(
+            db, account_id, day, OperationResult(result), PROFITS[result], first_in_session=index == 0
+        )
+    db.commit()
+
+
+def _rollup(db, account_id):
+    db.expire_all()
+    rows = db.query(DailyAccountStats).filter(
+        DailyAccountStats.account_id == account_id
+    ).order_by(DailyAccountStats.date).all()
+    return [
+        (
+            r.date, r.ops, r.wins, r.losses, r.draws,
+            r.realized_pnl, r.gross_profit, r.gross_loss, r.sessions_with_ops,
+        )
+        for r in rows
+    ]
+
+
+def test_record_operation_accumulates_day(test_db, account):
+    _add_session(test_db, account.id, TODAY, ["WIN", "LOSS", "DRAW"])
+    _add_session(test_db, account.id, TODAY, ["WIN", "WIN"])
+
+    assert _rollup(test_db, account.id) == [
+        (TODAY, 5, 3, 1, 1, 31.0, 51.0, 20.0, 2),
+    ]
+
+
+def test_rebuild_matches_incremental_rollup(test_db, account):
+    yesterday = TODAY - dt.timedelta(days=1)
+    _add_session(test_db, account.id, yesterday, ["LOSS", "LOSS"])
+    _add_session(test_db, account.id, TODAY, ["WIN", "DRAW", "LOSS"])
+    _add_session(test_db, account.id, TODAY, ["WIN"])
+    incremental = _rollup(test_db, account.id)
+
+    assert daily_stats_service.rebuild_daily_stats(test_db, account.id) == 2
+    assert _rollup(test_db, account.id) == incremental
+
+
+def test_winrate_since_reads_rollup(test_db, account):
+    assert daily_stats_service.get_winrate_since(test_db, account.id, TODAY) is None
+
+    _add_session(test_db, account.id, TODAY - dt.timedelta(days=3), ["LOSS", "LOSS"])
+    _add_session(test_db, account.id, TODAY, ["WIN", "WIN", "LOSS", "DRAW"])
+
+    assert daily_stats_service.get_winrate_since(test_db, account.id, TODAY) == 0.5
+    assert daily_stats_service.get_winrate_since(
+        test_db, account.id, TODAY - dt.timedelta(days=7)
+    ) == pytest.approx(2 / 6)
+
+
+def test_reports_use_rollup_and_keep_days_without_operations(test_db, account):
+    test_db.add(TradingDay(account_id=account.id, date=TODAY - dt.timedelta(days=1), start_capital=1000.0))
+    test_db.commit()
+    _add_session(test_db, account.id, TODAY, ["WIN", "LOSS", "WIN"])
+
+    report = reports_service.get_reports(test_db, account.user_id, 7)
+
+    assert [m.operations for m in report.metrics] == [0, 3]
+    assert report.metrics[1].profit == 34.0
+    assert report.metrics[1].loss == 20.0
+    assert report.total_operations == 3
+    assert report.winrate == pytest.approx(200 / 3)
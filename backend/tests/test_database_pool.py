@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool
+
+import app.main
+from app import database
+from app.database import MeteredQueuePool, pool_status
+
+
+def _metered_engine(**options):
+    options = {"pool_size": 2, "max_overflow": 1, **options}
+    return create_engine("sqlite:///./test.db", poolclass=MeteredQueuePool, **options)
+
+
+def test_engine_options_from_settings(monkeypatch):
+    url = "postgresql+asyncpg://user:pass@db/app"
+    monkeypatch.setattr(database.settings, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(database.settings, "DB_MAX_OVERFLOW", 5)
+
+    options = database._engine_options(url, is_async=True)
+    assert options["poolclass"] is database.MeteredAsyncQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (20, 5)
+    assert options["pool_pre_ping"] is True
+    assert "connect_args" not in options
+
+
+def test_pgbouncer_mode_disables_prepared_statements(monkeypatch):
+    monkeypatch.setattr(database.settings, "DB_PGBOUNCER_MODE", True)
+    monkeypatch.setattr(database.settings, "DB_USE_NULL_POOL", True)
+
+    options = database._engine_options("postgresql+asyncpg://user:pass@db/app", is_async=True)
+    assert options["poolclass"] is NullPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+    assert "pool_size" not in options
+
+
+def test_pool_status_tracks_checkouts():
+    engine = _metered_engine()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        status = pool_status(engine.pool)
+        assert status["checked_out"] == 1
+
+    status = pool_status(engine.pool)
+    assert status["checked_out"] == 0
+    assert status["size"] == 2 and status["max_overflow"] == 1
+    assert status["checkouts"] == 1 and status["timeouts"] == 0
+    engine.dispose()
+
+
+def test_each_pool_keeps_its_own_counters():
+    first, second = _metered_engine(), _metered_engine()
+    with first.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert pool_status(first.pool)["checkouts"] == 1
+    assert pool_status(second.pool)["checkouts"] == 0
+    first.dispose()
+    assert pool_status(first.pool)["checkouts"] == 1  # dispose() conserva los contadores
+    first.dispose()
+    second.dispose()
+
+
+def test_only_pool_timeouts_count_as_timeouts():
+    engine = _metered_engine(pool_size=1, max_overflow=0, pool_timeout=0.05)
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    broken = create_engine("sqlite:///./test.db", poolclass=MeteredQueuePool, creator=_refuse)
+    with pytest.raises(OSError):
+        broken.connect()
+
+    assert pool_status(engine.pool)["timeouts"] == 1
+    assert pool_status(broken.pool)["timeouts"] == 0
+    engine.dispose()
+    broken.dispose()
+
+
+def _refuse():
+    raise OSError("connection refused")
+
+
+def test_health_db_reports_pools(client, monkeypatch):
+    engine = _metered_engine()
+    monkeypatch.setattr(app.main, "engine", engine)
+
+    response = client.get("/health/db")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert body["pools"]["sync"]["pool"] == "MeteredQueuePool"
+    assert "async" in body["pools"]
+    engine.dispose()
@@ -0,0 +1,141 @@
+import socket
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.config import settings
+from app.models.email_outbox import EmailOutbox
+from app.models.user import User
+from app.services import email_outbox_service
+from app.services.email_service import enqueue_email
+from tests.conftest import TestingSessionLocal
+
+
+class RecordingHandler:
+    """SMTP local: guarda los mensajes y la sesión por la que llegaron."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+        self.replies = []  # respuestas forzadas para los próximos DATA
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        if self.replies:
+            return self.replies.pop(0)
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setattr(settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "SMTP_PORT", port)
+    monkeypatch.setattr(settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(settings, "SMTP_USER", "noreply@example.com")
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def sender():
+    smtp_sender = email_outbox_service.SmtpSender()
+    yield smtp_sender
+    smtp_sender.close()
+
+
+def test_register_queues_email_in_same_transaction(client, test_db, smtp_server, sender):
+    response = client.post("/auth/register", json={"email": "test@example.com", "password": "Test1234"})
+    assert response.status_code == 200
+
+    # Nada se envía dentro de la petición
+    assert smtp_server.messages == []
+    queued = test_db.query(EmailOutbox).one()
+    assert queued.to_email == "test@example.com" and queued.status == "pending"
+    assert client.get("/health/email").json()["pending"] == 1
+
+    assert email_outbox_service.drain_outbox(test_db, sender) == 1
+
+    user = test_db.query(User).one()
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.messages[0].rcpt_tos == ["test@example.com"]
+    assert user.email_verification_token in smtp_server.messages[0].content.decode()
+    test_db.refresh(queued)
+    assert queued.status == "sent" and queued.sent_at is not None
+    assert client.get("/health/email").json() == {"pending": 0, "due": 0, "failed": 0, "oldest_pending_sec": 0.0}
+
+
+def test_batches_reuse_one_smtp_connection(test_db, smtp_server, sender):
+    for i in range(5):
+        enqueue_email(test_db, f"user{i}@example.com", "Hello", "<p>hi</p>")
+    test_db.commit()
+
+    assert email_outbox_service.drain_outbox(test_db, sender, limit=3) == 3
+    assert email_outbox_service.drain_outbox(test_db, sender, limit=3) == 2
+
+    assert [m.rcpt_tos[0] for m in smtp_server.messages] == [f"user{i}@example.com" for i in range(5)]
+    assert len(smtp_server.sessions) == 1
+
+
+def test_temporary_failure_backs_off_and_permanent_failure_gives_up(test_db, smtp_server, sender):
+    retry = enqueue_email(test_db, "retry@example.com", "Hello", "<p>hi</p>")
+    bounce = enqueue_email(test_db, "bounce@example.com", "Hello", "<p>hi</p>")
+    test_db.commit()
+    smtp_server.replies = ["451 Try again later", "550 No such user"]
+
+    assert email_outbox_service.drain_outbox(test_db, sender) == 2
+
+    test_db.refresh(retry)
+    test_db.refresh(bounce)
+    assert (retry.status, retry.attempts) == ("pending", 1)
+    assert "451" in retry.last_error
+    assert retry.next_attempt_at > datetime.utcnow() + timedelta(seconds=settings.EMAIL_OUTBOX_BACKOFF_BASE_SEC - 5)
+    assert (bounce.status, bounce.attempts) == ("failed", 1)
+
+    # Todavía no vence: no se reintenta
+    assert email_outbox_service.drain_outbox(test_db, sender) == 0
+
+    retry.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    test_db.commit()
+    assert email_outbox_service.drain_outbox(test_db, sender) == 1
+    test_db.refresh(retry)
+    assert (retry.status, retry.attempts, retry.last_error) == ("sent", 2, None)
+    assert [m.rcpt_tos[0] for m in smtp_server.messages] == ["retry@example.com"]
+
+
+def test_unreachable_smtp_reschedules_without_losing_emails(test_db, smtp_server, sender, monkeypatch):
+    for i in range(3):
+        enqueue_email(test_db, f"user{i}@example.com", "Hello", "<p>hi</p>")
+    test_db.commit()
+    monkeypatch.setattr(settings, "SMTP_PORT", 1)
+
+    assert email_outbox_service.drain_outbox(test_db, sender) == 1
+
+    attempts = [email.attempts for email in test_db.query(EmailOutbox).order_by(EmailOutbox.id)]
+    assert attempts == [1, 0, 0]
+    assert test_db.query(EmailOutbox).filter(EmailOutbox.status == "pending").count() == 3
+
+
+def test_worker_sends_after_register(client, test_db, smtp_server, monkeypatch):
+    monkeypatch.setattr(email_outbox_service, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_WORKER", True)
+    email_outbox_service.start_worker()
+    try:
+        client.post("/auth/register", json={"email": "test@example.com", "password": "Test1234"})
+
+        deadline = time.monotonic() + 10
+        while not smtp_server.messages and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        email_outbox_service.stop_worker()
+
+    assert len(smtp_server.messages) == 1
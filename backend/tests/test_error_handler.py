@@ -0,0 +1,58 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.error_handler import GlobalErrorMiddleware
+
+
+@pytest.fixture
+def error_client():
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def raise_http(request, call_next):
+        # HTTPException lanzada fuera del router (no la atrapa ExceptionMiddleware)
+        if request.url.path == "/limited":
+            raise HTTPException(status_code=429, detail={"error": "rate_limit_exceeded"},
+                                headers={"Retry-After": "3"})
+        return await call_next(request)
+
+    app.add_middleware(GlobalErrorMiddleware)
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("secret internals")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"{i}\n".encode() for i in range(3)), media_type="text/csv")
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_unhandled_exception_returns_json_500(error_client):
+    response = error_client.get("/boom")
+
+    assert response.status_code == 500
+    body = response.json()
+    assert body["error"] == "internal_server_error"
+    assert body["path"] == "/boom"
+    assert "timestamp" in body
+    assert "secret internals" not in response.text
+
+
+def test_http_exception_keeps_detail_and_headers(error_client):
+    response = error_client.get("/limited")
+
+    assert response.status_code == 429
+    assert response.json()["error"] == "rate_limit_exceeded"
+    assert response.json()["path"] == "/limited"
+    assert response.headers["Retry-After"] == "3"
+
+
+def test_streaming_passes_through(error_client):
+    response = error_client.get("/stream")
+
+    assert response.status_code == 200
+    assert response.text == "0\n1\n2\n"
@@ -0,0 +1,248 @@
+import datetime as dt
+
+import pytest
+from sqlalchemy import event
+
+from app.models.user import User
+from app.models.account import Account
+from app.models.goal import Goal, GoalStatus
+from app.models.goal_daily_plan import GoalDailyPlan, DailyPlanStatus
+from app.models.trading_day import TradingDay
+from app.models.trading_session import TradingSession
+from app.models.operation import Operation, OperationResult
+from app.schemas.daily_plan import DailyPlanCloseRequest
+from app.services import daily_plan_service, daily_stats_service
+
+
+START = dt.date(2026, 3, 1)
+
+
+# ── Reloj controlado: daily_plan_service usa date.today() ─────────────────
+class _Clock:
+    today_value = START
+
+
+class _FakeDate(dt.date):
+    @classmethod
+    def today(cls):
+        return _Clock.today_value
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(daily_plan_service, "date", _FakeDate)
+    _Clock.today_value = START
+    return _Clock
+
+
+@pytest.fixture
+def goal(test_db, clock):
+    user = User(email="calendar@example.com", hashed_password="x")
+    test_db.add(user)
+    test_db.commit()
+
+    account = Account(user_id=user.id, capital=1000.0, payout=0.85)
+    test_db.add(account)
+    test_db.commit()
+
+    goal = Goal(
+        account_id=account.id,
+        target_capital=1500.0,
+        start_capital_snapshot=1000.0,
+        start_date=START,
+        payout_snapshot=0.85,
+        risk_percent=2,
+        sessions_per_day=2,
+        ops_per_session=5,
+        winrate_estimate=0.60,
+        status=GoalStatus.ACTIVE,
+    )
+    test_db.add(goal)
+    test_db.commit()
+    return goal
+
+
+def _add_operations(db, account_id, day, results):
+    trading_day = db.query(TradingDay).filter(
+        TradingDay.account_id == account_id,
+        TradingDay.date == day,
+    ).first()
+    if not trading_day:
+        trading_day = TradingDay(account_id=account_id, date=day, start_capital=1000.0)
+        db.add(trading_day)
+        db.commit()
+
+    session_number = db.query(TradingSession).filter(
+        TradingSession.trading_day_id == trading_day.id
+    ).count() + 1
+    session = TradingSession(trading_day_id=trading_day.id, session_number=session_number)
+    db.add(session)
+    db.commit()
+
+    for index, result in enumerate(results):
+        profit = {"WIN": 17.0, "LOSS": -20.0, "DRAW": 0.0}[result]
+        db.add(Operation(
+            session_id=session.id,
+            result=OperationResult(result),
+            risk_percent=2,
+            amount=20.0,
+            profit=profit,
+        ))
+        daily_stats_service.record_operation(
+            db, account_id, day, OperationResult(result), profit, first_in_session=index == 0
+        )
+    db.commit()
+
+
+def _snapshot(db, goal_id):
+    db.expire_all()
+    plans = db.query(GoalDailyPlan).filter(
+        GoalDailyPlan.goal_id == goal_id
+    ).order_by(GoalDailyPlan.date).all()
+    return [
+        (
+            p.date, p.capital_start_of_day, p.planned_sessions, p.planned_ops_total,
+            p.planned_stake, p.expected_win_profit, p.expected_loss,
+            p.actual_sessions, p.actual_ops, p.wins, p.losses, p.draws,
+            p.realized_pnl, p.status,
+        )
+        for p in plans
+    ]
+
+
+def _assert_matches_full_rebuild(db, goal_id):
+    incremental = _snapshot(db, goal_id)
+    daily_plan_service.regenerate_goal_calendar(db, goal_id)
+    assert incremental == _snapshot(db, goal_id)
+
+
+def test_refresh_same_day_matches_full_rebuild(test_db, goal, clock):
+    daily_plan_service.regenerate_goal_calendar(test_db, goal.id)
+
+    _add_operations(test_db, goal.account_id, START, ["WIN", "LOSS", "WIN"])
+    daily_plan_service.refresh_goal_calendar(test_db, goal.id, START)
+
+    _assert_matches_full_rebuild(test_db, goal.id)
+
+
+def test_refresh_after_days_pass_matches_full_rebuild(test_db, goal, clock):
+    daily_plan_service.regenerate_goal_calendar(test_db, goal.id)
+
+    # Pasan varios días sin regenerar: los días proyectados pasan a ser reales.
+    clock.today_value = START + dt.timedelta(days=5)
+    _add_operations(test_db, goal.account_id, clock.today_value, ["LOSS", "LOSS"])
+    daily_plan_service.refresh_goal_calendar(test_db, goal.id, clock.today_value)
+
+    _assert_matches_full_rebuild(test_db, goal.id)
+
+
+def test_refresh_with_manual_close_matches_full_rebuild(test_db, goal, clock):
+    clock.today_value = START + dt.timedelta(days=3)
+    _add_operations(test_db, goal.account_id, START + dt.timedelta(days=1), ["WIN"] * 4)
+    daily_plan_service.regenerate_goal_calendar(test_db, goal.id)
+
+    daily_plan_service.close_goal_day(
+        test_db,
+        user_id=goal.account.user_id,
+        goal_id=goal.id,
+        close_data=DailyPlanCloseRequest.model_construct(
+            date=START + dt.timedelta(days=2),
+            blocked_reason="manual",
+            realized_pnl=-35.0,
+        ),
+    )
+
+    _assert_matches_full_rebuild(test_db, goal.id)
+
+
+def test_refresh_reaching_target_trims_tail_like_full_rebuild(test_db, goal, clock):
+    daily_plan_service.regenerate_goal_calendar(test_db, goal.id)
+    long_calendar = len(_snapshot(test_db, goal.id))
+
+    _add_operations(test_db, goal.account_id, START, ["WIN"] * 10)
+    test_db.query(Operation).update({Operation.profit: 45.0})
+    test_db.commit()
+    daily_plan_service.refresh_goal_calendar(test_db, goal.id, START)
+
+    assert len(_snapshot(test_db, goal.id)) < long_calendar
+    _assert_matches_full_rebuild(test_db, goal.id)
+
+
+def test_refresh_only_updates_rows_from_changed_date(test_db, goal, clock):
+    clock.today_value = START + dt.timedelta(days=4)
+    _add_operations(test_db, goal.account_id, START + dt.timedelta(days=1), ["WIN", "DRAW"])
+    daily_plan_service.regenerate_goal_calendar(test_db, goal.id)
+
+    plan_dates = {
+        p.id: p.date
+        for p in test_db.query(GoalDailyPlan).filter(GoalDailyPlan.goal_id == goal.id)
+    }
+    updated_ids = []
+
+    def _collect(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE goal_daily_plans"):
+            rows = parameters if executemany else [parameters]
+            updated_ids.extend(row[-1] for row in rows)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", _collect)
+    try:
+        _add_operations(test_db, goal.account_id, clock.today_value, ["WIN"])
+        daily_plan_service.refresh_goal_calendar(test_db, goal.id, clock.today_value)
+    finally:
+        event.remove(engine, "before_cursor_execute", _collect)
+
+    assert updated_ids
+    assert all(plan_dates[plan_id] >= clock.today_value for plan_id in updated_ids)
+    _assert_matches_full_rebuild(test_db, goal.id)
+
+
+def test_refresh_without_marker_falls_back_to_full_rebuild(test_db, goal, clock):
+    assert goal.calendar_generated_on is None
+
+    daily_plan_service.refresh_goal_calendar(test_db, goal.id, START)
+
+    test_db.refresh(goal)
+    assert goal.calendar_generated_on == START
+    first_plan = test_db.query(GoalDailyPlan).filter(
+        GoalDailyPlan.goal_id == goal.id
+    ).order_by(GoalDailyPlan.date).first()
+    assert first_plan.date == START
+    assert first_plan.status == DailyPlanStatus.PLANNED
+    _assert_matches_full_rebuild(test_db, goal.id)
+
+
+def test_get_calendar_does_not_write_when_fresh(test_db, goal, clock):
+    _add_operations(test_db, goal.account_id, START, ["WIN", "LOSS"])
+    daily_plan_service.regenerate_goal_calendar(test_db, goal.id)
+
+    writes = []
+
+    def _collect(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(("UPDATE", "INSERT", "DELETE")):
+            writes.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", _collect)
+    try:
+        calendar = daily_plan_service.get_calendar(test_db, goal.account.user_id, goal.id)
+    finally:
+        event.remove(engine, "before_cursor_execute", _collect)
+
+    assert writes == []
+    assert calendar.total_days == len(_snapshot(test_db, goal.id))
+    assert calendar.total_wins == 1
+    assert calendar.total_losses == 1
+    assert calendar.real_winrate == 0.5
+    assert calendar.total_pnl == -3.0
+
+
+def test_get_calendar_regenerates_when_day_changed(test_db, goal, clock):
+    daily_plan_service.regenerate_goal_calendar(test_db, goal.id)
+
+    clock.today_value = START + dt.timedelta(days=2)
+    daily_plan_service.get_calendar(test_db, goal.account.user_id, goal.id)
+
+    test_db.refresh(goal)
+    assert goal.calendar_generated_on == clock.today_value
+    _assert_matches_full_rebuild(test_db, goal.id)
@@ -82,4 +82,36 @@ def test_payout_warning(client):
     assert response.status_code == 200
     data = response.json()
     assert data["blocked_recommended"] == True
-    assert len(data["warnings"]) > 0
\ No newline at end of file
+    assert len(data["warnings"]) > 0
+
+def test_simulate_plan_success(client):
+    """Test: Simulación Monte Carlo reproducible con semilla"""
+    token = create_user_with_account(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    client.post("/goal-planner/goal", json={
+        "target_capital": 2000.0
+    }, headers=headers)
+    
+    payload = {
+        "sessions_per_day": 2,
+        "ops_per_session": 5,
+        "risk_percent": 2,
+        "winrate": 0.60,
+        "days": 60,
+        "paths": 500,
+        "seed": 42
+    }
+    response = client.post("/goal-planner/simulate", json=payload, headers=headers)
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["paths"] == 500
+    assert data["target_capital"] == 2000.0
+    assert len(data["capital_bands"]) == 61
+    assert data["capital_bands"][0]["p50"] == 1000.0
+    assert 0.0 <= data["probability_hit_target"] <= 1.0
+    assert 0.0 <= data["risk_of_ruin"] <= 1.0
+    
+    repeated = client.post("/goal-planner/simulate", json=payload, headers=headers)
+    assert repeated.json() == data
@@ -5,6 +5,7 @@ from app.models.user import User
 from app.models.account import Account
 from app.models.goal import Goal, GoalStatus
 from app.models.goal_daily_plan import GoalDailyPlan, DailyPlanStatus
+from app.models.plan import Plan
 
 
 # ── Fixture compartida: usuario + cuenta + token ──────────────────────────
@@ -19,6 +20,11 @@ def auth_data(test_db, client):
         email="testgoals@example.com",
         hashed_password=hashed
     )
+    # Plan FREE (sembrado por las migraciones): los límites por plan lo necesitan
+    test_db.add(Plan(
+        name="FREE", display_name_es="Gratis", display_name_en="Free",
+        price_usd=0.0, features={"max_active_goals": 1}, is_active=True,
+    ))
     test_db.add(user)
     test_db.commit()
     test_db.refresh(user)
@@ -141,6 +147,52 @@ def test_get_goal_progress(client, auth_data):
     assert data["progress_percent"] >= 0
 
 
+# ── 3b. Progreso con ventanas móviles de winrate ─────────────────────────
+def test_get_goal_progress_with_windows(client, test_db, auth_data):
+    from datetime import timedelta
+    from app.models.daily_account_stats import DailyAccountStats
+
+    create_resp = client.post(
+        "/goals/",
+        headers=_headers(auth_data["token"]),
+        json={
+            "target_capital": 2000.0,
+            "risk_percent": 2,
+            "sessions_per_day": 2,
+            "ops_per_session": 5,
+            "winrate_estimate": 0.60
+        }
+    )
+    goal_id = create_resp.json()["id"]
+
+    account_id = auth_data["account"].id
+    test_db.add_all([
+        DailyAccountStats(account_id=account_id, date=date.today(), ops=4, wins=3,
+                          losses=1, realized_pnl=31.0),
+        DailyAccountStats(account_id=account_id, date=date.today() - timedelta(days=20), ops=4,
+                          wins=1, losses=3, realized_pnl=-43.0),
+    ])
+    test_db.commit()
+
+    response = client.get(
+        f"/goals/{goal_id}/progress?windows=true",
+        headers=_headers(auth_data["token"])
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    # El objetivo empieza hoy: solo cuenta el día de hoy
+    assert data["real_winrate"] == 0.75
+    assert data["realized_pnl"] == 31.0
+    windows = {w["days"]: w for w in data["winrate_windows"]}
+    assert windows[7]["operations"] == 4
+    assert windows[30]["winrate"] == 0.5
+    assert windows[90]["realized_pnl"] == -12.0
+
+    plain = client.get(f"/goals/{goal_id}/progress", headers=_headers(auth_data["token"]))
+    assert plain.json()["winrate_windows"] is None
+
+
 # ── 4. Crear retiro ────────────────────────────────────────────────────────
 def test_create_withdrawal(client, auth_data):
     response = client.post(
@@ -242,6 +294,54 @@ def test_goal_calendar(client, test_db, auth_data):
     assert len(data["daily_plans"]) >= 1
 
 
+# ── 6b. Calendario GET con ETag / 304 ─────────────────────────────────────
+def test_goal_calendar_etag_not_modified(client, auth_data):
+    create_resp = client.post(
+        "/goals/",
+        headers=_headers(auth_data["token"]),
+        json={
+            "target_capital": 2000.0,
+            "risk_percent": 2,
+            "sessions_per_day": 2,
+            "ops_per_session": 5,
+            "winrate_estimate": 0.60
+        }
+    )
+    goal_id = create_resp.json()["id"]
+
+    first = client.get(
+        f"/goals/{goal_id}/calendar",
+        headers=_headers(auth_data["token"]),
+        params={"days": 30}
+    )
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert len(first.json()["daily_plans"]) >= 1
+
+    # Mismo calendario → 304 sin cuerpo
+    second = client.get(
+        f"/goals/{goal_id}/calendar",
+        headers={**_headers(auth_data["token"]), "If-None-Match": etag},
+        params={"days": 30}
+    )
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+
+    # Un cambio de configuración regenera el calendario → nuevo ETag
+    client.put(
+        f"/goals/{goal_id}",
+        headers=_headers(auth_data["token"]),
+        json={"risk_percent": 3}
+    )
+    third = client.get(
+        f"/goals/{goal_id}/calendar",
+        headers={**_headers(auth_data["token"]), "If-None-Match": etag},
+        params={"days": 30}
+    )
+    assert third.status_code == 200
+    assert third.headers["etag"] != etag
+
+
 # ── 7. Retiro con capital insuficiente ────────────────────────────────────
 def test_insufficient_capital_withdrawal(client, auth_data):
     response = client.post(
@@ -288,6 +388,56 @@ def test_csv_report_generation(client, test_db, auth_data):
     assert "Date" in response.text
 
 
+# ── 8b. CSV en streaming: secciones y gzip ────────────────────────────────
+def test_csv_report_streams_sections_gzipped(client, test_db, auth_data, monkeypatch):
+    from datetime import datetime
+    from app.models.operation import Operation, OperationResult
+    from app.models.trading_day import TradingDay
+    from app.models.trading_session import TradingSession
+    from app.models.withdrawal import Withdrawal
+    from app.services import report_generator_service
+
+    account = auth_data["account"]
+    goal = Goal(
+        account_id=account.id,
+        target_capital=2000.0,
+        start_capital_snapshot=1000.0,
+        start_date=date.today(),
+        status=GoalStatus.ACTIVE
+    )
+    day = TradingDay(account_id=account.id, date=date.today(), start_capital=1000.0)
+    test_db.add_all([goal, day])
+    test_db.flush()
+    session = TradingSession(trading_day_id=day.id, session_number=1)
+    test_db.add(session)
+    test_db.flush()
+    test_db.add_all([
+        Operation(session_id=session.id, result=OperationResult.WIN, risk_percent=2,
+                  amount=20.0, profit=17.0, comment="breakout"),
+        Withdrawal(account_id=account.id, goal_id=goal.id, amount=50.0,
+                   withdrawn_at=datetime.utcnow(), capital_before=1000.0, capital_after=950.0),
+    ])
+    test_db.commit()
+
+    # Chunks pequeños para forzar varios trozos en el stream
+    monkeypatch.setattr(report_generator_service, "CSV_CHUNK_BYTES", 16)
+
+    response = client.get(
+        f"/reports/goals/{goal.id}/csv",
+        headers={**_headers(auth_data["token"]), "Accept-Encoding": "gzip"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    lines = response.text.splitlines()
+    assert lines[0].startswith("Date,Capital Start")
+    operations = lines.index("Operations")
+    withdrawals = lines.index("Withdrawals")
+    assert lines[operations + 1].startswith("Date,Session,Time,Result")
+    assert lines[operations + 2].endswith(",WIN,2,20.0,17.0,breakout")
+    assert lines[withdrawals + 2].endswith(",50.0,1000.0,950.0,")
+
+
 # ── 9. Actualizar objetivo (pause/resume) ─────────────────────────────────
 def test_update_goal_status(client, auth_data):
     # Crear objetivo
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import bcrypt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.config import settings
+from app.models.google_play_purchase import GooglePlayPurchase
+from app.models.plan import Plan
+from app.models.user import User
+from app.services import google_play_service
+
+SUBSCRIPTION_PATH = re.compile(
+    r"^/androidpublisher/v3/applications/(?P<package>[^/]+)/purchases/subscriptions/"
+    r"(?P<product>[^/]+)/tokens/(?P<token>[^/:]+)(?P<ack>:acknowledge)?$"
+)
+
+
+class PublisherStub:
+    """Stub local del token endpoint de OAuth y de la Android Publisher API."""
+
+    def __init__(self):
+        self.hits = {"token": 0, "get": 0, "acknowledge": 0}
+        self.issued = 0
+        self.rejected_tokens = set()
+        self.lock = threading.Lock()
+
+    def handle(self, handler: BaseHTTPRequestHandler, method: str):
+        if method == "POST" and handler.path == "/token":
+            handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+            with self.lock:
+                self.hits["token"] += 1
+                self.issued += 1
+                body = {"access_token": f"tok-{self.issued}", "expires_in": 3600, "token_type": "Bearer"}
+            return self._reply(handler, 200, body)
+
+        match = SUBSCRIPTION_PATH.match(handler.path.split("?")[0])
+        token = handler.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not match or not token.startswith("tok-") or token in self.rejected_tokens:
+            return self._reply(handler, 401, {"error": {"code": 401}})
+
+        if method == "POST" and match["ack"]:
+            handler.rfile.read(int(handler.headers.get("Content-Length", 0)))
+            with self.lock:
+                self.hits["acknowledge"] += 1
+            return self._reply(handler, 200, {})
+
+        with self.lock:
+            self.hits["get"] += 1
+        return self._reply(handler, 200, {
+            "startTimeMillis": "1700000000000", "expiryTimeMillis": "4102444800000",
+            "autoRenewing": True, "paymentState": 1, "acknowledgementState": 0,
+            "orderId": f"GPA.{match['token']}",
+        })
+
+    @staticmethod
+    def _reply(handler, status_code, body):
+        payload = json.dumps(body).encode()
+        handler.send_response(status_code)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+
+@pytest.fixture
+def publisher(monkeypatch):
+    stub = PublisherStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            stub.handle(self, "GET")
+
+        def do_POST(self):
+            stub.handle(self, "POST")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    monkeypatch.setattr(settings, "GOOGLE_PLAY_SERVICE_ACCOUNT_JSON", json.dumps({
+        "type": "service_account", "project_id": "test", "private_key_id": "key-1",
+        "private_key": private_key, "client_email": "billing@test.iam.gserviceaccount.com",
+        "client_id": "1", "token_uri": f"{base}/token",
+    }))
+    monkeypatch.setattr(settings, "GOOGLE_PLAY_API_URL", f"{base}/")
+    monkeypatch.setattr(settings, "GOOGLE_PLAY_PACKAGE_NAME", "com.example.capital")
+    google_play_service.reset_google_play_client()
+    yield stub
+    google_play_service.reset_google_play_client()
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_is_built_once_and_token_reused(publisher):
+    service = google_play_service.get_google_play_service()
+    assert google_play_service.get_google_play_service() is service
+
+    for token in ("a", "b", "c"):
+        result = google_play_service.fetch_subscription("com.example.capital", "basic_monthly", token)
+        assert result["orderId"] == f"GPA.{token}"
+
+    assert publisher.hits == {"token": 1, "get": 3, "acknowledge": 0}
+
+
+def test_client_is_shared_across_threads(publisher):
+    google_play_service.fetch_subscription("com.example.capital", "basic_monthly", "warmup")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(
+            lambda i: google_play_service.fetch_subscription("com.example.capital", "pro_monthly", f"t{i}"),
+            range(32),
+        ))
+
+    assert [r["orderId"] for r in results] == [f"GPA.t{i}" for i in range(32)]
+    assert publisher.hits["token"] == 1  # las credenciales compartidas ya tenían token
+
+
+def test_async_fetch_refreshes_token_once_on_401(publisher):
+    async def run():
+        first = await google_play_service.fetch_subscription_async("com.example.capital", "basic_monthly", "x")
+        publisher.rejected_tokens.add("tok-1")  # revocado en Google
+        second = await google_play_service.fetch_subscription_async("com.example.capital", "basic_monthly", "y")
+        await google_play_service.close_async_client()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert (first["orderId"], second["orderId"]) == ("GPA.x", "GPA.y")
+    assert publisher.hits["token"] == 2
+
+
+def test_verify_route_records_and_acknowledges_purchase(client, test_db, publisher):
+    for name, price in (("FREE", 0.0), ("BASIC", 9.99)):
+        test_db.add(Plan(name=name, display_name_es=name, display_name_en=name,
+                         price_usd=price, features={}, is_active=True))
+    test_db.add(User(email="buyer@example.com", hashed_password=bcrypt.hashpw(b"Test1234", bcrypt.gensalt()).decode()))
+    test_db.commit()
+    token = client.post("/auth/login", json={"email": "buyer@example.com", "password": "Test1234"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post("/billing/verify", json={"purchase_token": "p1", "product_id": "basic_monthly"}, headers=headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["status"], body["plan"], body["auto_renewing"]) == ("verified", "BASIC", True)
+    assert publisher.hits == {"token": 1, "get": 1, "acknowledge": 1}
+    purchase = test_db.query(GooglePlayPurchase).one()
+    assert purchase.order_id == "GPA.p1" and purchase.subscription_id is not None
+
+    again = client.post("/billing/verify", json={"purchase_token": "p1", "product_id": "basic_monthly"}, headers=headers)
+    assert again.json()["status"] == "already_verified"
+    assert publisher.hits["get"] == 1
@@ -0,0 +1,178 @@
+import base64
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.models.google_play_notification import GooglePlayNotification
+from app.models.google_play_purchase import GooglePlayPurchase
+from app.models.plan import Plan
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.services import google_play_service, google_play_webhook_service
+from tests.conftest import TestingSessionLocal
+
+NEW_EXPIRY = 4102444800000
+
+
+def _push(message_id: str, notification_type: int, token: str = "tok-1") -> dict:
+    data = {
+        "version": "1.0", "packageName": "com.example.capital", "eventTimeMillis": "1700000000000",
+        "subscriptionNotification": {
+            "version": "1.0", "notificationType": notification_type,
+            "purchaseToken": token, "subscriptionId": "basic_monthly",
+        },
+    }
+    return {
+        "message": {"data": base64.b64encode(json.dumps(data).encode()).decode(), "messageId": message_id},
+        "subscription": "projects/test/subscriptions/rtdn",
+    }
+
+
+@pytest.fixture
+def purchase(test_db):
+    test_db.add(Plan(name="BASIC", display_name_es="Básico", display_name_en="Basic",
+                     price_usd=9.99, features={}, is_active=True))
+    user = User(email="buyer@example.com", hashed_password="x")
+    test_db.add(user)
+    test_db.flush()
+    subscription = Subscription(user_id=user.id, plan_id=test_db.query(Plan).one().id,
+                                status="PAYMENT_PENDING", payment_provider="google_play")
+    test_db.add(subscription)
+    test_db.flush()
+    row = GooglePlayPurchase(
+        user_id=user.id, subscription_id=subscription.id, purchase_token="tok-1",
+        product_id="basic_monthly", package_name="com.example.capital", purchase_state="PENDING",
+        acknowledgement_state="ACKNOWLEDGED", purchase_time_millis=1700000000000,
+        expiry_time_millis=1702592000000, auto_renewing=False, verified=True,
+    )
+    test_db.add(row)
+    test_db.commit()
+    return row
+
+
+@pytest.fixture
+def play_api(monkeypatch):
+    """fetch_subscription falso: cuenta llamadas y puede fallar a demanda."""
+    state = {"calls": 0, "fail": False}
+
+    def fetch(package_name, product_id, purchase_token):
+        state["calls"] += 1
+        if state["fail"]:
+            raise OSError("connection reset")
+        return {"expiryTimeMillis": str(NEW_EXPIRY), "autoRenewing": True, "paymentState": 1}
+
+    monkeypatch.setattr(google_play_service, "fetch_subscription", fetch)
+    return state
+
+
+def test_webhook_queues_and_ignores_redeliveries(client, test_db, play_api):
+    first = client.post("/billing/webhook", json=_push("m-1", 2))
+    again = client.post("/billing/webhook", json=_push("m-1", 2))
+
+    assert (first.status_code, first.json()["status"]) == (200, "queued")
+    assert (again.status_code, again.json()["status"]) == (200, "duplicate")
+    assert test_db.query(GooglePlayNotification).one().status == "pending"
+    assert play_api["calls"] == 0  # nada se procesa dentro de la petición
+
+
+def test_renewal_refreshes_expiry_from_api(client, test_db, purchase, play_api):
+    client.post("/billing/webhook", json=_push("m-1", 2))
+    client.post("/billing/webhook", json=_push("m-2", 3, token="unknown-token"))
+
+    assert google_play_webhook_service.process_pending_notifications(test_db, limit=1) == 1
+
+    test_db.refresh(purchase)
+    assert purchase.expiry_time_millis == NEW_EXPIRY
+    assert (purchase.purchase_state, purchase.auto_renewing) == ("PURCHASED", True)
+    assert purchase.subscription.status == "ACTIVE"
+    done = test_db.query(GooglePlayNotification).filter_by(message_id="m-1").one()
+    assert done.status == "done" and done.result["action"] == "renewed"
+
+    # Compra todavía no registrada: se reintenta más tarde
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 1
+    waiting = test_db.query(GooglePlayNotification).filter_by(message_id="m-2").one()
+    assert (waiting.status, waiting.attempts, waiting.last_error) == ("pending", 1, "purchase_not_found")
+    assert play_api["calls"] == 1
+
+
+def test_api_failure_retries_with_backoff(client, test_db, purchase, play_api, monkeypatch):
+    monkeypatch.setattr(settings, "GOOGLE_PLAY_RTDN_MAX_ATTEMPTS", 2)
+    play_api["fail"] = True
+    client.post("/billing/webhook", json=_push("m-1", 2))
+
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 1
+
+    notification = test_db.query(GooglePlayNotification).one()
+    assert (notification.status, notification.attempts) == ("pending", 1)
+    assert notification.next_attempt_at > datetime.utcnow() + timedelta(
+        seconds=settings.GOOGLE_PLAY_RTDN_BACKOFF_BASE_SEC - 5)
+    test_db.refresh(purchase)
+    assert (purchase.purchase_state, purchase.expiry_time_millis) == ("PENDING", 1702592000000)
+
+    # Todavía no vence: no se reintenta
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 0
+
+    notification.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    test_db.commit()
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 1
+    test_db.refresh(notification)
+    assert (notification.status, notification.attempts) == ("failed", 2)
+
+
+def test_undecodable_message_fails_without_retry(client, test_db):
+    client.post("/billing/webhook", json={"message": {"data": "bm90IGpzb24=", "messageId": "m-bad"}})
+
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 1
+
+    notification = test_db.query(GooglePlayNotification).one()
+    assert (notification.status, notification.attempts) == ("failed", 1)
+
+
+def test_worker_processes_after_webhook(client, test_db, purchase, play_api, monkeypatch):
+    monkeypatch.setattr(google_play_webhook_service, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(settings, "GOOGLE_PLAY_RTDN_WORKER", True)
+    google_play_webhook_service.start_worker()
+    try:
+        client.post("/billing/webhook", json=_push("m-1", 2))
+
+        deadline = time.monotonic() + 10
+        while play_api["calls"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+    finally:
+        google_play_webhook_service.stop_worker()
+
+    test_db.expire_all()
+    assert test_db.query(GooglePlayNotification).one().status == "done"
+    assert test_db.get(GooglePlayPurchase, purchase.id).expiry_time_millis == NEW_EXPIRY
+
+
+def test_notifications_for_one_purchase_apply_in_order(client, test_db, purchase, play_api):
+    play_api["fail"] = True
+    client.post("/billing/webhook", json=_push("m-renew", 2))
+    client.post("/billing/webhook", json=_push("m-cancel", 3))
+
+    # La renovación falla; la cancelación espera detrás de ella
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 2
+    renew = test_db.query(GooglePlayNotification).filter_by(message_id="m-renew").one()
+    cancel = test_db.query(GooglePlayNotification).filter_by(message_id="m-cancel").one()
+    assert (renew.status, renew.attempts) == ("pending", 1)
+    assert (cancel.status, cancel.attempts) == ("pending", 0)
+    assert cancel.next_attempt_at >= renew.next_attempt_at
+    test_db.refresh(purchase)
+    assert purchase.subscription.status == "PAYMENT_PENDING"
+
+    # Reintento: primero la renovación, después la cancelación
+    play_api["fail"] = False
+    renew.next_attempt_at = cancel.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    test_db.commit()
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 2
+
+    test_db.refresh(purchase)
+    assert (purchase.purchase_state, purchase.subscription.status) == ("CANCELED", "CANCELED")
+    assert purchase.expiry_time_millis == NEW_EXPIRY
+    statuses = [n.status for n in test_db.query(GooglePlayNotification).order_by(GooglePlayNotification.id)]
+    assert statuses == ["done", "done"]
@@ -0,0 +1,238 @@
+import io
+import json
+import os
+from datetime import date, datetime, timedelta
+
+import bcrypt
+import pytest
+
+from app.config import settings
+from app.models.account import Account
+from app.models.daily_account_stats import DailyAccountStats
+from app.models.import_job import ImportJob
+from app.models.operation import Operation
+from app.models.plan import Plan
+from app.models.trading_day import TradingDay
+from app.models.trading_session import TradingSession
+from app.models.user import User
+from app.services import import_service
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def import_setup(client, test_db, monkeypatch):
+    monkeypatch.setattr(import_service, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_ROWS", 100)
+
+    test_db.add(Plan(
+        name="FREE", display_name_es="Gratis", display_name_en="Free",
+        price_usd=0.0, features={}, is_active=True,
+    ))
+    user = User(email="imports@example.com", hashed_password=bcrypt.hashpw(b"Test1234", bcrypt.gensalt()).decode())
+    test_db.add(user)
+    test_db.commit()
+    account = Account(user_id=user.id, capital=1000.0, payout=0.85)
+    test_db.add(account)
+    test_db.commit()
+
+    token = client.post("/auth/login", json={"email": "imports@example.com", "password": "Test1234"}).json()["access_token"]
+    return {"account_id": account.id, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+def _upload(client, headers, filename, content, content_type="text/csv"):
+    response = client.post("/imports", files={"file": (filename, content, content_type)}, headers=headers)
+    assert response.status_code == 202
+    job = response.json()
+    import_service.wait_for_import(job["id"], timeout=60)
+    return client.get(f"/imports/{job['id']}", headers=headers).json()
+
+
+def test_csv_import_in_chunks_with_row_errors(client, test_db, import_setup):
+    first_day = date.today() - timedelta(days=10)
+    lines = ["Date,Time,Session,Outcome,Stake,PnL,Notes"]
+    for i in range(250):
+        day = first_day + timedelta(days=i % 5)
+        result = ("WIN", "LOSS", "DRAW")[i % 3]
+        profit = {"WIN": "9.2", "LOSS": "-10", "DRAW": ""}[result]
+        lines.append(f"{day.isoformat()},10:{i % 60:02d}:00,{1 + i % 2},{result.lower()},10,{profit},r{i}")
+    lines.insert(50, "not-a-date,10:00:00,1,WIN,10,,bad")
+    lines.insert(120, f"{first_day.isoformat()},10:00:00,1,MAYBE,10,,bad")
+
+    job = _upload(client, import_setup["headers"], "history.csv", "\n".join(lines).encode())
+
+    assert job["status"] == "done"
+    assert (job["rows_read"], job["rows_imported"], job["rows_failed"]) == (252, 250, 2)
+    assert [error["row"] for error in job["errors"]] == [50, 120]
+    assert job["progress"] == 1.0
+
+    test_db.expire_all()
+    assert test_db.query(Operation).count() == 250
+    assert test_db.query(TradingDay).count() == 5
+    assert test_db.query(TradingSession).count() == 10
+
+    wins, losses = 84, 83
+    expected_capital = 1000.0 + wins * 9.2 - losses * 10
+    assert test_db.get(Account, import_setup["account_id"]).capital == pytest.approx(expected_capital)
+
+    session_losses = sum(session.loss_count for session in test_db.query(TradingSession))
+    assert session_losses == losses
+    stats = test_db.query(DailyAccountStats).all()
+    assert sum(row.ops for row in stats) == 250
+    assert sum(row.losses for row in stats) == losses
+
+
+def test_json_array_and_json_lines(client, test_db, import_setup):
+    today = date.today().isoformat()
+    records = [
+        {"opened_at": f"{today}T09:30:00Z", "result": "WIN", "amount": 20},
+        {"date": today, "session": 2, "result": "LOSS", "amount": 20, "risk_percent": 3},
+        {"date": today, "result": "WIN"},  # falta amount
+    ]
+
+    array_job = _upload(client, import_setup["headers"], "history.json", json.dumps(records).encode(), "application/json")
+    lines_job = _upload(
+        client, import_setup["headers"], "history.ndjson",
+        "\n".join(json.dumps(record) for record in records).encode(), "application/x-ndjson",
+    )
+
+    for job in (array_job, lines_job):
+        assert job["status"] == "done"
+        assert (job["rows_imported"], job["rows_failed"]) == (2, 1)
+        assert job["errors"][0]["row"] == 3
+
+    test_db.expire_all()
+    # La segunda importación reutiliza el día y las sesiones creadas por la primera
+    assert test_db.query(TradingDay).count() == 1
+    assert test_db.query(TradingSession).count() == 2
+    first = test_db.query(Operation).order_by(Operation.id).first()
+    assert first.created_at.hour == 9 and first.profit == pytest.approx(18.4)
+    assert test_db.get(Account, import_setup["account_id"]).capital == pytest.approx(1000.0 + 2 * (18.4 - 20))
+
+    listed = client.get("/imports", headers=import_setup["headers"]).json()
+    assert [job["id"] for job in listed] == [lines_job["id"], array_job["id"]]
+
+
+def test_upload_validation(client, import_setup, monkeypatch):
+    headers = import_setup["headers"]
+
+    unsupported = client.post("/imports", files={"file": ("history.xlsx", b"x", "application/octet-stream")}, headers=headers)
+    assert unsupported.status_code == 400
+
+    monkeypatch.setattr(settings, "IMPORT_MAX_BYTES", 10)
+    too_large = client.post("/imports", files={"file": ("history.csv", b"date,result\n" * 5, "text/csv")}, headers=headers)
+    assert too_large.status_code == 413
+    assert client.get("/imports", headers=headers).json() == []
+
+
+def test_iter_json_records_streams_across_reads():
+    payload = json.dumps([{"n": i, "text": "ñ" * 10} for i in range(50)]).encode()
+
+    records = list(import_service.iter_json_records(io.BytesIO(payload), read_size=7))
+
+    assert [number for number, _ in records] == list(range(1, 51))
+    assert records[-1][1] == {"n": 49, "text": "ñ" * 10}
+
+
+def test_abandoned_job_is_closed_with_committed_rows(client, test_db, import_setup):
+    # Job que un proceso ya reiniciado dejó a medias: un lote confirmado (2 pérdidas)
+    account_id = import_setup["account_id"]
+    day = TradingDay(account_id=account_id, date=date.today() - timedelta(days=3), start_capital=1000.0)
+    test_db.add(day)
+    test_db.flush()
+    session = TradingSession(trading_day_id=day.id, session_number=1)
+    test_db.add(session)
+    test_db.flush()
+    for _ in range(2):
+        test_db.add(Operation(session_id=session.id, result="LOSS", risk_percent=2.0, amount=10, profit=-10))
+    job = ImportJob(
+        user_id=test_db.query(User).one().id, account_id=account_id, file_format="csv", status="running",
+        errors=[], rows_read=2, rows_imported=2, profit_committed=-20.0, first_date=day.date,
+        started_at=datetime.utcnow() - timedelta(seconds=settings.IMPORT_JOB_STALE_SEC + 60),
+    )
+    test_db.add(job)
+    test_db.commit()
+    upload_path = import_service._upload_path(job.id)
+    os.makedirs(settings.IMPORTS_DIR, exist_ok=True)
+    with open(upload_path, "wb") as upload:
+        upload.write(b"date,result,amount\n")
+
+    body = client.get(f"/imports/{job.id}", headers=import_setup["headers"]).json()
+
+    assert body["status"] == "failed" and "interrupted" in body["error"]
+    assert not os.path.exists(upload_path)
+    test_db.expire_all()
+    assert test_db.get(Account, account_id).capital == pytest.approx(980.0)
+    assert test_db.get(TradingSession, session.id).loss_count == 2
+    assert sum(row.losses for row in test_db.query(DailyAccountStats)) == 2
+
+    # Una segunda lectura no vuelve a aplicar el cierre
+    client.get(f"/imports/{job.id}", headers=import_setup["headers"])
+    test_db.expire_all()
+    assert test_db.get(Account, account_id).capital == pytest.approx(980.0)
+
+
+def test_recent_unfinished_job_is_left_alone(client, test_db, import_setup):
+    job = ImportJob(
+        user_id=test_db.query(User).one().id, account_id=import_setup["account_id"],
+        file_format="csv", status="pending", errors=[],
+    )
+    test_db.add(job)
+    test_db.commit()
+
+    listed = client.get("/imports", headers=import_setup["headers"]).json()
+
+    assert [item["status"] for item in listed] == ["pending"]
+
+
+def test_job_with_recent_heartbeat_is_left_alone(client, test_db, import_setup):
+    # Empezó hace mucho pero confirmó un lote hace poco: otro proceso lo está procesando
+    job = ImportJob(
+        user_id=test_db.query(User).one().id, account_id=import_setup["account_id"],
+        file_format="csv", status="running", errors=[],
+        started_at=datetime.utcnow() - timedelta(seconds=settings.IMPORT_JOB_STALE_SEC * 3),
+        updated_at=datetime.utcnow(),
+    )
+    test_db.add(job)
+    test_db.commit()
+
+    body = client.get(f"/imports/{job.id}", headers=import_setup["headers"]).json()
+
+    assert body["status"] == "running"
+
+
+def test_worker_stops_when_job_is_closed_elsewhere(client, test_db, import_setup, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_ROWS", 2)
+    lines = ["date,session,result,amount,profit"] + [f"{date.today().isoformat()},1,WIN,10,8.5"] * 6
+    job = ImportJob(
+        user_id=test_db.query(User).one().id, account_id=import_setup["account_id"],
+        file_format="csv", status="pending", errors=[], bytes_total=0,
+    )
+    test_db.add(job)
+    test_db.commit()
+    os.makedirs(settings.IMPORTS_DIR, exist_ok=True)
+    with open(import_service._upload_path(job.id), "w") as upload:
+        upload.write("\n".join(lines) + "\n")
+
+    # Tras el primer lote, otro proceso da el job por abandonado y lo cierra
+    import_chunk = import_service._Importer.import_chunk
+    calls = []
+
+    def close_then_import(importer, records):
+        calls.append(len(records))
+        if len(calls) == 2:
+            with TestingSessionLocal() as other:
+                stale = other.get(ImportJob, job.id)
+                stale.updated_at = datetime.utcnow() - timedelta(seconds=settings.IMPORT_JOB_STALE_SEC + 60)
+                other.commit()
+                import_service._expire_if_stale(other, stale)
+        import_chunk(importer, records)
+
+    monkeypatch.setattr(import_service._Importer, "import_chunk", close_then_import)
+    import_service.run_import(job.id)
+
+    test_db.expire_all()
+    closed = test_db.get(ImportJob, job.id)
+    assert closed.status == "failed" and "interrupted" in closed.error
+    # Solo cuenta el lote confirmado antes del cierre, y el capital se ajusta una vez
+    assert test_db.query(Operation).count() == 2
+    assert test_db.get(Account, import_setup["account_id"]).capital == pytest.approx(1017.0)
@@ -0,0 +1,210 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.config import settings
+from app.services import oauth_facebook
+from app.services.jwks_cache import google_jwks
+from app.services.oauth_facebook import verify_facebook_token
+from app.services.oauth_google import verify_google_token
+from app.utils.http_client import close_http_session
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+
+
+def _rsa_key(kid: str) -> dict:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_pem = private.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    public_jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": kid, "use": "sig"}
+    return {"kid": kid, "private_pem": private_pem, "jwk": public_jwk}
+
+
+class FakeProvider:
+    """Servidor local con los endpoints de Google (JWKS) y Facebook (Graph) que usamos."""
+
+    def __init__(self):
+        self.keys = []
+        self.max_age = 3600
+        self.fb_tokens = {}
+        self.hits = {}
+        self.ports = set()
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        url = urlparse(handler.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.hits[url.path] = self.hits.get(url.path, 0) + 1
+        self.ports.add(handler.client_address[1])
+        headers = {}
+
+        if url.path == "/certs":
+            body = {"keys": [key["jwk"] for key in self.keys]}
+            headers["Cache-Control"] = f"public, max-age={self.max_age}, must-revalidate, no-transform"
+        elif url.path == "/debug_token":
+            token = self.fb_tokens.get(query.get("input_token"))
+            assert query.get("access_token") == "fb-app|fb-secret"
+            body = {"data": {"is_valid": token is not None, "app_id": token and token["app_id"],
+                             "expires_at": int(time.time()) + 3600}}
+        elif url.path == "/me" and query.get("access_token") in self.fb_tokens:
+            body = {"id": "fb-1", "email": "fb@example.com", "name": "FB User",
+                    "picture": {"data": {"url": "https://example.com/p.png"}}}
+        else:
+            handler.send_response(400)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        payload = json.dumps(body).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = FakeProvider()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_GET(self):
+            fake.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    monkeypatch.setattr(settings, "GOOGLE_JWKS_URL", f"{base}/certs")
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_ID", CLIENT_ID)
+    monkeypatch.setattr(settings, "FACEBOOK_GRAPH_URL", base)
+    monkeypatch.setattr(settings, "FACEBOOK_APP_ID", "fb-app")
+    monkeypatch.setattr(settings, "FACEBOOK_APP_SECRET", "fb-secret")
+    google_jwks.clear()
+    oauth_facebook.clear_token_cache()
+    yield fake
+    close_http_session()
+    server.shutdown()
+    server.server_close()
+
+
+def _id_token(key: dict, **overrides) -> str:
+    now = int(time.time())
+    claims = {
+        "iss": "https://accounts.google.com", "aud": CLIENT_ID, "sub": "g-123",
+        "email": "g@example.com", "email_verified": True, "name": "G User",
+        "iat": now, "exp": now + 3600, **overrides,
+    }
+    return jwt.encode(claims, key["private_pem"], algorithm="RS256", headers={"kid": key["kid"]})
+
+
+def test_google_token_verified_locally_with_cached_keys(provider):
+    key = _rsa_key("k1")
+    provider.keys = [key]
+
+    for _ in range(3):
+        user = verify_google_token(_id_token(key))
+        assert user["provider_user_id"] == "g-123" and user["email"] == "g@example.com"
+
+    assert provider.hits["/certs"] == 1
+
+
+@pytest.mark.parametrize("overrides", [
+    {"aud": "someone-else"},
+    {"iss": "https://evil.example.com"},
+    {"exp": int(time.time()) - 600},
+    {"email_verified": False},
+])
+def test_google_token_claims_are_checked(provider, overrides):
+    key = _rsa_key("k1")
+    provider.keys = [key]
+
+    assert verify_google_token(_id_token(key, **overrides)) is None
+
+
+def test_google_token_with_forged_signature_is_rejected(provider):
+    provider.keys = [_rsa_key("k1")]
+    forged = _rsa_key("k1")  # mismo kid, otra clave privada
+
+    assert verify_google_token(_id_token(forged)) is None
+    assert verify_google_token("not-a-jwt") is None
+
+
+def test_google_keys_rotate_and_respect_cache_control(provider, monkeypatch):
+    monkeypatch.setattr(settings, "OAUTH_JWKS_MIN_REFRESH_SEC", 0)
+    old, new = _rsa_key("old"), _rsa_key("new")
+    provider.keys = [old]
+    assert verify_google_token(_id_token(old))
+
+    # Clave nueva publicada: el kid desconocido fuerza una descarga
+    provider.keys = [new]
+    assert verify_google_token(_id_token(new))
+    assert provider.hits["/certs"] == 2
+    # La clave retirada deja de validar
+    assert verify_google_token(_id_token(old)) is None
+
+    # max-age=0: cada verificación vuelve a descargar
+    provider.max_age = 0
+    google_jwks.clear()
+    verify_google_token(_id_token(new))
+    verify_google_token(_id_token(new))
+    assert provider.hits["/certs"] == 5
+
+
+def test_unknown_kid_cannot_force_repeated_downloads(provider):
+    key = _rsa_key("k1")
+    provider.keys = [key]
+    assert verify_google_token(_id_token(key))
+
+    for _ in range(5):
+        assert verify_google_token(_id_token(_rsa_key("random"))) is None
+
+    assert provider.hits["/certs"] == 1
+
+
+def test_facebook_token_verified_once_over_pooled_connection(provider):
+    provider.fb_tokens = {"fb-token": {"app_id": "fb-app"}}
+
+    for _ in range(3):
+        user = verify_facebook_token("fb-token")
+        assert user["provider_user_id"] == "fb-1" and user["picture"] == "https://example.com/p.png"
+
+    assert provider.hits["/debug_token"] == 1 and provider.hits["/me"] == 1
+    assert len(provider.ports) == 1  # misma conexión keep-alive
+
+    provider.fb_tokens["other-app"] = {"app_id": "another-app"}
+    assert verify_facebook_token("other-app") is None
+    assert verify_facebook_token("unknown") is None
+
+
+def test_google_login_route(client, test_db, provider):
+    from app.models.plan import Plan
+
+    test_db.add(Plan(name="FREE", display_name_es="Gratis", display_name_en="Free",
+                     price_usd=0.0, features={}, is_active=True))
+    test_db.commit()
+    key = _rsa_key("k1")
+    provider.keys = [key]
+
+    response = client.post("/auth/google", json={"id_token": _id_token(key)})
+
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == "g@example.com"
+    assert response.json()["is_new_user"] is True
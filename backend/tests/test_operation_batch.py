@@ -0,0 +1,125 @@
+from datetime import date
+
+import bcrypt
+import pytest
+from sqlalchemy import event
+
+from app.models.account import Account
+from app.models.daily_account_stats import DailyAccountStats
+from app.models.operation import Operation
+from app.models.plan import Plan
+from app.models.trading_day import TradingDay
+from app.models.trading_session import TradingSession
+from app.models.user import User
+
+
+@pytest.fixture
+def batch_setup(client, test_db):
+    test_db.add(Plan(
+        name="FREE", display_name_es="Gratis", display_name_en="Free", price_usd=0.0,
+        features={"max_daily_sessions": 3, "max_ops_per_session": 3}, is_active=True,
+    ))
+    user = User(email="batch@example.com", hashed_password=bcrypt.hashpw(b"Test1234", bcrypt.gensalt()).decode())
+    test_db.add(user)
+    test_db.commit()
+    account = Account(user_id=user.id, capital=1000.0, payout=0.85)
+    test_db.add(account)
+    test_db.commit()
+
+    day = TradingDay(account_id=account.id, date=date.today(), start_capital=1000.0, status="active")
+    test_db.add(day)
+    test_db.flush()
+    sessions = [TradingSession(trading_day_id=day.id, session_number=n, status="active") for n in (1, 2)]
+    test_db.add_all(sessions)
+    test_db.commit()
+
+    token = client.post("/auth/login", json={"email": "batch@example.com", "password": "Test1234"}).json()["access_token"]
+    return {
+        "account_id": account.id,
+        "session_ids": [session.id for session in sessions],
+        "headers": {"Authorization": f"Bearer {token}"},
+    }
+
+
+def test_batch_inserts_valid_items_and_reports_errors(client, test_db, batch_setup):
+    first, second = batch_setup["session_ids"]
+    operations = [
+        {"session_id": first, "result": "WIN", "risk_percent": 2, "amount": 20.0, "profit": 17.0},
+        {"session_id": first, "result": "LOSS", "risk_percent": 2, "amount": 20.0, "comment": "l1"},
+        {"session_id": first, "result": "LOSS", "risk_percent": 2, "amount": 20.0, "comment": "l2"},
+        {"session_id": first, "result": "WIN", "risk_percent": 2},           # sesión bloqueada
+        {"session_id": second, "result": "DRAW", "risk_percent": 3, "amount": 30.0},
+        {"session_id": 999999, "result": "WIN", "risk_percent": 2},          # no existe
+    ]
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(test_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = client.post("/operations/batch", json={"operations": operations}, headers=batch_setup["headers"])
+    finally:
+        event.remove(test_db.get_bind(), "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [op["result"] for op in body["created"]] == ["WIN", "LOSS", "LOSS", "DRAW"]
+    assert [(e["index"], e["error"]) for e in body["errors"]] == [(3, "session_blocked"), (5, "session_not_found")]
+    assert body["capital"] == pytest.approx(1000.0 + 17.0 - 20.0 - 20.0)
+
+    # Un solo INSERT para las operaciones
+    assert sum(1 for sql in statements if sql.lstrip().upper().startswith("INSERT INTO OPERATIONS")) == 1
+
+    test_db.expire_all()
+    assert test_db.query(Operation).count() == 4
+    assert test_db.get(TradingSession, first).loss_count == 2
+    stats = test_db.query(DailyAccountStats).one()
+    assert (stats.ops, stats.wins, stats.losses, stats.draws, stats.sessions_with_ops) == (4, 1, 2, 1, 2)
+    assert test_db.get(Account, batch_setup["account_id"]).capital == pytest.approx(977.0)
+
+
+def test_batch_enforces_plan_limit_across_items(client, test_db, batch_setup):
+    first, _ = batch_setup["session_ids"]
+    operations = [{"session_id": first, "result": "WIN", "risk_percent": 2} for _ in range(4)]
+
+    response = client.post("/operations/batch", json={"operations": operations}, headers=batch_setup["headers"])
+
+    body = response.json()
+    assert len(body["created"]) == 3
+    assert [(e["index"], e["error"]) for e in body["errors"]] == [(3, "plan_limit_reached")]
+    # amount se calcula con el capital acumulado del lote, como en envíos sucesivos
+    amounts = [op["amount"] for op in body["created"]]
+    assert amounts[0] == pytest.approx(20.0)
+    assert amounts[1] == pytest.approx((1000.0 + 20.0 * 0.92) * 0.02)
+
+
+def test_batch_blocks_day_after_four_losses(client, test_db, batch_setup):
+    first, second = batch_setup["session_ids"]
+    third = TradingSession(trading_day_id=test_db.get(TradingSession, first).trading_day_id,
+                           session_number=3, status="active")
+    test_db.add(third)
+    test_db.commit()
+    loss = {"result": "LOSS", "risk_percent": 2, "amount": 10.0, "comment": "l"}
+    operations = [
+        {**loss, "session_id": first}, {**loss, "session_id": first},
+        {**loss, "session_id": second}, {**loss, "session_id": second},
+        {"session_id": third.id, "result": "WIN", "risk_percent": 2, "amount": 10.0},  # 4 pérdidas en el día
+    ]
+
+    body = client.post("/operations/batch", json={"operations": operations}, headers=batch_setup["headers"]).json()
+
+    assert len(body["created"]) == 4
+    assert [(e["index"], e["error"]) for e in body["errors"]] == [(4, "loss_limit_day")]
+
+
+def test_batch_blocks_day_at_drawdown_limit(client, test_db, batch_setup):
+    first, second = batch_setup["session_ids"]
+    operations = [
+        {"session_id": first, "result": "LOSS", "risk_percent": 3, "amount": 100.0, "comment": "-10%"},
+        {"session_id": second, "result": "WIN", "risk_percent": 2, "amount": 10.0},  # drawdown del 10%
+    ]
+
+    body = client.post("/operations/batch", json={"operations": operations}, headers=batch_setup["headers"]).json()
+
+    assert [op["result"] for op in body["created"]] == ["LOSS"]
+    assert [(e["index"], e["error"]) for e in body["errors"]] == [(1, "drawdown_limit")]
+    assert body["capital"] == pytest.approx(900.0)
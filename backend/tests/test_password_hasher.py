@@ -0,0 +1,71 @@
+import bcrypt
+import pytest
+
+from app.config import settings
+from app.models.user import User
+from app.services import password_hasher
+
+
+def _create_user(test_db, rounds: int) -> User:
+    user = User(
+        email="hash@example.com",
+        hashed_password=bcrypt.hashpw(b"Test1234", bcrypt.gensalt(rounds=rounds)).decode(),
+    )
+    test_db.add(user)
+    test_db.commit()
+    return user
+
+
+def test_login_rehashes_when_cost_changes(client, test_db, monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    user = _create_user(test_db, rounds=4)
+
+    response = client.post("/auth/login", json={"email": "hash@example.com", "password": "Test1234"})
+
+    assert response.status_code == 200
+    test_db.refresh(user)
+    assert user.hashed_password.startswith("$2b$05$")
+    assert bcrypt.checkpw(b"Test1234", user.hashed_password.encode())
+
+    # Con el coste al día no se vuelve a hashear
+    before = user.hashed_password
+    assert client.post("/auth/login", json={"email": "hash@example.com", "password": "Test1234"}).status_code == 200
+    test_db.refresh(user)
+    assert user.hashed_password == before
+
+
+def test_wrong_password_does_not_rehash(client, test_db, monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+    user = _create_user(test_db, rounds=4)
+
+    response = client.post("/auth/login", json={"email": "hash@example.com", "password": "Wrong123"})
+
+    assert response.status_code == 401
+    test_db.refresh(user)
+    assert user.hashed_password.startswith("$2b$04$")
+
+
+def test_saturated_pool_fails_fast_with_503(client, test_db, monkeypatch):
+    _create_user(test_db, rounds=4)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 0)
+    monkeypatch.setattr(password_hasher, "_pending", settings.PASSWORD_HASH_WORKERS)
+
+    response = client.post("/auth/login", json={"email": "hash@example.com", "password": "Test1234"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert password_hasher.queue_depth() == settings.PASSWORD_HASH_WORKERS
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_hash_and_check_inline_and_in_pool(monkeypatch, workers):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", workers)
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+
+    hashed = password_hasher.hash_password("Test1234")
+
+    assert hashed.startswith("$2b$04$")
+    assert password_hasher.check_password("Test1234", hashed)
+    assert not password_hasher.check_password("Test12345", hashed)
+    assert not password_hasher.check_password("Test1234", "")
+    assert password_hasher.queue_depth() == 0
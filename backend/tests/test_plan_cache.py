@@ -0,0 +1,99 @@
+"""
+Caché en memoria de planes: catálogo con TTL y plan efectivo por usuario,
+invalidado al cambiar la suscripción.
+"""
+
+import base64
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.models.user import User
+from app.models.plan import Plan
+from app.models.google_play_purchase import GooglePlayPurchase
+from app.services import google_play_webhook_service, plan_service
+from app.services.google_play_webhook_service import process_google_play_notification
+
+
+@pytest.fixture
+def plans(test_db):
+    free = Plan(name="FREE", display_name_es="Gratis", display_name_en="Free",
+                price_usd=0.0, features={"max_daily_sessions": 1}, is_active=True)
+    pro = Plan(name="PRO", display_name_es="Pro", display_name_en="Pro",
+               price_usd=9.99, features={"max_daily_sessions": 5}, is_active=True)
+    user = User(email="cache@example.com", hashed_password="x")
+    test_db.add_all([free, pro, user])
+    test_db.commit()
+    return user
+
+
+def _count_statements(test_db, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+
+def test_plan_catalog_is_cached(test_db, plans):
+    assert plan_service.get_plan_by_name(test_db, "FREE").name == "FREE"
+
+    plan, statements = _count_statements(test_db, lambda: plan_service.get_plan_by_name(test_db, "PRO"))
+    assert plan.get_feature("max_daily_sessions") == 5
+    assert statements == []
+    assert [p.name for p in plan_service.get_all_plans(test_db)] == ["FREE", "PRO"]
+
+
+def test_user_plan_is_cached_and_invalidated_by_subscription(test_db, plans):
+    user_id = plans.id
+    assert plan_service.get_user_plan(test_db, user_id).name == "FREE"
+
+    plan, statements = _count_statements(test_db, lambda: plan_service.get_user_plan(test_db, user_id))
+    assert plan.name == "FREE"
+    assert statements == []
+
+    plan_service.create_subscription(test_db, user_id, "PRO")
+    assert plan_service.get_user_plan(test_db, user_id).name == "PRO"
+
+    plan_service.cancel_subscription(test_db, user_id)
+    assert plan_service.get_user_plan(test_db, user_id).name == "FREE"
+
+
+def test_cached_plan_survives_commit(test_db, plans):
+    plan = plan_service.get_user_plan(test_db, plans.id)
+    test_db.commit()
+    test_db.close()
+
+    assert plan.features == {"max_daily_sessions": 1}
+
+
+def test_google_play_notification_invalidates_user_plan(test_db, plans):
+    user_id = plans.id
+    subscription = plan_service.create_subscription(test_db, user_id, "PRO", payment_provider="google_play")
+    test_db.add(GooglePlayPurchase(
+        user_id=user_id, subscription_id=subscription.id, product_id="pro_monthly",
+        purchase_token="token-1", order_id="order-1", package_name="app",
+        purchase_state="PURCHASED", acknowledgement_state="ACKNOWLEDGED",
+        purchase_time_millis=0,
+    ))
+    test_db.commit()
+    assert plan_service.get_user_plan(test_db, user_id).name == "PRO"
+
+    data = {"subscriptionNotification": {"notificationType": 13, "purchaseToken": "token-1"}}
+    result = process_google_play_notification(test_db, {
+        "message": {"data": base64.b64encode(json.dumps(data).encode()).decode()}
+    })
+
+    assert result["status"] == "queued"
+    assert plan_service.get_user_plan(test_db, user_id).name == "PRO"
+
+    assert google_play_webhook_service.process_pending_notifications(test_db) == 1
+    assert plan_service.get_user_plan(test_db, user_id).name == "FREE"
@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from app.services import projection_engine
+
+
+def _legacy_tail(capital, risk_fraction, ops_total, payout, winrate, target, max_days):
+    """Bucle original de la cola futura de regenerate_goal_calendar."""
+    expected_return = winrate * payout - (1 - winrate)
+    days = []
+    projected = capital
+    for _ in range(max_days):
+        capital_start = round(projected, 2)
+        stake = round(max(capital_start, 0.0) * risk_fraction, 2)
+        pnl = round(stake * ops_total * expected_return, 2)
+        days.append((capital_start, stake, pnl))
+        projected = round(capital_start + pnl, 2)
+        if projected >= target or projected <= 0:
+            break
+    return days
+
+
+def test_expected_return_and_growth_factor():
+    assert projection_engine.expected_return_per_op(0.60, 0.85) == pytest.approx(0.11)
+    assert projection_engine.daily_growth_factor(2, 10, 0.60, 0.85) == pytest.approx(1.022)
+
+
+@pytest.mark.parametrize("winrate,target", [(0.60, 1500.0), (0.60, 10_000_000.0), (0.40, 5000.0)])
+def test_daily_plan_tail_matches_legacy_loop(winrate, target):
+    expected_return = projection_engine.expected_return_per_op(winrate, 0.85)
+    tail = projection_engine.project_daily_plan_tail(
+        1000.0, 0.02, 10, 0.85, expected_return, target, max_days=730
+    )
+
+    legacy = _legacy_tail(1000.0, 0.02, 10, 0.85, winrate, target, 730)
+    assert [(d.capital_start, d.planned_stake, d.expected_daily_pnl) for d in tail] == legacy
+
+
+def test_project_capital_matches_compound_growth():
+    assert projection_engine.project_capital(1000.0, 1.022, 30) == pytest.approx(1000.0 * 1.022 ** 30)
+    assert projection_engine.project_capital(1000.0, -0.5, 3) == 0.0
+
+
+def test_days_to_target_is_first_day_reaching_target():
+    days = projection_engine.days_to_target(1000.0, 2000.0, 1.022)
+
+    assert days == math.ceil(math.log(2) / math.log(1.022))
+    assert projection_engine.project_capital(1000.0, 1.022, days) >= 2000.0
+    assert projection_engine.project_capital(1000.0, 1.022, days - 1) < 2000.0
+
+
+def test_days_to_target_without_growth_or_target():
+    assert projection_engine.days_to_target(1000.0, 2000.0, 1.0) is None
+    assert projection_engine.days_to_target(1000.0, None, 1.022) is None
@@ -0,0 +1,130 @@
+"""
+Consultas SQL por petición en los endpoints de trading: la identidad
+(usuario + cuenta, suscripción + plan, objetivo activo) se resuelve una vez.
+"""
+
+import re
+from contextlib import contextmanager
+
+import bcrypt
+import pytest
+from sqlalchemy import event
+
+from app.models.user import User
+from app.models.account import Account
+from app.models.plan import Plan
+from app.models.subscription import Subscription
+
+
+FEATURES = {
+    "max_daily_sessions": 3,
+    "max_ops_per_session": 5,
+    "max_active_goals": 1,
+    "history_days": 30,
+}
+
+
+@pytest.fixture
+def headers(test_db, client):
+    plan = Plan(
+        name="FREE", display_name_es="Gratis", display_name_en="Free",
+        price_usd=0.0, features=FEATURES, is_active=True,
+    )
+    user = User(
+        email="queries@example.com",
+        hashed_password=bcrypt.hashpw(b"Test1234", bcrypt.gensalt()).decode(),
+    )
+    test_db.add_all([plan, user])
+    test_db.commit()
+    test_db.add_all([
+        Account(user_id=user.id, capital=1000.0, payout=0.85),
+        Subscription(user_id=user.id, plan_id=plan.id, status="ACTIVE"),
+    ])
+    test_db.commit()
+
+    response = client.post("/auth/login", json={
+        "email": "queries@example.com",
+        "password": "Test1234",
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@contextmanager
+def _count_queries(test_db):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _selects_from(statements, table):
+    pattern = re.compile(rf"^SELECT\b.*?\sFROM\s+{table}\b", re.DOTALL)
+    return [s for s in statements if pattern.match(s)]
+
+
+def test_create_session_resolves_identity_once(client, test_db, headers):
+    with _count_queries(test_db) as statements:
+        response = client.post("/sessions", json={"risk_percent": 2}, headers=headers)
+
+    assert response.status_code == 200
+    assert len(_selects_from(statements, "users")) == 1
+    assert len(_selects_from(statements, "accounts")) == 0  # llega con el usuario
+    assert len(_selects_from(statements, "subscriptions")) == 1  # con su plan
+    assert len(_selects_from(statements, "plans")) == 0
+    assert len(statements) <= 9
+
+
+def test_create_operation_resolves_identity_once(client, test_db, headers):
+    session_id = client.post("/sessions", json={"risk_percent": 2}, headers=headers).json()["id"]
+
+    with _count_queries(test_db) as statements:
+        response = client.post("/operations", json={
+            "session_id": session_id,
+            "result": "WIN",
+            "risk_percent": 2,
+        }, headers=headers)
+
+    assert response.status_code == 200
+    assert len(_selects_from(statements, "users")) == 1
+    assert len(_selects_from(statements, "accounts")) == 0
+    assert len(_selects_from(statements, "subscriptions")) == 0  # plan cacheado por usuario
+    assert len(_selects_from(statements, "plans")) == 0
+    assert len(_selects_from(statements, "trading_sessions")) == 1
+    assert len(_selects_from(statements, "goals")) == 1
+    assert len(statements) <= 14
+
+
+def test_read_routes_run_on_async_engine(client, test_db, headers):
+    session_id = client.post("/sessions", json={"risk_percent": 2}, headers=headers).json()["id"]
+    client.post("/operations", json={
+        "session_id": session_id,
+        "result": "WIN",
+        "risk_percent": 2,
+    }, headers=headers)
+
+    with _count_queries(test_db) as statements:
+        sessions = client.get("/sessions", headers=headers)
+        operations = client.get("/operations", params={"session_id": session_id}, headers=headers)
+
+    assert [s["id"] for s in sessions.json()] == [session_id]
+    assert [op["result"] for op in operations.json()] == ["WIN"]
+    assert statements == []  # ni el usuario (claims del token) ni los datos pasan por el motor sync
+
+
+def test_reports_route_stays_off_the_sync_pool(client, test_db, headers):
+    with _count_queries(test_db) as statements:
+        first = client.get("/reports", params={"days": 7}, headers=headers)   # plan por la sesión async
+        second = client.get("/reports", params={"days": 7}, headers=headers)  # plan cacheado
+        over_limit = client.get("/reports", params={"days": 60}, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert over_limit.status_code == 403
+    assert over_limit.json()["detail"]["limit"] == FEATURES["history_days"]
+    assert statements == []
@@ -0,0 +1,96 @@
+"""
+Regresión de planes de consulta (EXPLAIN QUERY PLAN de SQLite) para el
+camino caliente operations → trading_sessions → trading_days.
+"""
+
+import datetime as dt
+
+from sqlalchemy import UniqueConstraint, case, func
+
+from app.models.daily_account_stats import DailyAccountStats
+from app.models.goal_daily_plan import GoalDailyPlan
+from app.models.operation import Operation, OperationResult
+from app.models.trading_day import TradingDay
+from app.models.trading_session import TradingSession
+
+
+TODAY = dt.date(2026, 3, 1)
+
+
+def _plan(db, query) -> list[str]:
+    compiled = query.statement.compile(dialect=db.get_bind().dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), params
+    ).all()
+    return [row[-1] for row in rows]
+
+
+def _assert_no_table_scan(plan):
+    assert not any(step.startswith("SCAN") for step in plan), plan
+
+
+def test_operations_join_path_uses_composite_indexes(test_db):
+    query = test_db.query(
+        TradingDay.date,
+        func.count(Operation.id),
+        func.sum(case((Operation.result == OperationResult.WIN, 1), else_=0)),
+        func.sum(Operation.profit),
+    ).join(
+        TradingSession, Operation.session_id == TradingSession.id
+    ).join(
+        TradingDay, TradingSession.trading_day_id == TradingDay.id
+    ).filter(
+        TradingDay.account_id == 1,
+        TradingDay.date >= TODAY,
+    ).group_by(TradingDay.date)
+
+    plan = _plan(test_db, query)
+
+    _assert_no_table_scan(plan)
+    assert any("sqlite_autoindex_trading_days" in step for step in plan), plan
+    assert any("COVERING INDEX ix_trading_sessions_day_number" in step for step in plan), plan
+    assert any("COVERING INDEX ix_operations_session_result_profit" in step for step in plan), plan
+
+
+def test_operations_per_session_count_is_index_only(test_db):
+    plan = _plan(test_db, test_db.query(func.count(Operation.id)).filter(Operation.session_id == 1))
+
+    assert plan == ["SEARCH operations USING COVERING INDEX ix_operations_session_result_profit (session_id=?)"]
+
+
+def test_calendar_range_uses_goal_date_unique_index(test_db):
+    query = test_db.query(GoalDailyPlan).filter(
+        GoalDailyPlan.goal_id == 1,
+        GoalDailyPlan.date >= TODAY,
+    ).order_by(GoalDailyPlan.date)
+
+    plan = _plan(test_db, query)
+
+    _assert_no_table_scan(plan)
+    assert any(
+        "sqlite_autoindex_goal_daily_plans" in step and "goal_id=? AND date>?" in step
+        for step in plan
+    ), plan
+
+
+def test_daily_stats_range_uses_account_date_index(test_db):
+    query = test_db.query(DailyAccountStats).filter(
+        DailyAccountStats.account_id == 1,
+        DailyAccountStats.date >= TODAY,
+    )
+
+    plan = _plan(test_db, query)
+
+    _assert_no_table_scan(plan)
+    assert any("account_id=? AND date>?" in step for step in plan), plan
+
+
+def test_goal_daily_plan_is_unique_per_date():
+    unique_columns = [
+        [column.name for column in constraint.columns]
+        for constraint in GoalDailyPlan.__table__.constraints
+        if isinstance(constraint, UniqueConstraint)
+    ]
+
+    assert ["goal_id", "date"] in unique_columns
@@ -0,0 +1,158 @@
+import pytest
+
+from app.middleware.rate_limit import (
+    MemoryBackend, RedisBackend, SQLBackend, RateLimiter, gcra
+)
+from tests.conftest import TestingSessionLocal
+
+
+class FakeRedis:
+    """Subconjunto en memoria del protocolo Redis que usa RedisBackend."""
+
+    def __init__(self):
+        self.data = {}
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def decr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) - 1
+        return self.data[key]
+
+    def pexpire(self, key, ms):
+        return key in self.data
+
+    def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else str(value).encode()
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+def test_gcra_allows_burst_then_spaces_requests():
+    tat, results = None, []
+    for _ in range(4):
+        result, new_tat = gcra(tat, 1000.0, 3, 30)
+        results.append(result)
+        tat = new_tat or tat
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    assert results[3].retry_after == pytest.approx(10.0)
+
+    # Pasado un intervalo (window / limit) vuelve a haber cupo para una
+    result, _ = gcra(tat, 1010.0, 3, 30)
+    assert result.allowed
+
+
+def test_memory_backend_evicts_idle_keys():
+    backend = MemoryBackend(sweep_every=10)
+    for i in range(9):
+        backend.hit(f"ip-{i}", 5, 60, now=1000.0)
+    assert len(backend._tats) == 9
+
+    backend.hit("ip-late", 5, 60, now=2000.0)  # décimo hit: purga
+    assert list(backend._tats) == ["ip-late"]
+
+
+def test_memory_backend_caps_live_keys():
+    backend = MemoryBackend(max_keys=3, sweep_every=1_000_000)
+    for key in ("a", "b", "c"):
+        backend.hit(key, 5, 60, now=1000.0)
+    backend.hit("a", 5, 60, now=1001.0)  # "a" vuelve a ser la más reciente
+
+    # Claves vivas (TAT en el futuro) y sin barrido: el tope descarta la menos usada
+    backend.hit("d", 5, 60, now=1002.0)
+
+    assert list(backend._tats) == ["c", "a", "d"]
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda: MemoryBackend(),
+    lambda: RedisBackend(FakeRedis()),
+    lambda: SQLBackend(TestingSessionLocal),
+])
+def test_backends_enforce_limit(test_db, make_backend):
+    limiter = RateLimiter(max_requests=3, window_seconds=60, backend=make_backend())
+
+    assert [limiter.is_allowed("1.2.3.4") for _ in range(4)] == [True, True, True, False]
+    assert limiter.remaining("1.2.3.4") == 0
+    assert limiter.is_allowed("5.6.7.8")
+
+
+def test_redis_backend_keeps_two_counters_per_key():
+    redis = FakeRedis()
+    backend = RedisBackend(redis)
+    for step in range(10):  # dos ventanas de 60 s
+        backend.hit("login:1.2.3.4", 100, 60, now=1_000_020.0 + step * 10)
+
+    assert len(redis.data) == 2
+
+    result = backend.hit("login:1.2.3.4", 5, 60, now=1_000_115.0)
+    assert not result.allowed and result.retry_after > 0
+
+
+def test_register_policy_is_separate_from_login(client):
+    for i in range(5):
+        response = client.post("/auth/register", json={"email": f"u{i}@example.com", "password": "Test1234"})
+        assert response.status_code == 200
+
+    response = client.post("/auth/register", json={"email": "u5@example.com", "password": "Test1234"})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+    response = client.post("/auth/login", json={"email": "u0@example.com", "password": "Test1234"})
+    assert response.status_code == 200
+
+
+def test_write_routes_use_plan_token_bucket(client, test_db):
+    import bcrypt
+    from app.models.user import User
+    from app.models.account import Account
+    from app.models.plan import Plan
+
+    test_db.add(Plan(
+        name="FREE", display_name_es="Gratis", display_name_en="Free", price_usd=0.0,
+        features={"max_daily_sessions": 3, "rate_writes_per_minute": 1, "rate_writes_burst": 2},
+        is_active=True,
+    ))
+    user = User(email="bucket@example.com", hashed_password=bcrypt.hashpw(b"Test1234", bcrypt.gensalt()).decode())
+    test_db.add(user)
+    test_db.commit()
+    test_db.add(Account(user_id=user.id, capital=1000.0, payout=0.85))
+    test_db.commit()
+
+    token = client.post("/auth/login", json={"email": "bucket@example.com", "password": "Test1234"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    first = client.post("/sessions", json={"risk_percent": 2}, headers=headers)
+    second = client.post("/sessions", json={"risk_percent": 2}, headers=headers)
+    third = client.post("/sessions", json={"risk_percent": 2}, headers=headers)
+
+    assert first.status_code == 200
+    assert (first.headers["RateLimit-Limit"], first.headers["RateLimit-Remaining"]) == ("2", "1")
+    assert second.headers["RateLimit-Remaining"] == "0"
+    assert third.status_code == 429
+    assert int(third.headers["Retry-After"]) >= 1
+    assert third.headers["RateLimit-Remaining"] == "0"
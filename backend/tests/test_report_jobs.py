@@ -0,0 +1,193 @@
+from datetime import date, datetime
+
+import bcrypt
+import pytest
+from openpyxl import load_workbook
+
+from app.models.account import Account
+from app.models.goal import Goal, GoalStatus
+from app.models.plan import Plan
+from app.models.subscription import Subscription
+from app.models.user import User
+from app.models.withdrawal import Withdrawal
+from app.services import plan_service, report_jobs
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def report_setup(client, test_db, monkeypatch):
+    monkeypatch.setattr(report_jobs, "session_factory", TestingSessionLocal)
+
+    pro = Plan(
+        name="PRO", display_name_es="Pro", display_name_en="Pro", price_usd=19.99,
+        features={"can_export_pdf": True, "can_export_excel": True}, is_active=True,
+    )
+    test_db.add_all([pro, Plan(
+        name="FREE", display_name_es="Gratis", display_name_en="Free",
+        price_usd=0.0, features={}, is_active=True,
+    )])
+    user = User(email="reports@example.com", hashed_password=bcrypt.hashpw(b"Test1234", bcrypt.gensalt()).decode())
+    test_db.add(user)
+    test_db.commit()
+    account = Account(user_id=user.id, capital=1000.0, payout=0.85)
+    test_db.add_all([account, Subscription(user_id=user.id, plan_id=pro.id, status="ACTIVE")])
+    test_db.commit()
+    goal = Goal(
+        account_id=account.id, target_capital=2000.0, start_capital_snapshot=1000.0,
+        start_date=date.today(), status=GoalStatus.ACTIVE,
+    )
+    test_db.add(goal)
+    test_db.commit()
+
+    token = client.post("/auth/login", json={"email": "reports@example.com", "password": "Test1234"}).json()["access_token"]
+    return {"goal_id": goal.id, "account_id": account.id, "headers": {"Authorization": f"Bearer {token}"}}
+
+
+def test_excel_job_builds_once_per_data_version(client, test_db, report_setup):
+    goal_id, headers = report_setup["goal_id"], report_setup["headers"]
+
+    created = client.post(f"/reports/goals/{goal_id}/jobs?format=excel", headers=headers)
+    assert created.status_code == 202
+    job = created.json()
+    assert job["status"] == "pending"
+
+    assert report_jobs.wait_for_job(goal_id, job["job_id"], timeout=30).status == "ready"
+    status = client.get(job["status_url"], headers=headers).json()
+    assert status["status"] == "ready"
+
+    download = client.get(status["download_url"], headers=headers)
+    assert download.status_code == 200
+    assert "spreadsheetml" in download.headers["content-type"]
+
+    # Mismos datos → mismo job, ya listo
+    again = client.post(f"/reports/goals/{goal_id}/jobs?format=excel", headers=headers)
+    assert again.status_code == 200
+    assert again.json()["job_id"] == job["job_id"]
+
+    # Un retiro nuevo cambia la versión y el contenido
+    test_db.add(Withdrawal(
+        account_id=report_setup["account_id"], goal_id=goal_id, amount=25.0,
+        withdrawn_at=datetime.utcnow(), capital_before=1000.0, capital_after=975.0,
+    ))
+    test_db.commit()
+    changed = client.post(f"/reports/goals/{goal_id}/jobs?format=excel", headers=headers).json()
+    assert changed["job_id"] != job["job_id"]
+
+    ready = report_jobs.wait_for_job(goal_id, changed["job_id"], timeout=30)
+    workbook = load_workbook(ready.path, read_only=True)
+    assert workbook.sheetnames == ["Summary", "Daily Plans", "Operations", "Withdrawals"]
+    rows = list(workbook["Withdrawals"].values)
+    assert rows[1][1:4] == (25.0, 1000.0, 975.0)
+
+
+def test_pdf_route_enqueues_then_serves_file(client, report_setup):
+    goal_id, headers = report_setup["goal_id"], report_setup["headers"]
+
+    first = client.get(f"/reports/goals/{goal_id}/pdf", headers=headers)
+    assert first.status_code == 202
+    report_jobs.wait_for_job(goal_id, first.json()["job_id"], timeout=30)
+
+    second = client.get(f"/reports/goals/{goal_id}/pdf", headers=headers)
+    assert second.status_code == 200
+    assert second.headers["content-type"] == "application/pdf"
+    assert second.content.startswith(b"%PDF")
+
+
+def test_pdf_caps_rows_per_section(test_db, report_setup, tmp_path, monkeypatch):
+    from app.config import settings
+    from app.services import report_generator_service
+
+    monkeypatch.setattr(settings, "REPORT_PDF_MAX_ROWS", 1)
+    for amount in (10.0, 20.0):
+        test_db.add(Withdrawal(
+            account_id=report_setup["account_id"], goal_id=report_setup["goal_id"], amount=amount,
+            withdrawn_at=datetime.utcnow(), capital_before=1000.0, capital_after=1000.0 - amount,
+        ))
+    test_db.commit()
+    drawn = []
+    monkeypatch.setattr("reportlab.pdfgen.canvas.Canvas.drawString",
+                        lambda self, x, y, text, *args, **kwargs: drawn.append(text))
+
+    goal = test_db.get(Goal, report_setup["goal_id"])
+    report_generator_service.render_pdf_report(test_db, goal, str(tmp_path / "capped.pdf"))
+
+    assert "10.0" in drawn and "20.0" not in drawn
+    assert any(text.startswith("Truncated") for text in drawn)
+
+
+def test_download_before_ready_returns_409(client, report_setup):
+    goal_id, headers = report_setup["goal_id"], report_setup["headers"]
+
+    response = client.get(f"/reports/goals/{goal_id}/jobs/pdf-en-0123456789abcdef/download", headers=headers)
+
+    assert response.status_code == 409
+    assert client.get(f"/reports/goals/{goal_id}/jobs/bogus/download", headers=headers).status_code == 404
+
+
+def test_free_plan_cannot_export_pdf_or_excel(client, test_db, report_setup):
+    goal_id = report_setup["goal_id"]
+    user = test_db.query(User).filter_by(email="reports@example.com").one()
+    test_db.query(Subscription).filter_by(user_id=user.id).delete()
+    test_db.commit()
+    plan_service.invalidate_user_plan(user.id)
+    headers = report_setup["headers"]
+
+    for path in ("pdf", "excel", "jobs/pdf-en-0123456789abcdef/download", "jobs/excel-en-0123456789abcdef/download"):
+        response = client.get(f"/reports/goals/{goal_id}/{path}", headers=headers)
+        assert response.status_code == 403, path
+        assert response.json()["detail"]["error"] == "plan_restriction"
+    for fmt in ("pdf", "excel"):
+        assert client.post(f"/reports/goals/{goal_id}/jobs?format={fmt}", headers=headers).status_code == 403
+    # El CSV sigue disponible para todos los planes
+    assert client.get(f"/reports/goals/{goal_id}/csv", headers=headers).status_code == 200
+
+
+def test_csv_is_cached_and_revalidated(client, test_db, report_setup, reports_dir, monkeypatch):
+    from app.services import report_generator_service
+
+    goal_id, headers = report_setup["goal_id"], report_setup["headers"]
+
+    first = client.get(f"/reports/goals/{goal_id}/csv", headers=headers)
+    assert first.status_code == 200
+    etag, last_modified = first.headers["ETag"], first.headers["Last-Modified"]
+    assert list(reports_dir.glob(f"goal_{goal_id}/csv-*.csv.gz"))
+
+    # Acierto de caché: no se vuelve a renderizar (y sin gzip se descomprime)
+    monkeypatch.setattr(report_generator_service, "iter_csv_report", None)
+    # (el ETag de la versión gzip no valida la versión sin comprimir)
+    cached = client.get(
+        f"/reports/goals/{goal_id}/csv", headers={**headers, "Accept-Encoding": "identity", "If-None-Match": etag}
+    )
+    assert cached.status_code == 200
+    assert "content-encoding" not in cached.headers
+    assert cached.text == first.text
+    assert first.headers["content-encoding"] == "gzip" and cached.headers["ETag"] != etag
+
+    assert client.get(
+        f"/reports/goals/{goal_id}/csv", headers={**headers, "If-None-Match": etag}
+    ).status_code == 304
+    assert client.get(
+        f"/reports/goals/{goal_id}/csv", headers={**headers, "If-Modified-Since": last_modified}
+    ).status_code == 304
+    assert client.get(
+        f"/reports/goals/{goal_id}/csv", headers={**headers, "If-None-Match": '"stale"'}
+    ).status_code == 200
+
+
+def test_cache_evicts_least_recently_used(reports_dir):
+    import os
+    from app.services import report_cache
+
+    paths = []
+    for i, name in enumerate(["old.csv.gz", "used.csv.gz", "new.csv.gz", "build.pdf.part"]):
+        path = report_cache.artifact_path(1, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as artifact:
+            artifact.write(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+        paths.append(path)
+
+    report_cache.lookup(paths[1])  # usado ahora → el más reciente
+
+    assert report_cache.evict(max_bytes=200) == 100
+    assert [os.path.exists(path) for path in paths] == [False, True, True, True]
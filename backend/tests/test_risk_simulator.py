@@ -0,0 +1,75 @@
+import pytest
+
+from app.services import risk_simulator
+
+
+def _params(**overrides):
+    values = dict(
+        capital=1000.0,
+        payout=0.85,
+        target_capital=1500.0,
+        sessions_per_day=3,
+        ops_per_session=5,
+        risk_percent=3.0,
+        winrate=0.60,
+        draw_rate=0.0,
+        days=30,
+        paths=500,
+        ruin_fraction=0.5,
+        seed=7,
+    )
+    values.update(overrides)
+    return risk_simulator.SimulationParams(**values)
+
+
+def test_all_losses_stop_at_four_losses_per_day():
+    result = risk_simulator.simulate(_params(winrate=0.0, days=2, target_capital=None))
+
+    # 2 pérdidas por sesión y 4 por día: cada día pierde 4 stakes del 3%.
+    assert result.bands[1][1:] == (880.0,) * 5
+    assert result.bands[2][1:] == (774.4,) * 5
+    assert result.blocked_days_ratio == 1.0
+    assert result.probability_hit_target is None
+
+
+def test_drawdown_blocks_before_day_loss_limit():
+    # Dos pérdidas del 6% llevan el día a -12%: el drawdown bloquea antes de la 4ª pérdida.
+    result = risk_simulator.simulate(_params(
+        winrate=0.0, risk_percent=6.0, ops_per_session=4, days=1, target_capital=None,
+    ))
+
+    assert result.bands[1][1:] == (880.0,) * 5
+
+
+def test_all_wins_play_every_operation():
+    result = risk_simulator.simulate(_params(winrate=1.0, days=1))
+
+    assert result.bands[1][3] == pytest.approx(1000.0 * (1 + 0.03 * 15 * 0.85))
+    assert result.blocked_days_ratio == 0.0
+    assert result.probability_hit_target == 0.0
+    assert result.risk_of_ruin == 0.0
+
+
+def test_seeded_simulation_is_reproducible():
+    first = risk_simulator.simulate(_params())
+    second = risk_simulator.simulate(_params())
+
+    assert first == second
+    assert 0.0 <= first.risk_of_ruin <= 1.0
+    assert all(band[1] <= band[3] <= band[5] for band in first.bands)
+
+
+def test_paths_are_capped_by_latency_budget():
+    result = risk_simulator.simulate(_params(days=730, paths=10000, seed=1))
+
+    assert result.paths == risk_simulator.MAX_SIMULATED_OPS // (730 * 15)
+    assert len(result.bands) == 731
+
+
+def test_results_are_cached_by_parameter_tuple():
+    risk_simulator.simulate_cached.cache_clear()
+    first = risk_simulator.simulate_cached(_params())
+    second = risk_simulator.simulate_cached(_params())
+
+    assert first is second
+    assert risk_simulator.simulate_cached.cache_info().hits == 1
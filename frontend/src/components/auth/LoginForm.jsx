@@ -22,7 +22,7 @@ export default function LoginForm() {
     setLoading(true)
     try {
       const data = await login(email, password)
-      setAuth(data.access_token, { email })
+      setAuth(data.access_token, { email }, data.refresh_token)
       addToast(t('common.success'), 'success')
       navigate('/')
     } catch (error) {
@@ -22,7 +22,7 @@ export default function RegisterForm() {
     setLoading(true)
     try {
       const data = await register(email, password)
-      setAuth(data.access_token, { email })
+      setAuth(data.access_token, { email }, data.refresh_token)
       addToast(t('common.success'), 'success')
       navigate('/')
     } catch (error) {
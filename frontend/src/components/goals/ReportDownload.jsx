@@ -3,18 +3,36 @@ import { useTranslation } from 'react-i18next';
 import api from '../../services/api';
 import styles from './ReportDownload.module.css';
 
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_POLL_ATTEMPTS = 80;
+
 const ReportDownload = ({ goalId }) => {
   const { t } = useTranslation();
   const [downloading, setDownloading] = useState(null);
   const [error, setError] = useState(null);
 
+  // PDF/Excel se generan en segundo plano: encolar y consultar hasta que esté listo
+  const waitForReportJob = async (format) => {
+    let { data: job } = await api.post(`/reports/goals/${goalId}/jobs`, null, {
+      params: { format },
+    });
+    for (let attempt = 0; job.status === 'pending' && attempt < JOB_POLL_ATTEMPTS; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      ({ data: job } = await api.get(job.status_url));
+    }
+    if (job.status !== 'ready') {
+      throw new Error(job.error || t('reports.downloadFailed'));
+    }
+    return job.download_url;
+  };
+
   const downloadReport = async (format) => {
     setDownloading(format);
     setError(null);
     try {
-      const response = await api.get(`/reports/goals/${goalId}/${format}`, {
-        responseType: 'blob',
-      });
+      const response = format === 'csv'
+        ? await api.get(`/reports/goals/${goalId}/csv`, { responseType: 'blob' })
+        : await api.get(await waitForReportJob(format), { responseType: 'blob' });
 
       const mimeTypes = {
         pdf: 'application/pdf',
@@ -34,7 +52,9 @@ const ReportDownload = ({ goalId }) => {
       document.body.removeChild(link);
       URL.revokeObjectURL(url);
     } catch (err) {
-      const detail = err.response?.data?.detail || t('reports.downloadFailed');
+      const detail = err.response
+        ? err.response.data?.detail || t('reports.downloadFailed')
+        : err.message || t('reports.downloadFailed');
       setError(detail);
     } finally {
       setDownloading(null);
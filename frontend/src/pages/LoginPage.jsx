@@ -31,7 +31,7 @@ const LoginPage = () => {
 
     try {
       const response = await login(formData.email, formData.password);
-      setAuth(response.access_token, response.user);
+      setAuth(response.access_token, response.user, response.refresh_token);
       showToast(t('auth.loginSuccess'), 'success');
       navigate('/');
     } catch (error) {
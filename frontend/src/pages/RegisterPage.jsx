@@ -38,7 +38,7 @@ const RegisterPage = () => {
 
     try {
       const response = await register(formData.email, formData.password);
-      setAuth(response.access_token);
+      setAuth(response.access_token, null, response.refresh_token);
       showToast(t('auth.registerSuccess'), 'success');
       navigate('/');
     } catch (error) {
@@ -15,10 +15,37 @@ api.interceptors.request.use((config) => {
   return config
 })
 
+// El access token dura poco: ante un 401 se canjea el refresh token una vez
+// y se repite la petición original
+let refreshing = null
+
+const refreshAccessToken = () => {
+  const { refreshToken, setAuth } = useAuthStore.getState()
+  refreshing ??= axios
+    .post(`${api.defaults.baseURL}/auth/refresh`, { refresh_token: refreshToken })
+    .then(({ data }) => {
+      setAuth(data.access_token, null, data.refresh_token)
+      return data.access_token
+    })
+    .finally(() => { refreshing = null })
+  return refreshing
+}
+
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config
     if (error.response?.status === 401) {
+      if (useAuthStore.getState().refreshToken && original && !original._retried) {
+        original._retried = true
+        try {
+          const token = await refreshAccessToken()
+          original.headers.Authorization = `Bearer ${token}`
+          return api(original)
+        } catch {
+          // refresh inválido o expirado: cerrar sesión
+        }
+      }
       useAuthStore.getState().logout()
       window.location.href = '/login'
     }
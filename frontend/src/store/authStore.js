@@ -5,12 +5,17 @@ export const useAuthStore = create(
   persist(
     (set) => ({
       token: null,
+      refreshToken: null,
       user: null,
-      setAuth: (token, user) => set({ token, user }),
-      logout: () => set({ token: null, user: null })
+      setAuth: (token, user, refreshToken) => set((state) => ({
+        token,
+        user: user ?? state.user,
+        refreshToken: refreshToken ?? state.refreshToken
+      })),
+      logout: () => set({ token: null, refreshToken: null, user: null })
     }),
     {
       name: 'auth-storage'
     }
   )
-)
\ No newline at end of file
+)